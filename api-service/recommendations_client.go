@@ -35,8 +35,9 @@ type RecommendationRequest struct {
 
 // RecommendationResponse is the response returned by the recommendation service
 type RecommendationResponse struct {
-	UserID          int   `json:"user_id"`
-	Recommendations []int `json:"recommendations"`
+	UserID          int    `json:"user_id"`
+	Recommendations []int  `json:"recommendations"`
+	ModelVersion    string `json:"model_version"`
 }
 
 // GetRecommendations calls the python ML service to get personalized recommendations
@@ -83,3 +84,59 @@ func (c *CustomRecommendationClient) GetRecommendations(ctx context.Context, use
 
 	return recResp.Recommendations, nil
 }
+
+// BatchRecommendationRequest is the payload for POST /api/v1/recommendations:batch
+type BatchRecommendationRequest struct {
+	UserIDs []int `json:"user_ids"`
+	Limit   int   `json:"limit"`
+}
+
+// BatchRecommendationResponse holds one RecommendationResponse per requested user
+type BatchRecommendationResponse struct {
+	Results []RecommendationResponse `json:"results"`
+}
+
+// GetRecommendationsBatch fetches feeds for many users in a single call
+// (notifications, digests, cache warm-up). The service scores all of them with one model call.
+func (c *CustomRecommendationClient) GetRecommendationsBatch(ctx context.Context, userIDs []int, limit int) (map[int][]int, error) {
+	if c == nil {
+		return nil, fmt.Errorf("custom recommendation client not initialized")
+	}
+
+	url := fmt.Sprintf("%s/api/v1/recommendations:batch", c.baseURL)
+
+	jsonData, err := json.Marshal(BatchRecommendationRequest{UserIDs: userIDs, Limit: limit})
+	if err != nil {
+		return nil, fmt.Errorf("error marshaling batch recommendation request: %w", err)
+	}
+
+	req, err := http.NewRequestWithContext(ctx, "POST", url, bytes.NewBuffer(jsonData))
+	if err != nil {
+		return nil, fmt.Errorf("error creating batch recommendation request: %w", err)
+	}
+
+	req.Header.Set("Content-Type", "application/json")
+	req.Header.Set("X-API-Key", c.apiKey)
+
+	client := &http.Client{Timeout: 30 * time.Second}
+	resp, err := client.Do(req)
+	if err != nil {
+		return nil, fmt.Errorf("error calling recommendation service: %w", err)
+	}
+	defer resp.Body.Close()
+
+	if resp.StatusCode != http.StatusOK {
+		return nil, fmt.Errorf("recommendation service responded with error: %s", resp.Status)
+	}
+
+	var batchResp BatchRecommendationResponse
+	if err := json.NewDecoder(resp.Body).Decode(&batchResp); err != nil {
+		return nil, fmt.Errorf("error decoding batch recommendation response: %w", err)
+	}
+
+	recs := make(map[int][]int, len(batchResp.Results))
+	for _, result := range batchResp.Results {
+		recs[result.UserID] = result.Recommendations
+	}
+	return recs, nil
+}
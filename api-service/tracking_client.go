@@ -7,6 +7,7 @@ import (
 	"fmt"
 	"net/http"
 	"os"
+	"sync"
 	"time"
 )
 
@@ -19,48 +20,128 @@ type TrackingEvent struct {
 	Metadata   map[string]any `json:"metadata"`
 }
 
-// SendTrackingEvent envía un evento al microservicio de tracking de forma asíncrona.
+// trackingBatchResult es el resultado por evento que devuelve POST /api/v1/events:batch.
+type trackingBatchResult struct {
+	Index  int    `json:"index"`
+	Status string `json:"status"`
+	Error  string `json:"error"`
+}
+
+type trackingBatchResponse struct {
+	Accepted int                   `json:"accepted"`
+	Rejected int                   `json:"rejected"`
+	Results  []trackingBatchResult `json:"results"`
+}
+
+const (
+	// Máximo de eventos por petición (el tracking-service acepta hasta EVENTS_BATCH_MAX_ITEMS)
+	trackingBatchMaxEvents = 200
+	// Tiempo máximo que un evento espera en memoria antes de enviarse
+	trackingBatchFlushInterval = 500 * time.Millisecond
+	// Capacidad del buffer; si se llena, los eventos nuevos se descartan
+	trackingQueueSize = 5000
+)
+
+var (
+	trackingQueue      chan TrackingEvent
+	trackingQueueOnce  sync.Once
+	trackingHTTPClient = &http.Client{Timeout: 5 * time.Second}
+)
+
+// SendTrackingEvent encola un evento para el microservicio de tracking de forma asíncrona.
+// Los eventos se agrupan y se envían en lotes a /api/v1/events:batch.
 func SendTrackingEvent(ctx context.Context, token string, event TrackingEvent) {
 	trackingURL := os.Getenv("TRACKING_SERVICE_URL")
 	if trackingURL == "" {
 		return
 	}
 
-	// Ejecutar en una goroutine para no bloquear la respuesta al usuario
-	go func() {
-		url := fmt.Sprintf("%s/api/v1/events", trackingURL)
+	trackingQueueOnce.Do(func() {
+		trackingQueue = make(chan TrackingEvent, trackingQueueSize)
+		go runTrackingBatcher(trackingURL)
+	})
 
-		jsonData, err := json.Marshal(event)
-		if err != nil {
-			Logger.Error("Error al serializar evento de tracking", "error", err)
-			return
-		}
+	// No bloquear nunca la respuesta al usuario
+	select {
+	case trackingQueue <- event:
+	default:
+		Logger.Warn("Cola de tracking llena, evento descartado", "user_id", event.UserID, "event_type", event.EventType)
+	}
+}
 
-		req, err := http.NewRequest("POST", url, bytes.NewBuffer(jsonData))
-		if err != nil {
-			Logger.Error("Error al crear petición de tracking", "error", err)
-			return
-		}
+// runTrackingBatcher agrupa eventos hasta trackingBatchMaxEvents o trackingBatchFlushInterval.
+func runTrackingBatcher(trackingURL string) {
+	ticker := time.NewTicker(trackingBatchFlushInterval)
+	defer ticker.Stop()
 
-		req.Header.Set("Content-Type", "application/json")
-		// Usar la API Key Server-to-Server
-		apiKey := os.Getenv("TRACKING_API_KEY")
-		if apiKey != "" {
-			req.Header.Set("X-API-Key", apiKey)
-		} else {
-			Logger.Warn("TRACKING_API_KEY no está configurado")
+	batch := make([]TrackingEvent, 0, trackingBatchMaxEvents)
+	for {
+		select {
+		case event := <-trackingQueue:
+			batch = append(batch, event)
+			if len(batch) >= trackingBatchMaxEvents {
+				sendTrackingBatch(trackingURL, batch)
+				batch = batch[:0]
+			}
+		case <-ticker.C:
+			if len(batch) > 0 {
+				sendTrackingBatch(trackingURL, batch)
+				batch = batch[:0]
+			}
 		}
+	}
+}
 
-		client := &http.Client{Timeout: 5 * time.Second}
-		resp, err := client.Do(req)
-		if err != nil {
-			Logger.Error("Error al enviar evento al tracking-service", "error", err, "url", url)
-			return
-		}
-		defer resp.Body.Close()
+// sendTrackingBatch envía un lote y registra los eventos rechazados individualmente.
+func sendTrackingBatch(trackingURL string, batch []TrackingEvent) {
+	url := fmt.Sprintf("%s/api/v1/events:batch", trackingURL)
+
+	jsonData, err := json.Marshal(batch)
+	if err != nil {
+		Logger.Error("Error al serializar lote de tracking", "error", err)
+		return
+	}
+
+	req, err := http.NewRequest("POST", url, bytes.NewBuffer(jsonData))
+	if err != nil {
+		Logger.Error("Error al crear petición de tracking", "error", err)
+		return
+	}
+
+	req.Header.Set("Content-Type", "application/json")
+	// Usar la API Key Server-to-Server
+	apiKey := os.Getenv("TRACKING_API_KEY")
+	if apiKey != "" {
+		req.Header.Set("X-API-Key", apiKey)
+	} else {
+		Logger.Warn("TRACKING_API_KEY no está configurado")
+	}
+
+	resp, err := trackingHTTPClient.Do(req)
+	if err != nil {
+		Logger.Error("Error al enviar lote al tracking-service", "error", err, "url", url, "events", len(batch))
+		return
+	}
+	defer resp.Body.Close()
+
+	if resp.StatusCode != http.StatusAccepted {
+		Logger.Warn("Tracking-service respondió con error", "status", resp.Status, "events", len(batch))
+		return
+	}
 
-		if resp.StatusCode != http.StatusAccepted {
-			Logger.Warn("Tracking-service respondió con error", "status", resp.Status)
+	var result trackingBatchResponse
+	if err := json.NewDecoder(resp.Body).Decode(&result); err != nil {
+		Logger.Warn("Respuesta de lote de tracking ilegible", "error", err)
+		return
+	}
+	if result.Rejected > 0 {
+		for _, item := range result.Results {
+			if item.Status == "rejected" && item.Index >= 0 && item.Index < len(batch) {
+				Logger.Warn("Evento de tracking rechazado",
+					"event_type", batch[item.Index].EventType,
+					"user_id", batch[item.Index].UserID,
+					"error", item.Error)
+			}
 		}
-	}()
+	}
 }
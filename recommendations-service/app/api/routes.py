@@ -1,15 +1,18 @@
 import logging
-import redis
+import redis.asyncio
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from app.api import schemas
-from app.cache.redis_client import get_redis
+from app.cache.redis_client import get_async_redis
+from app.cache.result_cache import get_result_cache
 from app.core.security import verify_api_key
-from app.database.connection import get_db
-from app.pipelines.inference_pipeline import InferencePipeline
+from app.database.connection import get_async_db
+from app.pipelines.inference_pipeline import InferencePipeline, recommend
+from app.services.model_registry import get_model_registry
+from app.services.training_jobs import enqueue_training_job, get_training_job
 
 logger = logging.getLogger(__name__)
 
@@ -17,37 +20,55 @@ logger = logging.getLogger(__name__)
 router = APIRouter(dependencies=[Depends(verify_api_key)])
 
 @router.post("/recommendations", response_model=schemas.RecommendationResponse)
-async def get_recommendations(
-    req: schemas.RecommendationRequest,
-    db: Session = Depends(get_db),
-    cache: redis.Redis = Depends(get_redis)
-):
+async def get_recommendations(req: schemas.RecommendationRequest):
     """
     Generate personalized recommendations asynchronously.
-    Executes the Inference Pipeline: Retrieval -> Feature Fetch -> LGBM Ranking.
+    Served from the result cache (stale-while-revalidate); on a miss executes
+    the Inference Pipeline: Retrieval -> Feature Fetch -> LGBM Ranking.
+    """
+    model = get_model_registry().current
+    recs = await get_result_cache().get_or_compute(
+        req.user_id, req.limit, model.version, lambda: recommend(req.user_id, req.limit, model)
+    )
+    return {"user_id": req.user_id, "recommendations": recs, "model_version": model.version}
+
+@router.post("/recommendations:batch", response_model=schemas.BatchRecommendationResponse)
+async def get_recommendations_batch(
+    req: schemas.BatchRecommendationRequest,
+    cache: redis.asyncio.Redis = Depends(get_async_redis)
+):
+    """
+    Generate feeds for many users at once (notifications, digests, warm-up).
+    Set-based feature fetches and a single model call for every user.
     """
-    pipeline = InferencePipeline(db, cache)
-    recs = pipeline.run(req.user_id, limit=req.limit)
-    return {"user_id": req.user_id, "recommendations": recs}
+    user_ids = list(dict.fromkeys(req.user_ids))
+    pipeline = InferencePipeline(cache)
+    recs = await pipeline.run_batch(user_ids, limit=req.limit)
+    return {
+        "results": [
+            {"user_id": user_id, "recommendations": recs.get(user_id, []), "model_version": pipeline.model_version}
+            for user_id in user_ids
+        ]
+    }
 
 @router.get("/health")
 async def health_check(
-    db: Session = Depends(get_db),
-    cache: redis.Redis = Depends(get_redis)
+    db: AsyncSession = Depends(get_async_db),
+    cache: redis.asyncio.Redis = Depends(get_async_redis)
 ):
     """Deep health check validating DB and Redis"""
     health_status = {"status": "healthy", "database": "unknown", "redis": "unknown"}
     is_fully_healthy = True
     
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         health_status["database"] = "connected"
     except Exception:
         health_status["database"] = "offline"
         is_fully_healthy = False
         
     try:
-        if cache.ping():
+        if await cache.ping():
             health_status["redis"] = "connected"
     except Exception:
         health_status["redis"] = "offline"
@@ -59,26 +80,33 @@ async def health_check(
     return health_status
 
 @router.post("/internal/retrain", status_code=status.HTTP_202_ACCEPTED)
-async def trigger_retraining(background_tasks: BackgroundTasks):
+async def trigger_retraining(
+    incremental: bool = False,
+    cache: redis.asyncio.Redis = Depends(get_async_redis)
+):
     """
-    Triggers the ML training pipeline asynchronously via Background Tasks.
+    Queues a training job for the training runner (training_runner.py); the
+    pipeline never runs in the API process. Poll GET /internal/retrain/{job_id}.
     Only accessible passing the RECOMMENDATIONS_API_KEY.
     """
-    from app.services.training_service import TrainingService
-    
-    def run_training_job():
-        try:
-            logger.info("Initializing background training job...")
-            svc = TrainingService()
-            svc.train_model()
-            logger.info("Background training job finished.")
-        except Exception as e:
-            logger.error(f"Background training job failed: {e}")
+    try:
+        job = await enqueue_training_job(cache, "incremental" if incremental else "full")
+    except redis.RedisError as e:
+        logger.error(f"Could not queue training job: {e}")
+        raise HTTPException(status_code=503, detail="Training queue unavailable")
 
-    background_tasks.add_task(run_training_job)
-    
     return {
         "status": "accepted",
         "message": "Heavy ML Retraining pipeline queued successfully.",
-        "layer": "Recommendations"
+        "layer": "Recommendations",
+        "job_id": job["job_id"],
+        "mode": job["mode"],
     }
+
+@router.get("/internal/retrain/{job_id}")
+async def get_retraining_job(job_id: str, cache: redis.asyncio.Redis = Depends(get_async_redis)):
+    """Status, current step and result of a training job."""
+    job = await get_training_job(cache, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job
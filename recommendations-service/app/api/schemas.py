@@ -1,6 +1,8 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List
 
+from app.core.config import settings
+
 
 class RecommendationRequest(BaseModel):
     user_id: int = Field(..., gt=0, description="User ID must be positive")
@@ -10,3 +12,25 @@ class RecommendationRequest(BaseModel):
 class RecommendationResponse(BaseModel):
     user_id: int
     recommendations: List[int]
+    model_version: str = Field(..., description="Ranking model version; 'fallback' when unranked")
+
+
+class BatchRecommendationRequest(BaseModel):
+    user_ids: List[int] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.RECS_BATCH_MAX_USERS,
+        description="Users to generate feeds for; duplicates are scored once",
+    )
+    limit: int = Field(default=10, ge=1, le=100, description="Max 100 recommendations per user")
+
+    @field_validator("user_ids")
+    @classmethod
+    def user_ids_positive(cls, user_ids: List[int]) -> List[int]:
+        if any(user_id <= 0 for user_id in user_ids):
+            raise ValueError("User IDs must be positive")
+        return user_ids
+
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[RecommendationResponse]
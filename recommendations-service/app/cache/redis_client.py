@@ -1,4 +1,5 @@
 import redis
+import redis.asyncio
 from app.core.config import settings
 import logging
 
@@ -11,9 +12,31 @@ redis_client = redis.Redis.from_url(
     max_connections=50
 )
 
+# Non-blocking client for code running on the event loop
+async_redis_client = redis.asyncio.Redis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    max_connections=50
+)
+
+# Same, without response decoding, for binary values (seen-items bitmaps)
+async_redis_binary_client = redis.asyncio.Redis.from_url(
+    settings.REDIS_URL,
+    decode_responses=False,
+    max_connections=50
+)
+
 def get_redis():
     try:
         return redis_client
     except redis.ConnectionError as e:
         logger.error(f"Redis connection error: {e}")
         raise
+
+
+def get_async_redis():
+    return async_redis_client
+
+
+def get_async_redis_binary():
+    return async_redis_binary_client
@@ -0,0 +1,231 @@
+"""
+Result Cache — Ranked recommendations cached per (user_id, limit, model_version).
+
+Layers:
+  1. In-process LRU (RECS_LOCAL_CACHE_SIZE entries, RECS_LOCAL_CACHE_SECONDS):
+     absorbs rapid feed refreshes without a Redis round trip.
+  2. Redis  recs:{user_id}:{limit}:{model_version} → {"items", "computed_at", "gen"},
+     kept for RECS_CACHE_STALE_SECONDS.
+
+Entries younger than RECS_CACHE_FRESH_SECONDS are served as-is. Older ones are
+served immediately while a background task recomputes them — single-flight
+per key within the process, and across processes via a SET NX lock.
+
+Invalidation: the tracking worker bumps user:{id}:recs_gen after committing new
+events for the user. An entry stamped with another generation is a miss.
+The local LRU skips that check, so it can lag an invalidation by at most
+RECS_LOCAL_CACHE_SECONDS.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+import redis
+from prometheus_client import Counter
+
+from app.cache.redis_client import get_async_redis
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_REQUESTS = Counter(
+    "recommendations_result_cache_requests_total",
+    "Recommendation requests by result cache outcome",
+    ["result"],  # local | fresh | stale | miss | invalidated | error
+)
+RESULT_CACHE_REFRESHES = Counter(
+    "recommendations_result_cache_refreshes_total",
+    "Background recomputations of stale cached results",
+    ["status"],
+)
+
+RECS_GENERATION_KEY = "user:{user_id}:recs_gen"
+
+
+class CachedResult(NamedTuple):
+    items: list[int]
+    computed_at: float
+    gen: int
+
+
+class ResultCache:
+    def __init__(
+        self,
+        redis_conn: redis.asyncio.Redis,
+        local_size: int,
+        local_ttl: float,
+        fresh_ttl: float,
+        stale_ttl: int,
+        lock_ttl: int,
+    ):
+        self.redis = redis_conn
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.lock_ttl = lock_ttl
+
+        # key -> (stored_at, CachedResult), most recently used last
+        self._local: OrderedDict[str, tuple[float, CachedResult]] = OrderedDict()
+        # key -> (generation being computed, task)
+        self._inflight: dict[str, tuple[int, asyncio.Task]] = {}
+
+    @staticmethod
+    def _key(user_id: int, limit: int, model_version: str) -> str:
+        return f"recs:{user_id}:{limit}:{model_version}"
+
+    # ---- Local LRU ---------------------------------------------------
+
+    def _local_get(self, key: str, now: float) -> Optional[CachedResult]:
+        hit = self._local.get(key)
+        if hit is None:
+            return None
+        stored_at, entry = hit
+        if now - stored_at >= self.local_ttl:
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return entry
+
+    def _local_put(self, key: str, entry: CachedResult):
+        self._local[key] = (time.time(), entry)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    # ---- Lookup ------------------------------------------------------
+
+    async def get_or_compute(
+        self,
+        user_id: int,
+        limit: int,
+        model_version: str,
+        compute: Callable[[], Awaitable[list[int]]],
+    ) -> list[int]:
+        """
+        Returns cached recommendations, or `compute()`s them on a miss.
+        Redis errors degrade to computing uncached.
+        """
+        key = self._key(user_id, limit, model_version)
+        now = time.time()
+
+        entry = self._local_get(key, now)
+        if entry is not None and now - entry.computed_at < self.fresh_ttl:
+            RESULT_CACHE_REQUESTS.labels(result="local").inc()
+            return entry.items
+
+        try:
+            raw, gen = await self.redis.mget(key, RECS_GENERATION_KEY.format(user_id=user_id))
+        except redis.RedisError as e:
+            logger.warning("Result cache unavailable: %s", e)
+            RESULT_CACHE_REQUESTS.labels(result="error").inc()
+            return await compute()
+
+        gen = int(gen or 0)
+        entry = self._decode(raw)
+        if entry is not None and entry.gen == gen:
+            self._local_put(key, entry)
+            if now - entry.computed_at < self.fresh_ttl:
+                RESULT_CACHE_REQUESTS.labels(result="fresh").inc()
+            else:
+                RESULT_CACHE_REQUESTS.labels(result="stale").inc()
+                await self._schedule_refresh(key, gen, compute)
+            return entry.items
+
+        RESULT_CACHE_REQUESTS.labels(result="miss" if entry is None else "invalidated").inc()
+        self._local.pop(key, None)
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] == gen:
+            task = inflight[1]
+        else:
+            task = self._start(key, gen, compute)
+        # Shielded so a disconnecting client does not cancel followers' result
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _decode(raw: Optional[str]) -> Optional[CachedResult]:
+        if not raw:
+            return None
+        try:
+            data = json.loads(raw)
+            return CachedResult(data["items"], data["computed_at"], data["gen"])
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    # ---- Recompute ---------------------------------------------------
+
+    def _start(self, key: str, gen: int, compute, lock_key: Optional[str] = None) -> asyncio.Task:
+        task = asyncio.create_task(self._compute_and_store(key, gen, compute, lock_key))
+        self._inflight[key] = (gen, task)
+        task.add_done_callback(lambda t: self._forget(key, t))
+        return task
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key, (None, None))[1] is task:
+            del self._inflight[key]
+
+    async def _schedule_refresh(self, key: str, gen: int, compute):
+        """Starts a background recompute unless one is already running anywhere."""
+        if key in self._inflight:
+            return
+        lock_key = f"{key}:refresh"
+        try:
+            if not await self.redis.set(lock_key, "1", nx=True, ex=self.lock_ttl):
+                return  # Another process is refreshing this key
+        except redis.RedisError:
+            return
+        if key in self._inflight:
+            return  # Started by a concurrent request while we awaited the lock
+        task = self._start(key, gen, compute, lock_key)
+        task.add_done_callback(self._log_refresh)
+
+    @staticmethod
+    def _log_refresh(task: asyncio.Task):
+        if task.cancelled() or task.exception() is not None:
+            RESULT_CACHE_REFRESHES.labels(status="failed").inc()
+            if not task.cancelled():
+                logger.error("Background recommendations refresh failed: %s", task.exception())
+        else:
+            RESULT_CACHE_REFRESHES.labels(status="ok").inc()
+
+    async def _compute_and_store(self, key: str, gen: int, compute, lock_key: Optional[str]) -> list[int]:
+        """
+        Recomputes and stores the result stamped with `gen`, the generation read
+        before computing: events committed meanwhile invalidate it immediately.
+        """
+        try:
+            items = await compute()
+            entry = CachedResult(list(items), time.time(), gen)
+            self._local_put(key, entry)
+            try:
+                await self.redis.set(key, json.dumps(entry._asdict()), ex=self.stale_ttl)
+            except redis.RedisError as e:
+                logger.warning("Could not store cached recommendations: %s", e)
+            return entry.items
+        finally:
+            if lock_key is not None:
+                try:
+                    await self.redis.delete(lock_key)
+                except redis.RedisError:
+                    pass
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(
+            redis_conn=get_async_redis(),
+            local_size=settings.RECS_LOCAL_CACHE_SIZE,
+            local_ttl=settings.RECS_LOCAL_CACHE_SECONDS,
+            fresh_ttl=settings.RECS_CACHE_FRESH_SECONDS,
+            stale_ttl=settings.RECS_CACHE_STALE_SECONDS,
+            lock_ttl=settings.RECS_REFRESH_LOCK_SECONDS,
+        )
+    return _result_cache
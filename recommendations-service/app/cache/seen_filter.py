@@ -0,0 +1,127 @@
+"""
+Seen Filter — Per-user bitmap of interacted content, for in-memory exclusion.
+
+user:{id}:seen is a Redis bitmap (bit content_id set = seen). The tracking
+worker SETBITs new interactions after each window commits. Bit 0 is never a
+content id: it marks a bitmap that already holds the user's full history.
+A missing or partial bitmap is hydrated once from user_seen_content and
+merged in with BITOP OR, so bits the worker sets concurrently are never lost.
+Hydrations run as shielded tasks shared by concurrent requests: a caller
+that gives up (candidate budget) does not cancel the query, and the bitmap
+is still written for the next request.
+"""
+
+import asyncio
+import logging
+
+import numpy as np
+import redis.asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.repositories.tracking_repo import TrackingRepository
+
+logger = logging.getLogger(__name__)
+
+SEEN_BITMAP_KEY = "user:{user_id}:seen"
+COMPLETE_BIT = 0
+# Same idle TTL the tracking worker refreshes on every write
+SEEN_BITMAP_TTL_SECONDS = 7 * 24 * 3600
+
+# Hydrations in flight, per user id
+_hydrating: dict[int, asyncio.Task] = {}
+
+
+def build_bitmap(content_ids) -> bytes:
+    """Redis-compatible bitmap (MSB-first) with the given bits and COMPLETE_BIT set."""
+    ids = np.asarray(list(content_ids), dtype=np.int64)
+    ids = ids[ids > 0]
+    size = int(ids.max()) + 1 if len(ids) else 1
+    bits = np.zeros(size, dtype=np.uint8)
+    bits[ids] = 1
+    bits[COMPLETE_BIT] = 1
+    return np.packbits(bits).tobytes()
+
+
+def _is_complete(bitmap: bytes) -> bool:
+    return bool(bitmap) and bool(bitmap[0] & 0x80)
+
+
+def unseen_mask(bitmap: bytes, content_ids: np.ndarray) -> np.ndarray:
+    """True for each content id whose bit is not set; O(len(content_ids))."""
+    buf = np.frombuffer(bitmap, dtype=np.uint8)
+    byte_idx = content_ids >> 3
+    in_range = byte_idx < len(buf)
+    seen = np.zeros(len(content_ids), dtype=bool)
+    ids = content_ids[in_range]
+    seen[in_range] = (buf[ids >> 3] >> (7 - (ids & 7))) & 1 == 1
+    return ~seen
+
+
+def _hydration_done(task: asyncio.Task, user_ids: list[int]):
+    for user_id in user_ids:
+        if _hydrating.get(user_id) is task:
+            del _hydrating[user_id]
+    # Retrieve the outcome even if every caller gave up waiting
+    if not task.cancelled():
+        task.exception()
+
+
+class SeenFilter:
+    def __init__(self, cache: redis.asyncio.Redis, session_factory: async_sessionmaker):
+        # `cache` must not decode responses: bitmaps are binary
+        self.cache = cache
+        self.session_factory = session_factory
+
+    async def get_bitmaps(self, user_ids: list[int]) -> dict[int, bytes]:
+        """Complete seen bitmaps for `user_ids`, hydrating missing ones in one query."""
+        keys = [SEEN_BITMAP_KEY.format(user_id=user_id) for user_id in user_ids]
+        cached = await self.cache.mget(keys)
+
+        bitmaps = {}
+        partial = []
+        for user_id, bitmap in zip(user_ids, cached):
+            if bitmap is not None and _is_complete(bitmap):
+                bitmaps[user_id] = bitmap
+            else:
+                partial.append(user_id)
+
+        if partial:
+            for task in self._hydration_tasks(partial):
+                try:
+                    hydrated = await asyncio.shield(task)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Seen bitmap hydration failed: %s", e)
+                    continue
+                bitmaps.update((user_id, hydrated[user_id]) for user_id in partial if user_id in hydrated)
+        return bitmaps
+
+    def _hydration_tasks(self, user_ids: list[int]) -> list[asyncio.Task]:
+        """Tasks hydrating `user_ids`: joins those in flight, starts one for the rest."""
+        missing = [user_id for user_id in user_ids if user_id not in _hydrating]
+        if missing:
+            task = asyncio.ensure_future(self._hydrate(missing))
+            task.add_done_callback(lambda done: _hydration_done(done, missing))
+            for user_id in missing:
+                _hydrating[user_id] = task
+        return list(dict.fromkeys(_hydrating[user_id] for user_id in user_ids))
+
+    async def _hydrate(self, user_ids: list[int]) -> dict[int, bytes]:
+        async with self.session_factory() as db:
+            seen = await TrackingRepository(db).get_interacted_content_ids_for_users(user_ids)
+
+        pipe = self.cache.pipeline(transaction=True)
+        for user_id in user_ids:
+            key = SEEN_BITMAP_KEY.format(user_id=user_id)
+            history_key = f"{key}:hydrate"
+            pipe.set(history_key, build_bitmap(seen.get(user_id, ())), ex=60)
+            pipe.bitop("OR", key, key, history_key)
+            pipe.delete(history_key)
+            pipe.expire(key, SEEN_BITMAP_TTL_SECONDS)
+            pipe.get(key)
+        results = await pipe.execute()
+
+        logger.info("Hydrated seen bitmaps for %d users", len(user_ids))
+        # Every 5th reply is the merged bitmap
+        return {user_id: results[i * 5 + 4] for i, user_id in enumerate(user_ids)}
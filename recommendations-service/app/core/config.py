@@ -20,6 +20,68 @@ class Settings(BaseSettings):
     CORS_ORIGINS: list[str] = ["http://localhost", "http://localhost:8000", "http://localhost:3000"]
     
     MODEL_PATH: str = os.getenv("MODEL_PATH", "app/models_storage/model.lgb").strip().strip("'").strip('"')
+    # Seconds between checks for a new model version (app/services/model_registry.py)
+    MODEL_RELOAD_SECONDS: float = float(str(os.getenv("MODEL_RELOAD_SECONDS", 10)).strip().strip("'").strip('"'))
+    # booster (LightGBM predict) | flat (NumPy scorer, app/models/tree_scorer.py)
+    MODEL_SCORER: str = os.getenv("MODEL_SCORER", "flat").strip().strip("'").strip('"').lower()
+
+    # Ranked-result cache (stale-while-revalidate)
+    RECS_CACHE_FRESH_SECONDS: int = int(str(os.getenv("RECS_CACHE_FRESH_SECONDS", 60)).strip().strip("'").strip('"'))
+    RECS_CACHE_STALE_SECONDS: int = int(str(os.getenv("RECS_CACHE_STALE_SECONDS", 1800)).strip().strip("'").strip('"'))
+    RECS_LOCAL_CACHE_SIZE: int = int(str(os.getenv("RECS_LOCAL_CACHE_SIZE", 4096)).strip().strip("'").strip('"'))
+    RECS_LOCAL_CACHE_SECONDS: float = float(str(os.getenv("RECS_LOCAL_CACHE_SECONDS", 2)).strip().strip("'").strip('"'))
+    RECS_REFRESH_LOCK_SECONDS: int = int(str(os.getenv("RECS_REFRESH_LOCK_SECONDS", 30)).strip().strip("'").strip('"'))
+
+    # CPU scoring executor (feature matrix + model.predict)
+    SCORING_WORKERS: int = int(str(os.getenv("SCORING_WORKERS", min(4, os.cpu_count() or 1))).strip().strip("'").strip('"'))
+    SCORING_MAX_QUEUE: int = int(str(os.getenv("SCORING_MAX_QUEUE", 64)).strip().strip("'").strip('"'))
+
+    # In-process content feature store (app/services/content_feature_store.py)
+    CONTENT_STORE_REFRESH_SECONDS: float = float(str(os.getenv("CONTENT_STORE_REFRESH_SECONDS", 10)).strip().strip("'").strip('"'))
+    CONTENT_STORE_REFRESH_OVERLAP_SECONDS: int = int(str(os.getenv("CONTENT_STORE_REFRESH_OVERLAP_SECONDS", 30)).strip().strip("'").strip('"'))
+    CONTENT_STORE_FULL_RELOAD_SECONDS: int = int(str(os.getenv("CONTENT_STORE_FULL_RELOAD_SECONDS", 3600)).strip().strip("'").strip('"'))
+
+    # Candidate retrieval: global ranked list filtered by the seen bitmap
+    RECS_GLOBAL_RANKED_SIZE: int = int(str(os.getenv("RECS_GLOBAL_RANKED_SIZE", 2000)).strip().strip("'").strip('"'))
+    RECS_GLOBAL_RANKED_TTL_SECONDS: float = float(str(os.getenv("RECS_GLOBAL_RANKED_TTL_SECONDS", 60)).strip().strip("'").strip('"'))
+
+    # Latency budget per candidate source (app/services/candidate_generation.py)
+    RECS_BUDGET_PRECOMPUTED_MS: float = float(str(os.getenv("RECS_BUDGET_PRECOMPUTED_MS", 20)).strip().strip("'").strip('"'))
+    RECS_BUDGET_SEEN_MS: float = float(str(os.getenv("RECS_BUDGET_SEEN_MS", 50)).strip().strip("'").strip('"'))
+    RECS_BUDGET_CO_ENGAGEMENT_MS: float = float(str(os.getenv("RECS_BUDGET_CO_ENGAGEMENT_MS", 40)).strip().strip("'").strip('"'))
+    RECS_BUDGET_EMBEDDING_MS: float = float(str(os.getenv("RECS_BUDGET_EMBEDDING_MS", 30)).strip().strip("'").strip('"'))
+    RECS_BUDGET_FRESH_MS: float = float(str(os.getenv("RECS_BUDGET_FRESH_MS", 40)).strip().strip("'").strip('"'))
+    RECS_BUDGET_TRENDING_MS: float = float(str(os.getenv("RECS_BUDGET_TRENDING_MS", 50)).strip().strip("'").strip('"'))
+
+    # Item-to-item co-engagement index (build_item_index.py, app/services/item_index.py)
+    ITEM_INDEX_PATH: str = os.getenv("ITEM_INDEX_PATH", "app/models_storage/item_index.npz").strip().strip("'").strip('"')
+    ITEM_INDEX_TOP_K: int = int(str(os.getenv("ITEM_INDEX_TOP_K", 50)).strip().strip("'").strip('"'))
+    ITEM_INDEX_LOOKBACK_DAYS: int = int(str(os.getenv("ITEM_INDEX_LOOKBACK_DAYS", 90)).strip().strip("'").strip('"'))
+    ITEM_INDEX_RECENT_POSITIVES: int = int(str(os.getenv("ITEM_INDEX_RECENT_POSITIVES", 20)).strip().strip("'").strip('"'))
+    ITEM_INDEX_RELOAD_SECONDS: float = float(str(os.getenv("ITEM_INDEX_RELOAD_SECONDS", 60)).strip().strip("'").strip('"'))
+
+    # ALS embeddings retrieval (app/pipelines/embedding_pipeline.py, app/services/embedding_index.py)
+    EMBEDDING_DIR: str = os.getenv("EMBEDDING_DIR", "app/models_storage/embeddings").strip().strip("'").strip('"')
+    EMBEDDING_CANDIDATES: int = int(str(os.getenv("EMBEDDING_CANDIDATES", 200)).strip().strip("'").strip('"'))
+    EMBEDDING_NPROBE: int = int(str(os.getenv("EMBEDDING_NPROBE", 32)).strip().strip("'").strip('"'))
+
+    # Training data extraction (app/pipelines/event_extract.py)
+    TRAINING_CACHE_PATH: str = os.getenv("TRAINING_CACHE_PATH", "app/models_storage/training_events.npz").strip().strip("'").strip('"')
+    TRAINING_WINDOW_DAYS: int = int(str(os.getenv("TRAINING_WINDOW_DAYS", 0)).strip().strip("'").strip('"'))
+    # Temporal holdout and warm-started incremental training (app/pipelines/training_pipeline.py)
+    TRAINING_HOLDOUT_FRACTION: float = float(str(os.getenv("TRAINING_HOLDOUT_FRACTION", 0.2)).strip().strip("'").strip('"'))
+    TRAINING_INCREMENTAL_TREES: int = int(str(os.getenv("TRAINING_INCREMENTAL_TREES", 20)).strip().strip("'").strip('"'))
+    TRAINING_MAX_TREES: int = int(str(os.getenv("TRAINING_MAX_TREES", 500)).strip().strip("'").strip('"'))
+    # Training runner (training_runner.py, app/services/training_jobs.py)
+    TRAINING_LOCK_SECONDS: float = float(str(os.getenv("TRAINING_LOCK_SECONDS", 60)).strip().strip("'").strip('"'))
+    TRAINING_CPUS: str = os.getenv("TRAINING_CPUS", "").strip().strip("'").strip('"')
+    TRAINING_NICE: int = int(str(os.getenv("TRAINING_NICE", 10)).strip().strip("'").strip('"'))
+    TRAINING_SCHEDULE_WEEKDAY: int = int(str(os.getenv("TRAINING_SCHEDULE_WEEKDAY", 6)).strip().strip("'").strip('"'))
+    TRAINING_SCHEDULE_HOUR: int = int(str(os.getenv("TRAINING_SCHEDULE_HOUR", 3)).strip().strip("'").strip('"'))
+    TRAINING_SCHEDULE_MODE: str = os.getenv("TRAINING_SCHEDULE_MODE", "incremental").strip().strip("'").strip('"')
+
+    # POST /recommendations:batch
+    RECS_BATCH_MAX_USERS: int = int(str(os.getenv("RECS_BATCH_MAX_USERS", 500)).strip().strip("'").strip('"'))
     
     model_config = SettingsConfigDict(
         env_file=".env",
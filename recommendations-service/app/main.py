@@ -9,7 +9,10 @@ from sqlalchemy.exc import SQLAlchemyError
 from app.api import routes
 from app.core.config import settings
 from app.core.logging import setup_logging
-from app.core.scheduler import start_scheduler, shutdown_scheduler
+from app.database.connection import async_engine
+from app.services.content_feature_store import start_content_feature_store, stop_content_feature_store
+from app.services.model_registry import start_model_registry, stop_model_registry
+from app.services.scoring_executor import shutdown_scoring_executor
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -56,14 +59,16 @@ async def database_exception_handler(request: Request, exc: SQLAlchemyError):
 
 @app.on_event("startup")
 async def startup_event():
-    logger.info("Application startup: Triggering APScheduler setup")
-    start_scheduler()
+    await start_model_registry()
+    await start_content_feature_store()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    logger.info("Application shutdown: Stopping APScheduler")
-    shutdown_scheduler()
+    await stop_model_registry()
+    await stop_content_feature_store()
+    shutdown_scoring_executor()
+    await async_engine.dispose()
 
 
 app.include_router(routes.router, prefix=settings.API_V1_STR)
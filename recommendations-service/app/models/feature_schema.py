@@ -0,0 +1,289 @@
+"""
+Feature Schema — the single registry of ranking features, shared by
+TrainingPipeline (batch mode) and online inference (serving mode).
+
+Every user/content feature is declared once, as a function of an entity's
+event counts per event type (one row per entity, EVENT_COUNT_COLUMNS):
+  - training builds that count matrix from tracking_events (event_type_counts);
+  - serving builds it from the counters the tracking worker maintains
+    (user_features / its Redis hash, content_metrics).
+content_metrics keeps net like/bookmark counters (unlike/unbookmark
+subtract, floored at 0), so training replays those counters per content
+(net_counter_counts) instead of counting gross likes/bookmarks.
+Both then run the same vectorised FeatureDefinition.compute over the matrix,
+so a feature cannot mean one thing in training and another at serving time.
+Context features are computed the same way from event timestamps (training)
+or the request time (serving), both in UTC.
+
+The model is trained on FEATURE_COLUMNS in registry order, and inference
+feeds the booster a float32 matrix with the same layout. FEATURE_SCHEMA_VERSION
+is a hash of the definitions; TrainingPipeline stamps it into the model
+artifact and the model registry rejects models stamped with another version,
+so changing a definition requires retraining.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Relevance label per event type (training target; also averaged into the
+# mean-relevance features). Unlisted types count as 0.
+RELEVANCE_MAP = {
+    'like': 3.0,
+    'bookmark': 3.0,
+    'share': 2.0,
+    'comment': 2.0,
+    'view': 1.0,
+    'search_click': 1.0,
+    'unlike': -1.0,
+}
+
+# Columns of the per-entity event count matrix; OTHER_EVENTS counts every
+# event type not listed (relevance 0)
+OTHER_EVENTS = "other"
+EVENT_TYPES = ("view", "like", "unlike", "bookmark", "unbookmark", "share", "comment", "search_click")
+EVENT_COUNT_COLUMNS = (*EVENT_TYPES, OTHER_EVENTS)
+
+# Event types content_metrics keeps counters for; content features only use these
+CONTENT_EVENT_TYPES = ("view", "like", "bookmark", "share", "comment")
+# content_metrics counters an undo event decrements (tracking-service
+# metrics_service.EVENT_DECREMENT): event type -> undo event type
+CONTENT_UNDO_EVENTS = {"like": "unlike", "bookmark": "unbookmark"}
+
+
+@dataclass(frozen=True)
+class FeatureDefinition:
+    """
+    One model feature. kind:
+      count          sum of the entity's events of `event_types` (None = all)
+      mean_relevance mean RELEVANCE_MAP label over those events (0 if none)
+      hour / weekday of the event (training) or request (serving) time
+    """
+    name: str
+    entity: str  # user | content | context
+    kind: str
+    event_types: Optional[tuple[str, ...]] = None
+
+    def _columns(self) -> list[int]:
+        types = EVENT_COUNT_COLUMNS if self.event_types is None else self.event_types
+        return [EVENT_COUNT_COLUMNS.index(event_type) for event_type in types]
+
+    def compute(self, counts: np.ndarray) -> np.ndarray:
+        """Feature values (float64) for an (entities, EVENT_COUNT_COLUMNS) count matrix."""
+        selected = counts[:, self._columns()]
+        total = selected.sum(axis=1)
+        if self.kind == "count":
+            return total
+        if self.kind == "mean_relevance":
+            weights = np.array([RELEVANCE_MAP.get(EVENT_COUNT_COLUMNS[c], 0.0) for c in self._columns()])
+            return np.divide(selected @ weights, total, out=np.zeros(len(total)), where=total > 0)
+        raise ValueError(f"{self.name} is not computed from event counts")
+
+    def compute_time(self, timestamps: pd.DatetimeIndex) -> np.ndarray:
+        if self.kind == "hour":
+            return np.asarray(timestamps.hour, dtype=np.float64)
+        if self.kind == "weekday":
+            return np.asarray(timestamps.dayofweek, dtype=np.float64)
+        raise ValueError(f"{self.name} is not computed from timestamps")
+
+
+FEATURES = (
+    FeatureDefinition("user_total_events", "user", "count"),
+    FeatureDefinition("user_total_likes", "user", "count", ("like",)),
+    FeatureDefinition("user_avg_activity", "user", "mean_relevance"),
+    FeatureDefinition("content_total_events", "content", "count", CONTENT_EVENT_TYPES),
+    FeatureDefinition("content_total_likes", "content", "count", ("like",)),
+    FeatureDefinition("content_avg_rating", "content", "mean_relevance", CONTENT_EVENT_TYPES),
+    FeatureDefinition("hour_of_day", "context", "hour"),
+    FeatureDefinition("day_of_week", "context", "weekday"),
+)
+
+USER_FEATURES = tuple(f for f in FEATURES if f.entity == "user")
+CONTENT_FEATURES = tuple(f for f in FEATURES if f.entity == "content")
+CONTEXT_FEATURES = tuple(f for f in FEATURES if f.entity == "context")
+assert FEATURES == USER_FEATURES + CONTENT_FEATURES + CONTEXT_FEATURES, "registry must be ordered by entity"
+
+USER_COLUMNS = tuple(f.name for f in USER_FEATURES)
+CONTENT_COLUMNS = tuple(f.name for f in CONTENT_FEATURES)
+CONTEXT_COLUMNS = tuple(f.name for f in CONTEXT_FEATURES)
+
+FEATURE_COLUMNS = [*USER_COLUMNS, *CONTENT_COLUMNS, *CONTEXT_COLUMNS]
+
+# Column blocks of the feature matrix
+USER_SLICE = slice(0, len(USER_COLUMNS))
+CONTENT_SLICE = slice(USER_SLICE.stop, USER_SLICE.stop + len(CONTENT_COLUMNS))
+CONTEXT_SLICE = slice(CONTENT_SLICE.stop, len(FEATURE_COLUMNS))
+
+FEATURE_SCHEMA_VERSION = hashlib.sha1(
+    repr((FEATURES, EVENT_COUNT_COLUMNS, sorted(RELEVANCE_MAP.items()), sorted(CONTENT_UNDO_EVENTS.items()))).encode()
+).hexdigest()[:12]
+
+
+def compute_features(definitions: tuple[FeatureDefinition, ...], counts: np.ndarray) -> np.ndarray:
+    """(entities, len(definitions)) float32 matrix from an event count matrix."""
+    out = np.empty((len(counts), len(definitions)), dtype=np.float32)
+    for column, definition in enumerate(definitions):
+        out[:, column] = definition.compute(counts)
+    return out
+
+
+def compute_context(timestamps: pd.DatetimeIndex) -> np.ndarray:
+    """(rows, CONTEXT_COLUMNS) float32 matrix, one row per timestamp."""
+    out = np.empty((len(timestamps), len(CONTEXT_FEATURES)), dtype=np.float32)
+    for column, definition in enumerate(CONTEXT_FEATURES):
+        out[:, column] = definition.compute_time(timestamps)
+    return out
+
+
+# ── Batch mode (training) ────────────────────────────────────────────────────
+
+# Rows of point-in-time counts converted to float64 at a time
+POINT_IN_TIME_BLOCK_ROWS = 1_000_000
+
+
+def event_type_counts(keys: np.ndarray, event_types: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (inverse, count matrix) for raw events: keys are factorised (hash, no
+    sort) and counted with one np.bincount over key × event type, instead of
+    a groupby per feature. counts[inverse] maps entity rows back to events.
+    """
+    inverse, unique = pd.factorize(keys)
+    codes = pd.Categorical(event_types, categories=EVENT_TYPES).codes.astype(np.int64)
+    codes[codes < 0] = len(EVENT_TYPES)  # OTHER_EVENTS
+    width = len(EVENT_COUNT_COLUMNS)
+    counts = np.bincount(inverse * width + codes, minlength=len(unique) * width)
+    return inverse, counts.reshape(len(unique), width).astype(np.float64)
+
+
+def point_in_time_counts(keys: np.ndarray, event_types: pd.Series) -> np.ndarray:
+    """
+    (events, EVENT_COUNT_COLUMNS) int32 matrix: for each event, the counts of
+    its key's events strictly before it — what the serving counters held
+    when the event happened. Events must be in time order. One stable sort
+    groups each key's events (keeping time order); each column is then an
+    exclusive cumulative sum restarted at every group boundary.
+    """
+    inverse, _ = pd.factorize(keys)
+    codes = pd.Categorical(event_types, categories=EVENT_TYPES).codes.astype(np.int64)
+    codes[codes < 0] = len(EVENT_TYPES)  # OTHER_EVENTS
+
+    order = np.argsort(inverse, kind="stable")
+    sorted_keys, sorted_codes = inverse[order], codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+    group_sizes = np.diff(np.r_[starts, len(keys)])
+
+    counts = np.empty((len(keys), len(EVENT_COUNT_COLUMNS)), dtype=np.int32)
+    for column in range(len(EVENT_COUNT_COLUMNS)):
+        indicator = (sorted_codes == column).astype(np.int32)
+        before = np.cumsum(indicator, dtype=np.int32) - indicator
+        before -= np.repeat(before[starts], group_sizes)
+        counts[order, column] = before
+    return counts
+
+
+def net_counter_counts(keys: np.ndarray, event_types: pd.Series, event_type: str, undo: str, point_in_time: bool) -> np.ndarray:
+    """
+    Per event, the net counter content_metrics keeps for `event_type` (+1 per
+    event, -1 per `undo`, floored at 0 after each step): its value before the
+    event with point_in_time, else the key's final value. Events must be in
+    time order. A counter floored at 0 is its running sum minus the running
+    minimum of that sum (when negative): one grouped cumsum and cummin.
+    """
+    steps = (event_types == event_type).to_numpy(dtype=np.int64) - (event_types == undo).to_numpy(dtype=np.int64)
+    inverse, unique = pd.factorize(keys)
+    total = pd.Series(steps).groupby(inverse, sort=False).cumsum()
+    after = total - np.minimum(total.groupby(inverse, sort=False).cummin(), 0)
+    if point_in_time:
+        return after.groupby(inverse, sort=False).shift(fill_value=0).to_numpy()
+    final = np.zeros(len(unique), dtype=np.int64)
+    final[inverse] = after.to_numpy()  # events in time order: the last write wins
+    return final[inverse]
+
+
+def build_training_matrix(events: pd.DataFrame, point_in_time: bool = False) -> np.ndarray:
+    """
+    FEATURE_COLUMNS matrix for tracking events (user_id, content_id,
+    event_type, created_at); context features come from each event's own
+    time. Entity features are aggregated over all events or, with
+    point_in_time (events in time order), over each entity's earlier events
+    only, so no row sees its own label or the future. Content like/bookmark
+    counts are the net content_metrics counters, replayed in row order.
+    """
+    matrix = np.empty((len(events), len(FEATURE_COLUMNS)), dtype=np.float32)
+    for definitions, block, key, undo_events in (
+        (USER_FEATURES, USER_SLICE, "user_id", {}),
+        (CONTENT_FEATURES, CONTENT_SLICE, "content_id", CONTENT_UNDO_EVENTS),
+    ):
+        keys = events[key].to_numpy()
+        if not point_in_time:
+            inverse, counts = event_type_counts(keys, events["event_type"])
+            for event_type, undo in undo_events.items():
+                counts[inverse, EVENT_COUNT_COLUMNS.index(event_type)] = net_counter_counts(keys, events["event_type"], event_type, undo, False)
+            matrix[:, block] = compute_features(definitions, counts)[inverse]
+            continue
+        counts = point_in_time_counts(keys, events["event_type"])
+        for event_type, undo in undo_events.items():
+            counts[:, EVENT_COUNT_COLUMNS.index(event_type)] = net_counter_counts(keys, events["event_type"], event_type, undo, True)
+        for start in range(0, len(counts), POINT_IN_TIME_BLOCK_ROWS):
+            rows = slice(start, start + POINT_IN_TIME_BLOCK_ROWS)
+            matrix[rows, block] = compute_features(definitions, counts[rows].astype(np.float64))
+    matrix[:, CONTEXT_SLICE] = compute_context(pd.DatetimeIndex(pd.to_datetime(events["created_at"], utc=True)))
+    return matrix
+
+
+# ── Serving mode (tracking worker counters) ──────────────────────────────────
+
+# user_features counter (maintained by the tracking worker) -> event type
+_USER_COUNTERS = {
+    "view": "total_views_given",
+    "like": "total_likes_given",
+    "unlike": "total_unlikes_given",
+    "bookmark": "total_bookmarks_given",
+    "share": "total_shares_given",
+    "comment": "total_comments_given",
+    "search_click": "total_search_clicks",
+}
+
+# content_metrics counter -> event type; like/bookmark are net counters
+# (CONTENT_UNDO_EVENTS), which build_training_matrix replays the same way
+_CONTENT_COUNTERS = {
+    "view": "total_views",
+    "like": "total_likes",
+    "bookmark": "total_bookmarks",
+    "share": "total_shares",
+    "comment": "total_comments",
+}
+
+
+def _counts_from_counters(counters, columns: dict[str, str]) -> np.ndarray:
+    """EVENT_COUNT_COLUMNS row from a counters mapping (values may be strings or None)."""
+    row = np.zeros(len(EVENT_COUNT_COLUMNS), dtype=np.float64)
+    for event_type, column in columns.items():
+        row[EVENT_COUNT_COLUMNS.index(event_type)] = float(counters.get(column) or 0)
+    return row
+
+
+def user_event_counts(counters) -> np.ndarray:
+    """
+    Event count row from a user_features row or its Redis hash mirror. The
+    tracking worker counts every event in total_events, so event types
+    without their own counter are the remainder.
+    """
+    row = _counts_from_counters(counters, _USER_COUNTERS)
+    row[-1] = max(float(counters.get("total_events") or 0) - row[:-1].sum(), 0.0)
+    return row
+
+
+def user_feature_matrix(count_rows: list[np.ndarray]) -> np.ndarray:
+    """(users, USER_COLUMNS) matrix from user_event_counts rows."""
+    counts = np.array(count_rows, dtype=np.float64).reshape(len(count_rows), len(EVENT_COUNT_COLUMNS))
+    return compute_features(USER_FEATURES, counts)
+
+
+def content_feature_matrix(rows: list[dict]) -> np.ndarray:
+    """(rows, CONTENT_COLUMNS) matrix from content_metrics rows."""
+    counts = np.array([_counts_from_counters(row, _CONTENT_COUNTERS) for row in rows], dtype=np.float64)
+    return compute_features(CONTENT_FEATURES, counts.reshape(len(rows), len(EVENT_COUNT_COLUMNS)))
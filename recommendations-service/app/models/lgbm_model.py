@@ -3,15 +3,30 @@ import os
 import joblib
 import logging
 
+import numpy as np
+
+from app.core.config import settings
+from app.models.tree_scorer import FlatTreeScorer, UnsupportedModelError, verify_scorer
+
 logger = logging.getLogger(__name__)
 
+# Filas con las que se verifica el scorer aplanado contra el Booster
+VERIFY_ROWS = 512
+
 class LGBMModel:
     def __init__(self):
         self.model = None
+        # Booster nativo usado en predict(): evita pandas y la validación del wrapper
+        self.booster = None
+        # FEATURE_SCHEMA_VERSION con la que se entrenó (None en modelos sin sello)
+        self.feature_schema_version = None
+        # Árboles aplanados en NumPy (app/models/tree_scorer.py); None si no aplica
+        self.scorer = None
 
-    def load(self, path: str):
+    def load(self, path: str, flat_scorer: bool = None):
         """
-        Carga el modelo desde un archivo .pkl o .txt.
+        Carga el modelo desde un archivo .pkl o .txt. Con flat_scorer (por
+        defecto MODEL_SCORER=flat) predict() usa los árboles aplanados.
         """
         if not os.path.exists(path):
             raise FileNotFoundError(f"Model file not found at {path}")
@@ -19,29 +34,67 @@ class LGBMModel:
         try:
             # Intentar cargar como joblib (común para sklearn/lgbm wrappers)
             self.model = joblib.load(path)
+            self.booster = getattr(self.model, "booster_", self.model)
             logger.info(f"Model loaded successfully from {path} using joblib")
         except Exception:
             try:
                 # Intentar cargar como booster nativo de LightGBM
                 self.model = lgb.Booster(model_file=path)
+                self.booster = self.model
                 logger.info(f"Model loaded successfully from {path} using lgb.Booster")
             except Exception as e:
                 logger.error(f"Failed to load model from {path}: {e}")
                 raise e
 
+        self.feature_schema_version = getattr(self.model, "feature_schema_version_", None)
+        if flat_scorer is None:
+            flat_scorer = settings.MODEL_SCORER == "flat"
+        self.scorer = self._build_scorer() if flat_scorer else None
+
+    def _build_scorer(self):
+        """
+        Aplana los árboles del Booster y comprueba que el resultado sea idéntico
+        bit a bit al de Booster.predict; si no lo es, se sigue usando el Booster.
+        """
+        try:
+            scorer = FlatTreeScorer.from_booster(self.booster)
+        except UnsupportedModelError as e:
+            logger.info(f"Flat tree scorer not used: {e}")
+            return None
+
+        # Valores aleatorios, exactamente los umbrales de los splits, ceros, ±inf y NaN
+        rng = np.random.default_rng(0)
+        sample = rng.uniform(-1, 100, size=(VERIFY_ROWS, scorer.num_features))
+        for f in range(scorer.num_features):
+            thresholds = scorer.split_thresholds(f)
+            if len(thresholds):
+                rows = rng.random(VERIFY_ROWS) < 0.5
+                sample[rows, f] = rng.choice(thresholds, size=rows.sum())
+        sample = sample.astype(np.float32)
+        sample[rng.random(sample.shape) < 0.1] = 0.0
+        sample[rng.random(sample.shape) < 0.02] = np.inf
+        sample[rng.random(sample.shape) < 0.02] = -np.inf
+        sample[rng.random(sample.shape) < 0.05] = np.nan
+        if not verify_scorer(self.booster, scorer, sample):
+            logger.warning("Flat tree scorer differs from Booster.predict; using the Booster")
+            return None
+        logger.info(f"Flat tree scorer ready: {scorer.num_trees} trees")
+        return scorer
+
     def predict(self, features):
         """
-        Realiza la predicción. Soporta tanto el Wrapper de Scikit-learn como el Booster nativo.
+        Realiza la predicción sobre una matriz float32 con las columnas de
+        FEATURE_COLUMNS (app/models/feature_schema.py), con el scorer aplanado
+        si está disponible y si no directamente con el Booster nativo, tanto si
+        se cargó el wrapper de Scikit-learn como el Booster.
         """
-        if self.model is None:
+        if self.booster is None:
             raise ValueError("Model not loaded. Call load() before predict().")
         
         try:
-            # Si es el wrapper de sklearn
-            if hasattr(self.model, 'predict'):
-                return self.model.predict(features)
-            # Si es el Booster nativo
-            return self.model.predict(features)
+            if self.scorer is not None:
+                return self.scorer.predict(features)
+            return self.booster.predict(features)
         except Exception as e:
             logger.error(f"Prediction error: {e}")
             raise e
@@ -0,0 +1,215 @@
+"""
+Flattened tree scorer — evaluates a LightGBM booster with NumPy only.
+
+The trees are flattened into one lookup table per (feature, missing-value
+handling) pair, in the QuickScorer layout: each tree keeps a bitmask of its
+leaves (leftmost leaf = lowest bit), and a split that sends a value right
+rules out every leaf of its left subtree. The splits a value sends right are
+exactly those whose threshold is below it, so after sorting a feature's
+distinct thresholds, row k of its table holds, per tree, the leaves still
+possible once the k lowest thresholds are passed — a prefix AND of the
+splits' masks. The exit leaf of each tree is the leftmost leaf surviving
+every feature's mask.
+
+Prediction is therefore one searchsorted and one row gather per feature,
+independent of tree depth, over (rows, trees) masks kept in per-thread
+scratch buffers. The lowest surviving bit is isolated and its position read
+from the exponent of its float conversion. Leaf values are then summed tree
+by tree in float64, the order LightGBM accumulates them in, which makes
+scores bit-for-bit identical to Booster.predict (verify_scorer).
+
+Missing values follow LightGBM's numerical decision: NaN is treated as 0
+unless the split's missing_type is NaN; missing_type NaN sends NaN, and
+missing_type Zero sends ±0 (and NaN), to the default_left side. Those fixed
+decisions form one extra table row, used for NaN (and, in the tables of
+missing_type Zero splits, for ±0). LightGBM also reads any |x| <=
+kZeroThreshold as exactly 0 when it builds a row, so such values are looked
+up as 0, and clamps ±inf to ±1e300 (its threshold for "every value").
+
+Only numerical splits of single-output models without an output transform
+(regression objectives), with at most 64 leaves per tree, are supported;
+anything else raises UnsupportedModelError and the caller keeps using the
+booster.
+"""
+
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+_MISSING_TYPES = {"None": 0, "Zero": 1, "NaN": 2}
+# |x| <= kZeroThreshold (a float constant in LightGBM) counts as zero
+_ZERO_THRESHOLD = float(np.float32(1e-35))
+# LightGBM's AvoidInf bound
+_MAX_VALUE = 1e300
+_IDENTITY_OBJECTIVES = ("regression", "regression_l1", "huber", "fair", "quantile", "mape", "lambdarank", "rank_xendcg")
+
+# (mask dtype, float of the same width, its exponent shift and bias) by leaves per tree
+_MASK_LAYOUTS = {
+    32: (np.uint32, np.float32, np.int32, 23, 127),
+    64: (np.uint64, np.float64, np.int64, 52, 1023),
+}
+
+
+class UnsupportedModelError(Exception):
+    """Raised for boosters the flattened scorer cannot reproduce exactly."""
+
+
+class FeatureTable(NamedTuple):
+    feature: int
+    # Distinct split thresholds, ascending
+    thresholds: np.ndarray
+    # (len(thresholds) + 2, trees) leaf masks; the last row is the fixed NaN/zero decision
+    masks: np.ndarray
+    # Splits with missing_type Zero: ±0 takes the last row too
+    zero_missing: bool
+    # Row for x == 0 (every |x| <= kZeroThreshold is read as 0)
+    zero_row: int
+
+
+class FlatTreeScorer:
+    def __init__(self, tables: list[FeatureTable], values: np.ndarray, leaf_base: np.ndarray, leaf_bits: int, num_features: int):
+        self.tables = tables
+        self.values = values
+        self.num_features = num_features
+        self.mask_dtype, self._float, self._int, self._shift, bias = _MASK_LAYOUTS[leaf_bits]
+        # Offset of each tree's first leaf in `values`, minus the exponent bias
+        self.leaf_base = (leaf_base - bias).astype(np.intp)
+        # Scratch buffers per scoring thread, grown on demand and reused
+        self._local = threading.local()
+
+    @classmethod
+    def from_booster(cls, booster) -> "FlatTreeScorer":
+        model = booster.dump_model()
+        objective = model.get("objective", "").split(" ")[0]
+        if model.get("num_tree_per_iteration", 1) != 1 or model.get("average_output"):
+            raise UnsupportedModelError("Only single-output, non-averaged boosters are supported")
+        if any(tree.get("is_linear") for tree in model["tree_info"]):
+            raise UnsupportedModelError("Linear trees are not supported")
+        if objective not in _IDENTITY_OBJECTIVES:
+            raise UnsupportedModelError(f"Objective '{objective}' needs an output transform")
+
+        values, leaf_base = [], []
+        splits = []  # (tree, feature, threshold, left subtree leaf mask, right on NaN/zero, missing_type)
+
+        def add(tree: int, node) -> int:
+            """Appends the subtree's leaves to `values`; returns their mask within the tree."""
+            if "leaf_value" in node:
+                values.append(float(node["leaf_value"]))
+                return 1 << (len(values) - 1 - leaf_base[tree])
+            if node.get("decision_type", "<=") != "<=":
+                raise UnsupportedModelError("Categorical splits are not supported")
+            left = add(tree, node["left_child"])
+            right = add(tree, node["right_child"])
+            threshold = float(node["threshold"])
+            missing = _MISSING_TYPES[node.get("missing_type", "None")]
+            # NaN becomes 0 (compared as usual) unless missing_type is NaN/Zero, which use default_left
+            special_right = 0.0 > threshold if missing == _MISSING_TYPES["None"] else not node.get("default_left", True)
+            splits.append((tree, int(node["split_feature"]), threshold, left, special_right, missing))
+            return left | right
+
+        for tree, info in enumerate(model["tree_info"]):
+            leaf_base.append(len(values))
+            add(tree, info["tree_structure"])
+        leaves_per_tree = np.diff(np.r_[leaf_base, len(values)])
+        if len(leaves_per_tree) and leaves_per_tree.max() > 64:
+            raise UnsupportedModelError(f"Trees with more than 64 leaves are not supported ({leaves_per_tree.max()})")
+        leaf_bits = 32 if not len(leaves_per_tree) or leaves_per_tree.max() <= 32 else 64
+        mask_dtype = _MASK_LAYOUTS[leaf_bits][0]
+
+        tables = []
+        groups: dict[tuple[int, bool], list] = {}
+        for split in splits:
+            groups.setdefault((split[1], split[5] == _MISSING_TYPES["Zero"]), []).append(split)
+        for (feature, zero_missing), group in sorted(groups.items()):
+            thresholds = np.unique([split[2] for split in group])
+            masks = np.full((len(thresholds) + 2, len(leaf_base)), np.iinfo(mask_dtype).max, dtype=mask_dtype)
+            for tree, _, threshold, left, special_right, _ in group:
+                keep = mask_dtype(~left & np.iinfo(mask_dtype).max)
+                # Values above the threshold (rows past its position) go right
+                masks[np.searchsorted(thresholds, threshold) + 1:len(thresholds) + 1, tree] &= keep
+                if special_right:
+                    masks[-1, tree] &= keep
+            tables.append(FeatureTable(feature, thresholds, masks, zero_missing, int(np.searchsorted(thresholds, 0.0))))
+
+        return cls(
+            tables=tables,
+            values=np.array(values, dtype=np.float64),
+            leaf_base=np.array(leaf_base, dtype=np.int64),
+            leaf_bits=leaf_bits,
+            num_features=model["max_feature_idx"] + 1,
+        )
+
+    @property
+    def num_trees(self) -> int:
+        return len(self.leaf_base)
+
+    def split_thresholds(self, feature: int) -> np.ndarray:
+        """Distinct thresholds the trees split `feature` on."""
+        return np.unique(np.concatenate(
+            [table.thresholds for table in self.tables if table.feature == feature] or [np.empty(0)]
+        ))
+
+    def _buffers(self, n_rows: int) -> dict[str, np.ndarray]:
+        """This thread's scratch buffers, sliced to `n_rows` rows."""
+        local = self._local
+        if getattr(local, "rows", 0) < n_rows:
+            rows = max(n_rows, 2 * getattr(local, "rows", 0))
+            local.rows = rows
+            local.arrays = {
+                "alive": np.empty((rows, self.num_trees), dtype=self.mask_dtype),
+                "scratch": np.empty((rows, self.num_trees), dtype=self.mask_dtype),
+                "leaf": np.empty((rows, self.num_trees), dtype=np.intp),
+                "leaves": np.empty((rows, self.num_trees), dtype=np.float64),
+                "scores": np.empty(rows, dtype=np.float64),
+            }
+        return {name: array[:n_rows] for name, array in local.arrays.items()}
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Raw scores (float64) for a (rows, num_features) matrix."""
+        X = np.asarray(features)
+        if X.ndim != 2 or X.shape[1] != self.num_features:
+            raise ValueError(f"Expected a (rows, {self.num_features}) matrix, got {X.shape}")
+        n_rows = len(X)
+        if n_rows == 0 or self.num_trees == 0:
+            return np.zeros(n_rows, dtype=np.float64)
+
+        b = self._buffers(n_rows)
+        alive, scratch = b["alive"], b["scratch"]
+        alive.fill(np.iinfo(self.mask_dtype).max)
+        for table in self.tables:
+            x = np.clip(X[:, table.feature].astype(np.float64), -_MAX_VALUE, _MAX_VALUE)
+            rows = np.searchsorted(table.thresholds, x)
+            zero = np.abs(x) <= _ZERO_THRESHOLD
+            special = np.isnan(x)
+            if table.zero_missing:
+                special |= zero
+            else:
+                rows[zero] = table.zero_row
+            rows[special] = len(table.masks) - 1
+            np.take(table.masks, rows, axis=0, out=scratch, mode="clip")
+            np.bitwise_and(alive, scratch, out=alive)
+
+        # Exit leaf: the lowest surviving bit, whose position is the exponent
+        # of its (exact) float conversion
+        np.negative(alive, out=scratch)
+        np.bitwise_and(alive, scratch, out=alive)
+        scratch.view(self._float)[...] = alive
+        exponent = scratch.view(self._int)
+        np.right_shift(exponent, self._shift, out=exponent)
+        # Straight into intp: np.take would otherwise copy narrower indices
+        leaf = np.add(exponent, self.leaf_base, out=b["leaf"])
+        leaves = np.take(self.values, leaf, out=b["leaves"], mode="clip")
+
+        # Leaf outputs, summed tree by tree in float64 as LightGBM does
+        scores = b["scores"]
+        scores[:] = 0.0
+        for tree in range(self.num_trees):
+            np.add(scores, leaves[:, tree], out=scores)
+        return scores.copy()
+
+
+def verify_scorer(booster, scorer: FlatTreeScorer, features: np.ndarray) -> bool:
+    """True when the scorer reproduces Booster.predict bit for bit on `features`."""
+    expected = np.asarray(booster.predict(features), dtype=np.float64)
+    return np.array_equal(scorer.predict(features), expected)
@@ -0,0 +1,172 @@
+"""
+Embedding Pipeline — user/item embeddings for the retrieval stage, trained by
+TrainingPipeline from the same tracking_events extract as the ranker.
+
+  1. Implicit-feedback ALS (Hu, Koren & Volinsky): the user×item matrix R holds
+     the summed positive relevance of each pair; confidence is 1 + ALPHA * R,
+     preference is R > 0. Each half-step solves the per-row normal equations
+     with the shared Gram matrix YᵀY plus the row's few observed items.
+  2. Item vectors are indexed for maximum inner product search:
+       - up to EXACT_MAX_ITEMS items: none needed, search is one V @ q.
+       - above: an IVF index; k-means centroids over the vectors, items stored
+         sorted by cluster so each inverted list is a contiguous slice.
+  3. Arrays are written as .npy under EMBEDDING_DIR/<version>/ (memory-mapped
+     by app/services/embedding_index.py) and EMBEDDING_DIR/CURRENT is switched
+     to the new version atomically.
+"""
+
+import logging
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+import scipy.sparse as sp
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FACTORS = 64
+REGULARIZATION = 0.1
+ALPHA = 40.0
+ITERATIONS = 10
+
+EXACT_MAX_ITEMS = 50000
+# Inverted lists per item: nlist = IVF_LISTS_PER_SQRT * sqrt(n_items)
+IVF_LISTS_PER_SQRT = 4
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 100000
+ASSIGN_BLOCK = 65536
+
+VERSIONS_KEPT = 2
+
+
+def _solve_rows(R: sp.csr_matrix, Y: np.ndarray, regularization: float, alpha: float) -> np.ndarray:
+    """One ALS half-step: the row factors X minimising the weighted loss given Y."""
+    factors = Y.shape[1]
+    YtY = Y.T @ Y + regularization * np.eye(factors)
+    X = np.zeros((R.shape[0], factors), dtype=np.float64)
+    for row in range(R.shape[0]):
+        start, end = R.indptr[row], R.indptr[row + 1]
+        if start == end:
+            continue
+        cols = R.indices[start:end]
+        confidence = 1.0 + alpha * R.data[start:end]
+        Y_u = Y[cols]
+        A = YtY + (Y_u.T * (confidence - 1.0)) @ Y_u
+        b = Y_u.T @ confidence
+        X[row] = np.linalg.solve(A, b)
+    return X
+
+
+def train_implicit_als(
+    R: sp.csr_matrix,
+    factors: int = FACTORS,
+    regularization: float = REGULARIZATION,
+    alpha: float = ALPHA,
+    iterations: int = ITERATIONS,
+    seed: int = 42,
+) -> tuple[np.ndarray, np.ndarray]:
+    """(user_vectors, item_vectors) as float32 for a user×item relevance matrix."""
+    rng = np.random.default_rng(seed)
+    R = R.tocsr().astype(np.float64)
+    Rt = R.T.tocsr()
+    item_vectors = rng.normal(scale=0.01, size=(R.shape[1], factors))
+    for iteration in range(iterations):
+        user_vectors = _solve_rows(R, item_vectors, regularization, alpha)
+        item_vectors = _solve_rows(Rt, user_vectors, regularization, alpha)
+        logger.info(f"ALS iteration {iteration + 1}/{iterations} done")
+    return user_vectors.astype(np.float32), item_vectors.astype(np.float32)
+
+
+def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """argmin ‖x - c‖² = argmin ‖c‖² - 2 x·c, a block of rows at a time."""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BLOCK):
+        block = vectors[start:start + ASSIGN_BLOCK]
+        assignment[start:start + len(block)] = np.argmin(centroid_norms - 2.0 * block @ centroids.T, axis=1)
+    return assignment
+
+
+def build_ivf(item_vectors: np.ndarray, seed: int = 42) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    k-means over (a sample of) the item vectors. Returns (centroids,
+    order that sorts items by list, list_offsets) with list c being
+    order[list_offsets[c]:list_offsets[c + 1]].
+    """
+    rng = np.random.default_rng(seed)
+    n_items = len(item_vectors)
+    nlist = max(1, min(n_items, int(IVF_LISTS_PER_SQRT * np.sqrt(n_items))))
+    sample = item_vectors[rng.choice(n_items, size=min(n_items, KMEANS_SAMPLE), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = _nearest_centroid(sample, centroids)
+        counts = np.bincount(assignment, minlength=nlist)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+
+    assignment = _nearest_centroid(item_vectors, centroids)
+    order = np.argsort(assignment, kind="stable")
+    list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=nlist))])
+    return centroids.astype(np.float32), order, list_offsets.astype(np.int64)
+
+
+def save_embeddings(
+    user_ids: np.ndarray,
+    user_vectors: np.ndarray,
+    item_ids: np.ndarray,
+    item_vectors: np.ndarray,
+    directory: str = None,
+) -> str:
+    """Writes a new embeddings version and points CURRENT at it; returns the version."""
+    directory = directory or settings.EMBEDDING_DIR
+    version = datetime.now().strftime("v%Y%m%d_%H%M%S")
+    version_dir = os.path.join(directory, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    user_order = np.argsort(user_ids)
+    arrays = {
+        "user_ids": user_ids[user_order].astype(np.int64),
+        "user_vectors": user_vectors[user_order].astype(np.float32),
+    }
+    if len(item_ids) > EXACT_MAX_ITEMS:
+        centroids, order, list_offsets = build_ivf(item_vectors)
+        item_ids, item_vectors = item_ids[order], item_vectors[order]
+        arrays.update(centroids=centroids, list_offsets=list_offsets)
+        logger.info(f"IVF index built: {len(centroids)} lists over {len(item_ids)} items")
+    arrays.update(item_ids=item_ids.astype(np.int64), item_vectors=np.ascontiguousarray(item_vectors, dtype=np.float32))
+
+    for name, array in arrays.items():
+        np.save(os.path.join(version_dir, f"{name}.npy"), array)
+
+    current_tmp = os.path.join(directory, f"CURRENT.tmp-{os.getpid()}")
+    with open(current_tmp, "w") as f:
+        f.write(version)
+    os.replace(current_tmp, os.path.join(directory, "CURRENT"))
+
+    # Older versions may still be mapped by running processes; keep the previous one
+    versions = sorted(name for name in os.listdir(directory) if name.startswith("v"))
+    for old in versions[:-VERSIONS_KEPT]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+
+    logger.info(f"Embeddings {version} saved: {len(user_ids)} users, {len(item_ids)} items")
+    return version
+
+
+def train_embeddings(user_ids: np.ndarray, content_ids: np.ndarray, relevance: np.ndarray) -> str:
+    """Trains ALS on positive (user, content, relevance) rows and saves the embeddings."""
+    positive = relevance > 0
+    user_ids, content_ids, relevance = user_ids[positive], content_ids[positive], relevance[positive]
+    users, user_idx = np.unique(user_ids, return_inverse=True)
+    items, item_idx = np.unique(content_ids, return_inverse=True)
+
+    R = sp.csr_matrix((relevance.astype(np.float64), (user_idx, item_idx)), shape=(len(users), len(items)))
+    R.sum_duplicates()
+    logger.info(f"Training implicit ALS on {R.nnz} (user, content) pairs...")
+    user_vectors, item_vectors = train_implicit_als(R)
+    return save_embeddings(users, user_vectors, items, item_vectors)
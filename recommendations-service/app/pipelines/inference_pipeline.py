@@ -1,66 +1,154 @@
 """
 Inference Pipeline — Orchestrates the recommendation generation process.
 
-Architecture:
-  1. Candidate Retrieval (fast, from Redis/DB)
-  2. Feature Engineering (build feature matrix from real data)
-  3. Model Scoring (LightGBM ranking)
+Architecture (async end to end):
+  1. Candidate Retrieval (fast, from Redis/DB) — concurrently with the
+     user-feature fetch; each DB fetch uses its own AsyncSession
+  2. Content features for the retrieved candidates (in-process store,
+     app/services/content_feature_store.py)
+  3. Feature Engineering + Model Scoring (LightGBM ranking) on the bounded
+     scoring executor (app/services/scoring_executor.py)
   4. Post-processing (top-N selection)
 
-The LightGBM model is loaded ONCE at module import (singleton) to avoid
-disk I/O on every request.
+The ranking model is owned by the model registry (app/services/model_registry.py),
+which hot-swaps validated new versions. Each pipeline pins the version live
+when it was created, so one request scores with one model; that version keys
+cached results (app/cache/result_cache.py) and is returned to callers.
 """
 
+import asyncio
 import logging
+from typing import Optional
 
-import redis
-from sqlalchemy.orm import Session
+import numpy as np
+import redis.asyncio
+from prometheus_client import Counter
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from app.core.config import settings
-from app.models.lgbm_model import LGBMModel
+from app.cache.redis_client import get_async_redis
+from app.database.connection import AsyncSessionLocal
 from app.services.candidate_generation import CandidateGenerationService
 from app.services.feature_engineering import FeatureEngineeringService
+from app.services.model_registry import LoadedModel, get_model_registry
 from app.services.ranking_service import RankingService
+from app.services.scoring_executor import ScoringOverloaded, run_scoring
 
 logger = logging.getLogger(__name__)
 
-# ---- Singleton: load model ONCE at startup, NOT per-request ----
-_model = LGBMModel()
-_model_loaded = False
-try:
-    _model.load(settings.MODEL_PATH)
-    _model_loaded = True
-    logger.info("LightGBM model loaded successfully from %s", settings.MODEL_PATH)
-except Exception as e:
-    logger.warning("Could not load LightGBM model from %s: %s. Running in Fallback Mode.", settings.MODEL_PATH, e)
+RECOMMENDATIONS_SCORED = Counter(
+    "recommendations_scored_total",
+    "Users whose candidates were ranked by the model, by model version",
+    ["model_version"],
+)
 
 
 class InferencePipeline:
-    def __init__(self, db: Session, cache: redis.Redis):
-        self.db = db
+    def __init__(
+        self,
+        cache: redis.asyncio.Redis,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        model: Optional[LoadedModel] = None,
+    ):
         self.cache = cache
-        self.candidate_gen = CandidateGenerationService(self.cache, self.db)
-        self.feature_eng = FeatureEngineeringService(self.db, self.cache)
-        self.ranker = RankingService(_model)
+        self.candidate_gen = CandidateGenerationService(self.cache, session_factory)
+        self.feature_eng = FeatureEngineeringService(session_factory, self.cache)
+        # Pinned for the whole request, even if the registry swaps meanwhile
+        self.model = model or get_model_registry().current
+        self.ranker = RankingService(self.model.model)
 
-    def run(self, user_id: int, limit: int = 10) -> list[int]:
-        # 1. Candidate Retrieval
-        candidates = self.candidate_gen.get_candidates(user_id, limit=limit * 5)
+    @property
+    def model_version(self) -> str:
+        return self.model.version
+
+    async def run(self, user_id: int, limit: int = 10) -> list[int]:
+        # 1. Candidate Retrieval (+ user features, independent of the candidates)
+        candidates, user_features = await asyncio.gather(
+            self.candidate_gen.get_candidates(user_id, limit=limit * 5),
+            self.feature_eng.get_user_features(user_id),
+        )
 
         if not candidates:
             logger.info("Cold start for user %d — returning popular items", user_id)
-            return self.candidate_gen.get_popular_items(limit)
+            return await self.candidate_gen.get_popular_items(limit)
 
-        # 2. Feature Engineering
-        features_df = self.feature_eng.build_features(user_id, candidates)
+        # 2. Content features for the retrieved candidates
+        content_features = await self.feature_eng.get_content_features(candidates)
 
-        # 3. Model Scoring
-        if _model_loaded and not features_df.empty:
-            ranked_items = self.ranker.rank_candidates(user_id, candidates, features_df)
-        else:
+        # 3. Feature Engineering + Model Scoring
+        ranked_items = None
+        if self.model.loaded:
+            try:
+                ranked_items = await run_scoring(self._score, user_id, candidates, user_features, content_features)
+                RECOMMENDATIONS_SCORED.labels(model_version=self.model.version).inc()
+            except ScoringOverloaded as e:
+                logger.warning("Scoring overloaded (%s): returning candidates unranked.", e)
+        if ranked_items is None:
             logger.debug("Fallback mode: returning candidates sorted by engagement.")
             ranked_items = [(c, 1.0) for c in candidates]
 
         # 4. Top-N selection
         return [item_id for item_id, _score in ranked_items[:limit]]
 
+    def _score(self, user_id: int, candidates: list[int], user_features: np.ndarray, content_features):
+        """CPU-bound part of the pipeline; runs on the scoring executor."""
+        features = self.feature_eng.build_features(user_id, candidates, user_features, content_features)
+        if len(features) == 0:
+            return None
+        return self.ranker.rank_candidates(user_id, candidates, features)
+
+    async def run_batch(self, user_ids: list[int], limit: int = 10) -> dict[int, list[int]]:
+        """
+        Batch variant of run(): set-based fetches for all users, one stacked
+        feature matrix and one predict call. Returns {user_id: [item_id, ...]}.
+        """
+        user_candidates, user_features = await asyncio.gather(
+            self.candidate_gen.get_candidates_many(user_ids, limit=limit * 5),
+            self.feature_eng.get_user_features_many(user_ids),
+        )
+
+        results = {}
+        cold_start = [user_id for user_id in user_ids if user_id not in user_candidates]
+        if cold_start:
+            logger.info("Cold start for %d of %d users — returning popular items", len(cold_start), len(user_ids))
+            popular = await self.candidate_gen.get_popular_items(limit)
+            results.update({user_id: popular for user_id in cold_start})
+
+        if not user_candidates:
+            return results
+
+        all_candidates = list({c for candidates in user_candidates.values() for c in candidates})
+        content_features = await self.feature_eng.get_content_features(all_candidates)
+
+        ranked = None
+        if self.model.loaded:
+            try:
+                ranked = await run_scoring(self._score_batch, user_candidates, user_features, content_features)
+                RECOMMENDATIONS_SCORED.labels(model_version=self.model.version).inc(len(user_candidates))
+            except ScoringOverloaded as e:
+                logger.warning("Scoring overloaded (%s): returning batch candidates unranked.", e)
+        if ranked is None:
+            ranked = {user_id: [(c, 1.0) for c in candidates] for user_id, candidates in user_candidates.items()}
+
+        for user_id, ranked_items in ranked.items():
+            results[user_id] = [item_id for item_id, _score in ranked_items[:limit]]
+        return results
+
+    def _score_batch(self, user_candidates: dict[int, list[int]], user_features: dict[int, np.ndarray], content_features):
+        """CPU-bound part of run_batch(); runs on the scoring executor."""
+        features = self.feature_eng.build_batch_features(user_candidates, user_features, content_features)
+        if len(features) == 0:
+            return None
+        return self.ranker.rank_batch(user_candidates, features)
+
+
+def get_model_version() -> str:
+    return get_model_registry().current.version
+
+
+async def recommend(user_id: int, limit: int = 10, model: Optional[LoadedModel] = None) -> list[int]:
+    """
+    Runs the pipeline on fresh sessions, so it can outlive the request that
+    triggered it (background cache refreshes). `model` pins the version the
+    result will be cached under.
+    """
+    return await InferencePipeline(get_async_redis(), model=model).run(user_id, limit=limit)
@@ -0,0 +1,133 @@
+"""
+Item Index Pipeline — offline item-to-item co-engagement index.
+
+  1. Streams distinct (user_id, content_id) positives (like, bookmark, view —
+     the get_user_positive_content_ids semantics) from the last
+     ITEM_INDEX_LOOKBACK_DAYS through a server-side cursor.
+  2. Builds the binary user×item CSR matrix X and computes item-item
+     co-occurrence X^T X with scipy, a block of items at a time, scaled to
+     cosine similarity count(i,j) / sqrt(count(i) * count(j)).
+  3. Keeps the top ITEM_INDEX_TOP_K neighbours per item and writes
+        item_ids   int64  (n,)    sorted content ids (row lookup by searchsorted)
+        neighbors  int32  (n, K)  neighbour content ids, -1 padded
+        scores     float32 (n, K) cosine similarity, 0 padded
+     to ITEM_INDEX_PATH (.npz, replaced atomically).
+"""
+
+import logging
+import os
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.database.connection import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+POSITIVE_EVENT_TYPES = ("like", "bookmark", "view")
+# Pairs co-engaged by fewer users are noise
+MIN_COOCCURRENCE = 2
+# Items per X^T X block; bounds the size of each sparse product
+BLOCK_ITEMS = 2048
+STREAM_BATCH_ROWS = 50000
+
+
+def build_neighbors(
+    user_ids: np.ndarray,
+    content_ids: np.ndarray,
+    top_k: int,
+    min_cooccurrence: int = MIN_COOCCURRENCE,
+    block_items: int = BLOCK_ITEMS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Top-K cosine neighbours per item from (user, item) positive pairs."""
+    items, item_idx = np.unique(content_ids, return_inverse=True)
+    _, user_idx = np.unique(user_ids, return_inverse=True)
+    n_items = len(items)
+
+    X = sp.csr_matrix(
+        (np.ones(len(item_idx), dtype=np.float32), (user_idx, item_idx)),
+        shape=(int(user_idx.max()) + 1 if len(user_idx) else 0, n_items),
+    )
+    X.sum_duplicates()
+    X.data[:] = 1.0
+    Xt = X.T.tocsr()
+    norms = np.sqrt(np.asarray(X.sum(axis=0), dtype=np.float64).ravel())
+
+    neighbors = np.full((n_items, top_k), -1, dtype=np.int32)
+    scores = np.zeros((n_items, top_k), dtype=np.float32)
+
+    for start in range(0, n_items, block_items):
+        block = (Xt[start:start + block_items] @ X).tocoo()
+        rows, cols, counts = block.row, block.col, block.data
+        keep = (cols != rows + start) & (counts >= min_cooccurrence)
+        rows, cols = rows[keep], cols[keep]
+        sims = counts[keep] / (norms[rows + start] * norms[cols])
+
+        # Per row, highest similarity first; rank within the row = position - row start
+        order = np.lexsort((-sims, rows))
+        rows, cols, sims = rows[order], cols[order], sims[order]
+        row_start = np.searchsorted(rows, rows, side="left")
+        rank = np.arange(len(rows)) - row_start
+        top = rank < top_k
+
+        neighbors[rows[top] + start, rank[top]] = items[cols[top]]
+        scores[rows[top] + start, rank[top]] = sims[top]
+
+    return items.astype(np.int64), neighbors, scores
+
+
+class ItemIndexPipeline:
+    def __init__(self):
+        self.index_path = settings.ITEM_INDEX_PATH
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+
+    def extract_positives(self) -> tuple[np.ndarray, np.ndarray]:
+        """Paso 1 (ETL): (user_ids, content_ids) of distinct positive pairs."""
+        logger.info("Extracting positive interactions from Tracking DB...")
+        engine = create_engine(DATABASE_URL, poolclass=NullPool)
+        chunks = []
+        try:
+            with engine.connect() as conn:
+                result = conn.execution_options(stream_results=True, yield_per=STREAM_BATCH_ROWS).execute(text("""
+                    SELECT DISTINCT user_id, content_id
+                    FROM tracking_events
+                    WHERE event_type = ANY(:event_types)
+                      AND content_id > 0
+                      AND created_at > NOW() - make_interval(days => :days)
+                """), {"event_types": list(POSITIVE_EVENT_TYPES), "days": settings.ITEM_INDEX_LOOKBACK_DAYS})
+                for partition in result.partitions():
+                    chunks.append(np.array(partition, dtype=np.int64))
+        finally:
+            engine.dispose()
+
+        pairs = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int64)
+        logger.info(f"Loaded {len(pairs)} positive (user, content) pairs.")
+        return pairs[:, 0], pairs[:, 1]
+
+    def save(self, item_ids: np.ndarray, neighbors: np.ndarray, scores: np.ndarray):
+        """Writes the index next to the final path and renames it into place."""
+        tmp_path = f"{self.index_path}.tmp-{os.getpid()}.npz"
+        np.savez(tmp_path, item_ids=item_ids, neighbors=neighbors, scores=scores)
+        os.replace(tmp_path, self.index_path)
+        size_mb = os.path.getsize(self.index_path) / 1e6
+        logger.info(f"Item index saved to {self.index_path} ({len(item_ids)} items, {size_mb:.1f} MB)")
+
+    def run(self) -> bool:
+        start = time.time()
+        try:
+            user_ids, content_ids = self.extract_positives()
+            if len(content_ids) == 0:
+                logger.warning("No positive interactions found; item index not rebuilt.")
+                return False
+
+            item_ids, neighbors, scores = build_neighbors(user_ids, content_ids, settings.ITEM_INDEX_TOP_K)
+            self.save(item_ids, neighbors, scores)
+            logger.info(f"Item index built in {time.time() - start:.1f}s")
+            return True
+        except Exception as e:
+            logger.error(f"Item index pipeline failed: {e}")
+            return False
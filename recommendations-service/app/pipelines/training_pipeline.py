@@ -1,12 +1,15 @@
 import pandas as pd
 import lightgbm as lgb
-from sqlalchemy import create_engine
+import redis
 from app.core.config import settings
+from app.models.feature_schema import FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION, RELEVANCE_MAP, build_training_matrix
+from app.pipelines.embedding_pipeline import train_embeddings
+from app.pipelines.event_extract import EventExtractor
+from app.services.model_registry import MODEL_VERSION_KEY
 import logging
 import os
 import joblib
 from datetime import datetime
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error
 import numpy as np
 from dotenv import load_dotenv
@@ -26,13 +29,12 @@ class TrainingPipeline:
 
     def extract_data(self) -> pd.DataFrame:
         """
-        Paso 1 (ETL): Extrae eventos de interacción.
+        Paso 1 (ETL): Extrae eventos de interacción de la ventana de
+        entrenamiento, por lotes y reutilizando la caché local (solo filas nuevas).
         """
         logger.info("Extracting interaction data from Tracking DB...")
         try:
-            engine = create_engine(self.tracking_db_url)
-            query = "SELECT user_id, content_id, event_type, event_value, created_at FROM tracking_events"
-            df = pd.read_sql(query, engine)
+            df = EventExtractor(self.tracking_db_url).extract()
             logger.info(f"Loaded {len(df)} tracking events.")
             return df
         except Exception as e:
@@ -41,97 +43,166 @@ class TrainingPipeline:
 
     def engineer_features_and_labels(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Paso 2: Transforma crudos a matriz numérica LightGBM.
+        Paso 2: Transforma crudos a matriz numérica LightGBM, en orden temporal.
+        Las features de cada evento son "point-in-time": solo cuentan los
+        eventos anteriores del usuario/contenido (lo que la inferencia vería en
+        ese momento), sin fuga del propio label ni del futuro.
         """
         logger.info("Engineering labels and features...")
         
         if df.empty:
             return df
 
-        # Mapeo de Relevancia (Target Y)
-        relevance_map = {
-            'like': 3.0,
-            'bookmark': 3.0,
-            'share': 2.0,
-            'comment': 2.0,
-            'view': 1.0,
-            'search_click': 1.0,
-            'unlike': -1.0
-        }
-        
-        df['label'] = df['event_type'].map(relevance_map).fillna(0.0)
-        
-        # Features a Nivel Usuario (Agregaciones Históricas)
-        user_stats = df.groupby('user_id').agg(
-            user_total_events=('event_type', 'count'),
-            user_total_likes=('event_type', lambda x: (x == 'like').sum()),
-            user_avg_activity=('label', 'mean')
-        ).reset_index()
+        df = df.sort_values('created_at', kind='stable', ignore_index=True)
 
-        # Features a Nivel Contenido
-        content_stats = df.groupby('content_id').agg(
-            content_total_events=('event_type', 'count'),
-            content_total_likes=('event_type', lambda x: (x == 'like').sum()),
-            content_avg_rating=('label', 'mean')
-        ).reset_index()
+        # Mapeo de Relevancia (Target Y), compartido con la inferencia
+        df['label'] = df['event_type'].map(RELEVANCE_MAP).astype(np.float64).fillna(0.0)
 
-        # Merge de las agrupaciones con el dataset original
-        df = df.merge(user_stats, on='user_id', how='left')
-        df = df.merge(content_stats, on='content_id', how='left')
+        # Features de usuario, contenido y contexto: mismas definiciones que en
+        # la inferencia (registro de app/models/feature_schema.py), en modo batch
+        features = pd.DataFrame(build_training_matrix(df, point_in_time=True), columns=FEATURE_COLUMNS, index=df.index)
+        return pd.concat([df, features], axis=1)
 
-        # Features Contextuales
-        df['created_at'] = pd.to_datetime(df['created_at'])
-        df['hour_of_day'] = df['created_at'].dt.hour
-        df['day_of_week'] = df['created_at'].dt.dayofweek
+    def publish_model_version(self, versioned_filename: str):
+        """
+        Anuncia la versión nueva en Redis (model:current_version); el registro de
+        modelos de cada worker la valida y la carga en caliente.
+        """
+        try:
+            redis.Redis.from_url(settings.REDIS_URL).set(MODEL_VERSION_KEY, versioned_filename)
+            logger.info(f"Published model version {versioned_filename}")
+        except redis.RedisError as e:
+            logger.warning(f"Could not publish model version (workers fall back to watching model.lgb): {e}")
 
-        # Tratamiento de nulos (si es el primer evento de un user o content)
-        df.fillna(0, inplace=True)
+    def train_embeddings(self, df: pd.DataFrame):
+        """
+        Paso 7: Embeddings usuario/contenido para la etapa de recuperación,
+        entrenados con la misma relevancia que el ranker.
+        """
+        try:
+            return train_embeddings(
+                df['user_id'].to_numpy(dtype=np.int64),
+                df['content_id'].to_numpy(dtype=np.int64),
+                df['label'].to_numpy(dtype=np.float64),
+            )
+        except Exception as e:
+            logger.error(f"Embedding training failed: {e}")
+            return None
 
-        return df
+    def temporal_split(self, df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Paso 3: Holdout temporal: se valida con la última fracción
+        TRAINING_HOLDOUT_FRACTION de los eventos (por fecha), entrenando solo
+        con los anteriores, como ocurre al servir.
+        """
+        cutoff = df['created_at'].quantile(1.0 - settings.TRAINING_HOLDOUT_FRACTION)
+        return df[df['created_at'] < cutoff], df[df['created_at'] >= cutoff]
 
-    def run(self) -> dict:
+    def load_previous_model(self):
+        """
+        Modelo actual (MODEL_PATH) del que continuar en modo incremental, o None
+        si no existe, es de otro esquema de features o ya tiene demasiados árboles.
+        """
+        try:
+            model = joblib.load(settings.MODEL_PATH)
+        except Exception as e:
+            logger.info(f"No previous model to warm-start from: {e}")
+            return None
+        if getattr(model, "feature_schema_version_", None) != FEATURE_SCHEMA_VERSION:
+            logger.info("Previous model uses another feature schema; full retrain.")
+            return None
+        if getattr(model, "trained_until_", None) is None:
+            logger.info("Previous model has no training watermark; full retrain.")
+            return None
+        if model.booster_.num_trees() + settings.TRAINING_INCREMENTAL_TREES > settings.TRAINING_MAX_TREES:
+            logger.info(f"Previous model has {model.booster_.num_trees()} trees; full retrain.")
+            return None
+        return model
+
+    def fit_model(self, df: pd.DataFrame, previous=None) -> lgb.LGBMRegressor:
+        """
+        Paso 4: Entrena el ranker con las filas de `df` (continuando `previous`
+        si se da) y lo sella con el esquema de features y la marca trained_until_.
+        """
+        model = lgb.LGBMRegressor(
+            n_estimators=settings.TRAINING_INCREMENTAL_TREES if previous is not None else 100,
+            learning_rate=0.05,
+            max_depth=6,
+            random_state=42
+        )
+        # Mismo orden de columnas que la matriz de inferencia
+        model.fit(df[FEATURE_COLUMNS], df['label'], init_model=previous.booster_ if previous is not None else None)
+        # Versión del registro de features con la que se entrenó; el registro de
+        # modelos rechaza el modelo si la inferencia usa otra
+        model.feature_schema_version_ = FEATURE_SCHEMA_VERSION
+        # Último evento visto en entrenamiento: el siguiente incremental parte de aquí
+        model.trained_until_ = df['created_at'].max()
+        return model
+
+    def run(self, incremental: bool = False, progress=None) -> dict:
         """
         Paso 3, 4 y 5: Ciclo Maestro (Extract, Preprocess, Split, Train, Evaluate, y VERSIONADO).
+        En modo incremental continúa el modelo anterior (init_model) con
+        TRAINING_INCREMENTAL_TREES árboles entrenados solo con los eventos
+        posteriores a su marca trained_until_. El holdout temporal solo mide
+        (y decide si se publica): el modelo publicado se reentrena con toda la
+        ventana, holdout incluido, para no servir sin los eventos más recientes.
+        `progress(step)` se llama al empezar cada paso (registro del job en el
+        training runner).
         """
+        progress = progress or (lambda step: None)
         try:
             # 1. ETL
+            progress("extract")
             raw_data = self.extract_data()
             if raw_data.empty:
                 logger.warning("No data found to train on.")
                 return {"status": "error", "message": "No data in database"}
 
-            # 2. Preprocessing
+            # 2. Preprocessing (features sobre todo el historial disponible)
+            progress("features")
             processed_data = self.engineer_features_and_labels(raw_data)
-            
-            features = [
-                'user_total_events', 'user_total_likes', 'user_avg_activity',
-                'content_total_events', 'content_total_likes', 'content_avg_rating',
-                'hour_of_day', 'day_of_week'
-            ]
-            
-            X = processed_data[features]
-            y = processed_data['label']
 
-            # 3. Train / Test Split
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+            previous = self.load_previous_model() if incremental else None
+            data = processed_data
+            if previous is not None:
+                data = processed_data[processed_data['created_at'] > previous.trained_until_]
+                if len(data) < 2:
+                    logger.info("No new events since the previous model; nothing to train.")
+                    return {"status": "skipped", "message": "No new events"}
+
+            # 3. Train / Test Split temporal
+            train, test = self.temporal_split(data)
+            if train.empty or test.empty:
+                return {"status": "error", "message": "Not enough events for a temporal holdout"}
+            X_test, y_test = test[FEATURE_COLUMNS], test['label']
 
             # 4. Training
-            logger.info("Starting LightGBM Training...")
-            model = lgb.LGBMRegressor(
-                n_estimators=100,
-                learning_rate=0.05,
-                max_depth=6,
-                random_state=42
-            )
-            
-            model.fit(X_train, y_train)
+            mode = "incremental" if previous is not None else "full"
+            progress(f"train_{mode}")
+            logger.info(f"Starting LightGBM Training ({mode}, {len(train)} rows)...")
+            model = self.fit_model(train, previous)
 
-            # 5. Evaluation
+            # 5. Evaluation (holdout temporal)
+            progress("evaluate")
             predictions = model.predict(X_test)
             rmse = float(np.sqrt(mean_squared_error(y_test, predictions)))
-            logger.info(f"Model Training completed. Validation RMSE: {rmse:.4f}")
+            logger.info(f"Model Training completed. Temporal holdout RMSE: {rmse:.4f}")
+            if previous is not None:
+                previous_rmse = float(np.sqrt(mean_squared_error(y_test, previous.predict(X_test))))
+                logger.info(f"Previous model on the same holdout: RMSE {previous_rmse:.4f}")
+                if rmse > previous_rmse:
+                    logger.warning("Warm-started model is worse than the current one; not publishing it.")
+                    return {"status": "rejected", "mode": mode, "rmse": rmse, "previous_rmse": previous_rmse}
+
+            # Reentrenamiento con toda la ventana (holdout incluido): trained_until_
+            # pasa a ser el último evento, que el modelo publicado ya ha visto
+            progress("refit")
+            logger.info(f"Refitting on the full window ({len(data)} rows)...")
+            model = self.fit_model(data, previous)
 
             # 6. Save Versioned Model (Historial de Versiones)
+            progress("save")
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             versioned_filename = f"model_v{timestamp}.lgb"
             save_path = os.path.join(self.model_save_dir, versioned_filename)
@@ -139,15 +210,26 @@ class TrainingPipeline:
             joblib.dump(model, save_path)
             logger.info(f"Versioned model saved successfully as: {versioned_filename}")
             
-            # También guardamos en 'model.lgb' (el puntero persistente para el motor de inferencia)
+            # También guardamos en 'model.lgb' (el puntero persistente para el motor de inferencia).
+            # Se escribe aparte y se renombra: el registro nunca lee un archivo a medias.
             latest_path = os.path.join(self.model_save_dir, "model.lgb")
-            joblib.dump(model, latest_path)
+            tmp_path = f"{latest_path}.tmp-{os.getpid()}"
+            joblib.dump(model, tmp_path)
+            os.replace(tmp_path, latest_path)
+            self.publish_model_version(versioned_filename)
+
+            # 7. Embeddings de recuperación (ALS implícito); un fallo no invalida el ranker
+            progress("embeddings")
+            embedding_version = self.train_embeddings(processed_data)
 
             return {
                 "status": "success",
+                "mode": mode,
                 "rmse": rmse,
                 "model_version": versioned_filename,
-                "dataset_size": len(X)
+                "feature_schema_version": FEATURE_SCHEMA_VERSION,
+                "embedding_version": embedding_version,
+                "dataset_size": len(data)
             }
 
         except Exception as e:
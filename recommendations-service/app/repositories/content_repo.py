@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 import logging
 
@@ -8,16 +8,16 @@ logger = logging.getLogger(__name__)
 class ContentRepository:
     """Reads content metadata and aggregated metrics from the shared Postgres database."""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_top_content_by_engagement(self, limit: int = 50, exclude_ids: list[int] = None):
+    async def get_top_content_by_engagement(self, limit: int = 50, exclude_ids: list[int] = None):
         """
         Returns the top content IDs sorted by engagement_rate from content_metrics.
         Optionally excludes content the user has already interacted with.
         """
         if exclude_ids:
-            result = self.db.execute(text("""
+            result = await self.db.execute(text("""
                 SELECT content_id, engagement_rate, total_views, total_likes
                 FROM content_metrics
                 WHERE content_id != ALL(:exclude_ids)
@@ -25,7 +25,7 @@ class ContentRepository:
                 LIMIT :limit
             """), {"exclude_ids": exclude_ids, "limit": limit})
         else:
-            result = self.db.execute(text("""
+            result = await self.db.execute(text("""
                 SELECT content_id, engagement_rate, total_views, total_likes
                 FROM content_metrics
                 ORDER BY engagement_rate DESC, total_views DESC
@@ -34,7 +34,7 @@ class ContentRepository:
 
         return [dict(row._mapping) for row in result]
 
-    def get_content_features(self, content_ids: list[int]) -> list[dict]:
+    async def get_content_features(self, content_ids: list[int]) -> list[dict]:
         """
         Returns feature vectors for a list of content IDs from content_metrics.
         Used by the feature engineering service to build the model input.
@@ -42,7 +42,7 @@ class ContentRepository:
         if not content_ids:
             return []
 
-        result = self.db.execute(text("""
+        result = await self.db.execute(text("""
             SELECT content_id, total_views, total_likes, total_bookmarks,
                    total_shares, total_comments, avg_watch_time,
                    completion_rate, engagement_rate
@@ -52,9 +52,43 @@ class ContentRepository:
 
         return [dict(row._mapping) for row in result]
 
-    def get_all_content_ids(self, limit: int = 1000) -> list[int]:
+    async def get_content_features_since(self, since=None) -> list[dict]:
+        """
+        Feature rows updated at or after `since` (all rows when None), oldest
+        first. Feeds the in-process content feature store.
+        """
+        if since is None:
+            result = await self.db.execute(text("""
+                SELECT content_id, total_views, total_likes, total_bookmarks,
+                       total_shares, total_comments, updated_at
+                FROM content_metrics
+            """))
+        else:
+            result = await self.db.execute(text("""
+                SELECT content_id, total_views, total_likes, total_bookmarks,
+                       total_shares, total_comments, updated_at
+                FROM content_metrics
+                WHERE updated_at >= :since
+                ORDER BY updated_at
+            """), {"since": since})
+
+        return [dict(row._mapping) for row in result]
+
+    async def get_fresh_content_ids(self, limit: int = 200) -> list[int]:
+        """Most recently published content (API contenidos table), newest first."""
+        result = await self.db.execute(text("""
+            SELECT c.id_contenido
+            FROM contenidos c
+            JOIN estados_contenido ec ON ec.id_estado_contenido = c.id_estado_contenido
+            WHERE ec.codigo = 'publicado'
+            ORDER BY c.fecha_creacion DESC
+            LIMIT :limit
+        """), {"limit": limit})
+        return [row[0] for row in result]
+
+    async def get_all_content_ids(self, limit: int = 1000) -> list[int]:
         """Returns all available content IDs (for candidate pool)."""
-        result = self.db.execute(text("""
+        result = await self.db.execute(text("""
             SELECT content_id FROM content_metrics
             ORDER BY updated_at DESC
             LIMIT :limit
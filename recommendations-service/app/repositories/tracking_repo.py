@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 import logging
 
@@ -8,12 +8,12 @@ logger = logging.getLogger(__name__)
 class TrackingRepository:
     """Reads tracking event data from the shared Postgres database."""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_user_interactions(self, user_id: int, limit: int = 200):
+    async def get_user_interactions(self, user_id: int, limit: int = 200):
         """Returns recent tracking events for a given user."""
-        result = self.db.execute(text("""
+        result = await self.db.execute(text("""
             SELECT content_id, event_type, event_value, created_at
             FROM tracking_events
             WHERE user_id = :user_id
@@ -22,18 +22,34 @@ class TrackingRepository:
         """), {"user_id": user_id, "limit": limit})
         return [dict(row._mapping) for row in result]
 
-    def get_interacted_content_ids(self, user_id: int) -> list[int]:
+    async def get_interacted_content_ids(self, user_id: int) -> list[int]:
         """Returns distinct content IDs the user has interacted with (for exclusion)."""
-        result = self.db.execute(text("""
-            SELECT DISTINCT content_id
-            FROM tracking_events
+        result = await self.db.execute(text("""
+            SELECT content_id
+            FROM user_seen_content
             WHERE user_id = :user_id
         """), {"user_id": user_id})
         return [row[0] for row in result]
 
-    def get_user_positive_content_ids(self, user_id: int) -> list[int]:
+    async def get_interacted_content_ids_for_users(self, user_ids: list[int]) -> dict[int, list[int]]:
+        """Set-based variant of get_interacted_content_ids: {user_id: [content_id, ...]}."""
+        if not user_ids:
+            return {}
+
+        result = await self.db.execute(text("""
+            SELECT user_id, content_id
+            FROM user_seen_content
+            WHERE user_id = ANY(:user_ids)
+        """), {"user_ids": user_ids})
+
+        seen: dict[int, list[int]] = {}
+        for user_id, content_id in result:
+            seen.setdefault(user_id, []).append(content_id)
+        return seen
+
+    async def get_user_positive_content_ids(self, user_id: int) -> list[int]:
         """Returns content IDs the user liked, bookmarked, or watched significantly."""
-        result = self.db.execute(text("""
+        result = await self.db.execute(text("""
             SELECT DISTINCT content_id
             FROM tracking_events
             WHERE user_id = :user_id
@@ -41,9 +57,36 @@ class TrackingRepository:
         """), {"user_id": user_id})
         return [row[0] for row in result]
 
-    def count_user_events(self, user_id: int) -> int:
+    async def get_recent_positive_content_ids_for_users(self, user_ids: list[int], limit: int) -> dict[int, list[int]]:
+        """
+        Set-based, recency-bounded variant of get_user_positive_content_ids:
+        up to `limit` most recently engaged positives per user.
+        """
+        if not user_ids:
+            return {}
+
+        result = await self.db.execute(text("""
+            SELECT user_id, content_id
+            FROM (
+                SELECT user_id, content_id,
+                       ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY MAX(created_at) DESC) AS rn
+                FROM tracking_events
+                WHERE user_id = ANY(:user_ids)
+                  AND event_type IN ('like', 'bookmark', 'view')
+                  AND content_id > 0
+                GROUP BY user_id, content_id
+            ) recent
+            WHERE rn <= :limit
+        """), {"user_ids": user_ids, "limit": limit})
+
+        positives: dict[int, list[int]] = {}
+        for user_id, content_id in result:
+            positives.setdefault(user_id, []).append(content_id)
+        return positives
+
+    async def count_user_events(self, user_id: int) -> int:
         """Returns total event count for a user (used for cold start detection)."""
-        result = self.db.execute(text("""
-            SELECT COUNT(*) FROM tracking_events WHERE user_id = :user_id
+        result = await self.db.execute(text("""
+            SELECT total_events FROM user_features WHERE user_id = :user_id
         """), {"user_id": user_id})
         return result.scalar() or 0
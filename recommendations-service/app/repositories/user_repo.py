@@ -1,44 +1,50 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 import logging
 
+import numpy as np
+
+from app.models.feature_schema import user_event_counts
+
 logger = logging.getLogger(__name__)
 
 
 class UserRepository:
-    """Reads aggregated user preference data from the shared Postgres database."""
+    """
+    Reads aggregated user preference data from the shared Postgres database.
+    user_features is maintained incrementally by the tracking worker, so every
+    read is a primary-key lookup regardless of the user's history size.
+    """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_user_feature_vector(self, user_id: int) -> dict:
+    async def get_user_event_counts(self, user_id: int) -> np.ndarray:
         """
-        Builds a user-level feature vector from their tracking history.
-        Returns aggregated stats about the user's behavior.
+        Returns the user's event counts per event type (the input of the user
+        features in app/models/feature_schema.py); all zeros for users without events.
         """
-        result = self.db.execute(text("""
-            SELECT
-                COUNT(*) AS total_events,
-                COUNT(DISTINCT content_id) AS unique_content_viewed,
-                COUNT(*) FILTER (WHERE event_type = 'like') AS total_likes_given,
-                COUNT(*) FILTER (WHERE event_type = 'bookmark') AS total_bookmarks_given,
-                COUNT(*) FILTER (WHERE event_type = 'comment') AS total_comments_given,
-                COUNT(*) FILTER (WHERE event_type = 'share') AS total_shares_given,
-                COALESCE(AVG(event_value), 0) AS avg_event_value
-            FROM tracking_events
+        result = await self.db.execute(text("""
+            SELECT *
+            FROM user_features
             WHERE user_id = :user_id
         """), {"user_id": user_id})
 
         row = result.fetchone()
-        if row is None:
-            return {
-                "total_events": 0,
-                "unique_content_viewed": 0,
-                "total_likes_given": 0,
-                "total_bookmarks_given": 0,
-                "total_comments_given": 0,
-                "total_shares_given": 0,
-                "avg_event_value": 0.0,
-            }
-
-        return dict(row._mapping)
+        return user_event_counts(row._mapping if row is not None else {})
+
+    async def get_user_event_counts_many(self, user_ids: list[int]) -> dict[int, np.ndarray]:
+        """
+        Set-based variant of get_user_event_counts for many users.
+        Users without events are absent from the result.
+        """
+        if not user_ids:
+            return {}
+
+        result = await self.db.execute(text("""
+            SELECT *
+            FROM user_features
+            WHERE user_id = ANY(:user_ids)
+        """), {"user_ids": user_ids})
+
+        return {row.user_id: user_event_counts(row._mapping) for row in result}
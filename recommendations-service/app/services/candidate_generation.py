@@ -1,76 +1,319 @@
-import redis
+"""
+Candidate Generation — concurrent multi-source retrieval.
+
+Every request queries all sources at once, each under its own latency
+budget (RECS_BUDGET_*_MS). A source that misses its deadline is cancelled and
+skipped, never awaited, so the tail latency of retrieval is bounded by the
+largest budget instead of by the slowest dependency:
+
+  precomputed    user:{id}:candidates written by precompute_candidates.py
+  co_engagement  item-index neighbours of the user's recent positives
+  embedding      nearest items to the user's ALS vector
+  fresh          most recently published content
+  trending       global ranked list (top engaged content)
+
+The user's seen bitmap is fetched alongside under the same kind of budget;
+a bitmap that needs hydrating keeps loading in the background past it.
+Results are deduplicated and filtered against it in memory, then blended in
+the order above (a user whose bitmap is not available yet only gets the
+precomputed list, which was filtered when it was built): each source first contributes up to its quota of the limit,
+and the remaining slots are backfilled from all sources in the same order.
+Per-source outcomes are exported as recommendations_candidate_source_requests_total.
+"""
+
+import asyncio
 import json
 import logging
-from sqlalchemy.orm import Session
+import time
+from typing import Awaitable, Callable
+
+import numpy as np
+import redis.asyncio
+from prometheus_client import Counter, Histogram
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.cache.redis_client import get_async_redis_binary
+from app.cache.seen_filter import SeenFilter, unseen_mask
+from app.core.config import settings
 from app.repositories.content_repo import ContentRepository
 from app.repositories.tracking_repo import TrackingRepository
+from app.services.embedding_index import get_embedding_index
+from app.services.item_index import get_item_index
 
 logger = logging.getLogger(__name__)
 
+CANDIDATE_SOURCE_REQUESTS = Counter(
+    "recommendations_candidate_source_requests_total",
+    "Candidate source calls by outcome",
+    ["source", "outcome"],  # hit | empty | timeout | error
+)
+CANDIDATE_SOURCE_SECONDS = Histogram(
+    "recommendations_candidate_source_seconds",
+    "Latency of candidate sources that answered within budget",
+    ["source"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+# Blend order, and the share of the limit each source may fill before backfill
+SOURCE_QUOTAS = {
+    "precomputed": 0.5,
+    "co_engagement": 0.3,
+    "embedding": 0.3,
+    "fresh": 0.1,
+    "trending": 0.3,
+}
+# Content ids fetched per source before the seen filter
+FRESH_CANDIDATES = 200
+
+# Global ranked list (top RECS_GLOBAL_RANKED_SIZE by engagement), cached per process
+_global_ranked = np.empty(0, dtype=np.int64)
+_global_ranked_at = 0.0
+_global_ranked_lock = None
+
+# Most recently published content, cached per process
+_fresh = np.empty(0, dtype=np.int64)
+_fresh_at = 0.0
+_fresh_lock = None
+
+
+async def _get_global_ranked(session_factory: async_sessionmaker) -> np.ndarray:
+    """Content ids by engagement, refreshed at most every RECS_GLOBAL_RANKED_TTL_SECONDS."""
+    global _global_ranked, _global_ranked_at, _global_ranked_lock
+    if time.monotonic() - _global_ranked_at < settings.RECS_GLOBAL_RANKED_TTL_SECONDS:
+        return _global_ranked
+
+    if _global_ranked_lock is None:
+        _global_ranked_lock = asyncio.Lock()
+    async with _global_ranked_lock:
+        if time.monotonic() - _global_ranked_at >= settings.RECS_GLOBAL_RANKED_TTL_SECONDS:
+            async with session_factory() as db:
+                top_content = await ContentRepository(db).get_top_content_by_engagement(
+                    limit=settings.RECS_GLOBAL_RANKED_SIZE
+                )
+            _global_ranked = np.array([item["content_id"] for item in top_content], dtype=np.int64)
+            _global_ranked_at = time.monotonic()
+    return _global_ranked
+
+
+async def _get_fresh(session_factory: async_sessionmaker) -> np.ndarray:
+    """Newest published content ids, refreshed at most every RECS_GLOBAL_RANKED_TTL_SECONDS."""
+    global _fresh, _fresh_at, _fresh_lock
+    if time.monotonic() - _fresh_at < settings.RECS_GLOBAL_RANKED_TTL_SECONDS:
+        return _fresh
+
+    if _fresh_lock is None:
+        _fresh_lock = asyncio.Lock()
+    async with _fresh_lock:
+        if time.monotonic() - _fresh_at >= settings.RECS_GLOBAL_RANKED_TTL_SECONDS:
+            async with session_factory() as db:
+                fresh_ids = await ContentRepository(db).get_fresh_content_ids(limit=FRESH_CANDIDATES)
+            _fresh = np.array(fresh_ids, dtype=np.int64)
+            _fresh_at = time.monotonic()
+    return _fresh
+
+
+def _consume(task: asyncio.Task):
+    """Retrieves the outcome of an abandoned task so it is never reported as unhandled."""
+    if not task.cancelled():
+        task.exception()
+
+
+async def gather_within_budgets(calls: dict[str, tuple[Awaitable, float]]) -> dict:
+    """
+    Runs every awaitable concurrently; `calls` maps a source name to
+    (awaitable, budget in seconds). Returns {name: result} for the sources
+    that finished within their budget. Late sources are cancelled without
+    being awaited, failing ones are logged; both are counted.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    tasks = {asyncio.ensure_future(awaitable): name for name, (awaitable, _budget) in calls.items()}
+    deadlines = {task: start + calls[name][1] for task, name in tasks.items()}
+    results = {}
+
+    pending = set(tasks)
+    while pending:
+        now = loop.time()
+        for task in [task for task in pending if deadlines[task] <= now]:
+            pending.discard(task)
+            task.cancel()
+            task.add_done_callback(_consume)
+            CANDIDATE_SOURCE_REQUESTS.labels(source=tasks[task], outcome="timeout").inc()
+        if not pending:
+            break
+        done, pending = await asyncio.wait(
+            pending,
+            timeout=min(deadlines[task] for task in pending) - now,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        for task in done:
+            name = tasks[task]
+            try:
+                results[name] = task.result()
+            except Exception as e:
+                logger.warning(f"Candidate source {name} failed: {e}")
+                CANDIDATE_SOURCE_REQUESTS.labels(source=name, outcome="error").inc()
+                continue
+            CANDIDATE_SOURCE_SECONDS.labels(source=name).observe(loop.time() - start)
+
+    return results
+
+
+def blend_candidates(
+    user_ids: list[int],
+    limit: int,
+    sources: dict[str, dict[int, np.ndarray]],
+    bitmaps: dict[int, bytes],
+) -> dict[int, list[int]]:
+    """
+    Per user: each source (SOURCE_QUOTAS order) contributes up to its quota of
+    `limit` unseen, not yet picked ids; the rest is backfilled in the same order.
+    Users without a bitmap only get the (offline-filtered) precomputed list.
+    """
+    result = {}
+    for user_id in user_ids:
+        bitmap = bitmaps.get(user_id)
+        names = SOURCE_QUOTAS if bitmap is not None else ("precomputed",)
+        bitmap = bitmap or b""
+        lists = []
+        for name in names:
+            ids = sources.get(name, {}).get(user_id)
+            if ids is not None and len(ids):
+                ids = np.asarray(ids, dtype=np.int64)
+                lists.append((name, ids[unseen_mask(bitmap, ids)]))
+
+        picked: list[int] = []
+        taken: set[int] = set()
+        for fill_all in (False, True):
+            for name, ids in lists:
+                budget = limit - len(picked)
+                if not fill_all:
+                    budget = min(budget, int(np.ceil(SOURCE_QUOTAS[name] * limit)))
+                for content_id in ids.tolist():
+                    if budget <= 0:
+                        break
+                    if content_id not in taken:
+                        taken.add(content_id)
+                        picked.append(content_id)
+                        budget -= 1
+        if picked:
+            result[user_id] = picked
+    return result
+
 
 class CandidateGenerationService:
-    def __init__(self, cache: redis.Redis, db: Session = None):
+    def __init__(
+        self,
+        cache: redis.asyncio.Redis,
+        session_factory: async_sessionmaker = None,
+        seen_cache: redis.asyncio.Redis = None,
+    ):
         self.cache = cache
-        self.db = db
+        self.session_factory = session_factory
+        # Binary client for the seen bitmaps
+        self.seen_cache = seen_cache or get_async_redis_binary()
 
-    def get_candidates(self, user_id: int, limit: int = 50) -> list[int]:
+    async def get_candidates(self, user_id: int, limit: int = 50) -> list[int]:
         """
-        Phase 1: Fast Retrieval.
-        1. Try precomputed candidates from Redis (fastest path).
-        2. Fallback to DB query: top engaged content excluding already-seen items.
+        Phase 1: Fast Retrieval. Blends every source answering within its
+        budget (see module docstring). Empty triggers cold start logic in the pipeline.
         """
-        # --- Strategy 1: Redis precomputed candidates ---
-        try:
-            cache_key = f"user:{user_id}:candidates"
-            candidates_json = self.cache.get(cache_key)
-            if candidates_json:
-                candidates = json.loads(candidates_json)
-                if candidates:
-                    logger.info(f"Candidates from Redis cache for user {user_id}: {len(candidates)} items")
-                    return candidates[:limit]
-        except Exception as e:
-            logger.warning(f"Redis cache miss for candidates: {e}")
-
-        # --- Strategy 2: DB fallback — top engaged content minus already seen ---
-        if self.db:
-            try:
-                tracking_repo = TrackingRepository(self.db)
-                content_repo = ContentRepository(self.db)
+        return (await self.get_candidates_many([user_id], limit)).get(user_id, [])
 
-                # Get content the user has already interacted with
-                seen_ids = tracking_repo.get_interacted_content_ids(user_id)
+    async def get_candidates_many(self, user_ids: list[int], limit: int = 50) -> dict[int, list[int]]:
+        """
+        Batch variant of get_candidates: each source answers for all users in one
+        round trip. Users without candidates are absent from the result.
+        """
+        calls: dict[str, tuple[Awaitable, float]] = {
+            "precomputed": (self._source_precomputed(user_ids), settings.RECS_BUDGET_PRECOMPUTED_MS),
+        }
+        if self.session_factory:
+            calls.update({
+                "seen": (
+                    SeenFilter(self.seen_cache, self.session_factory).get_bitmaps(user_ids),
+                    settings.RECS_BUDGET_SEEN_MS,
+                ),
+                "co_engagement": (self._source_co_engagement(user_ids), settings.RECS_BUDGET_CO_ENGAGEMENT_MS),
+                "embedding": (self._source_embedding(user_ids), settings.RECS_BUDGET_EMBEDDING_MS),
+                "fresh": (self._shared(user_ids, _get_fresh), settings.RECS_BUDGET_FRESH_MS),
+                "trending": (self._shared(user_ids, _get_global_ranked), settings.RECS_BUDGET_TRENDING_MS),
+            })
+        results = await gather_within_budgets({name: (call, ms / 1000) for name, (call, ms) in calls.items()})
 
-                # Get top content by engagement, excluding seen
-                top_content = content_repo.get_top_content_by_engagement(
-                    limit=limit, exclude_ids=seen_ids if seen_ids else None
-                )
+        for name, per_user in results.items():
+            outcome = "hit" if any(len(ids) for ids in per_user.values()) else "empty"
+            CANDIDATE_SOURCE_REQUESTS.labels(source=name, outcome=outcome).inc()
+        # Users without bitmaps (late or failed) get only the precomputed list
+        bitmaps = results.pop("seen", {})
 
-                candidate_ids = [item["content_id"] for item in top_content]
+        candidates = blend_candidates(user_ids, limit, results, bitmaps)
+        logger.info(
+            f"Candidates for {len(candidates)}/{len(user_ids)} users from sources: {', '.join(sorted(results)) or 'none'}"
+        )
+        return candidates
 
-                if candidate_ids:
-                    logger.info(f"Candidates from DB for user {user_id}: {len(candidate_ids)} items")
-                    return candidate_ids
+    # ---- Sources: each returns {user_id: content ids, best first} ----
 
-            except Exception as e:
-                logger.error(f"DB candidate generation failed: {e}")
+    async def _source_precomputed(self, user_ids: list[int]) -> dict[int, list[int]]:
+        cached = await self.cache.mget([f"user:{user_id}:candidates" for user_id in user_ids])
+        return {
+            user_id: json.loads(candidates_json)
+            for user_id, candidates_json in zip(user_ids, cached)
+            if candidates_json
+        }
+
+    async def _recent_positives(self, user_ids: list[int]) -> dict[int, list[int]]:
+        async with self.session_factory() as db:
+            return await TrackingRepository(db).get_recent_positive_content_ids_for_users(
+                user_ids, settings.ITEM_INDEX_RECENT_POSITIVES
+            )
+
+    async def _source_co_engagement(self, user_ids: list[int]) -> dict[int, np.ndarray]:
+        index = await asyncio.shield(get_item_index())
+        if index is None:
+            return {}
+        positives = await self._recent_positives(user_ids)
+        return {user_id: index.neighbors_of(seeds) for user_id, seeds in positives.items()}
+
+    async def _source_embedding(self, user_ids: list[int]) -> dict[int, np.ndarray]:
+        embeddings = await asyncio.shield(get_embedding_index())
+        if embeddings is None:
+            return {}
+
+        def search() -> dict[int, np.ndarray]:
+            return {
+                user_id: embeddings.search_user(user_id, settings.EMBEDDING_CANDIDATES, settings.EMBEDDING_NPROBE)
+                for user_id in user_ids
+            }
+
+        # ANN search is CPU work: keep it off the event loop
+        return await asyncio.to_thread(search)
 
-        return []  # Empty triggers cold start logic in the pipeline
+    async def _shared(
+        self,
+        user_ids: list[int],
+        get_list: Callable[[async_sessionmaker], Awaitable[np.ndarray]],
+    ) -> dict[int, np.ndarray]:
+        """A process-wide list served to every user. Shielded: a late caller does not abort its refresh."""
+        ids = await asyncio.shield(get_list(self.session_factory))
+        return {user_id: ids for user_id in user_ids}
 
-    def get_popular_items(self, limit: int = 10) -> list[int]:
+    async def get_popular_items(self, limit: int = 10) -> list[int]:
         """Fallback heuristics for Cold Start — uses Redis or DB."""
         # Try Redis first
         try:
-            popular = self.cache.get("global:popular_items")
+            popular = await self.cache.get("global:popular_items")
             if popular:
                 return json.loads(popular)[:limit]
         except Exception:
             pass
 
         # DB fallback
-        if self.db:
+        if self.session_factory:
             try:
-                content_repo = ContentRepository(self.db)
-                top_content = content_repo.get_top_content_by_engagement(limit=limit)
+                async with self.session_factory() as db:
+                    top_content = await ContentRepository(db).get_top_content_by_engagement(limit=limit)
                 return [item["content_id"] for item in top_content]
             except Exception as e:
                 logger.error(f"DB popular items fallback failed: {e}")
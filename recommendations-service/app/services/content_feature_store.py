@@ -0,0 +1,167 @@
+"""
+Content Feature Store — In-process, array-backed copy of content_metrics.
+
+Each worker process keeps CONTENT_COLUMNS for the whole catalogue in a float32
+matrix indexed directly by content_id, so gathering features for k candidates
+is an O(k) array index with no DB round trip.
+
+Refresh:
+  - Full load at startup and every CONTENT_STORE_FULL_RELOAD_SECONDS
+    (also drops deleted content).
+  - Incremental every CONTENT_STORE_REFRESH_SECONDS: rows with
+    updated_at >= watermark - CONTENT_STORE_REFRESH_OVERLAP_SECONDS. The overlap
+    covers rows whose updated_at (transaction start) precedes a commit seen later.
+Updates are copy-on-write: readers always see a complete snapshot.
+Until the first load succeeds, callers fall back to querying content_metrics.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Optional
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.database.connection import AsyncSessionLocal
+from app.repositories.content_repo import ContentRepository
+from app.models.feature_schema import CONTENT_COLUMNS, content_feature_matrix
+
+logger = logging.getLogger(__name__)
+
+STORE_ROWS = Gauge("recommendations_content_store_rows", "Content items held in the feature store")
+STORE_BYTES = Gauge("recommendations_content_store_bytes", "Memory held by the feature store arrays")
+STORE_LAG = Gauge(
+    "recommendations_content_store_lag_seconds",
+    "Seconds since the last successful feature store refresh (upper bound on staleness)",
+)
+STORE_REFRESH_SECONDS = Histogram(
+    "recommendations_content_store_refresh_seconds",
+    "Duration of feature store refreshes",
+    ["kind"],
+)
+STORE_REFRESH_FAILURES = Counter("recommendations_content_store_refresh_failures_total", "Failed feature store refreshes")
+
+
+class DenseContentFeatures:
+    """Immutable snapshot: values[content_id] holds CONTENT_COLUMNS (zeros if absent)."""
+
+    def __init__(self, values: np.ndarray, present: np.ndarray):
+        self.values = values
+        self.present = present
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.present.nbytes
+
+    def gather(self, content_ids: np.ndarray) -> np.ndarray:
+        """Feature rows for `content_ids`; unknown ids get zeros."""
+        content_ids = np.asarray(content_ids, dtype=np.int64)
+        in_range = (content_ids >= 0) & (content_ids < len(self.values))
+        if in_range.all():
+            return self.values[content_ids]
+        out = np.zeros((len(content_ids), len(CONTENT_COLUMNS)), dtype=np.float32)
+        out[in_range] = self.values[content_ids[in_range]]
+        return out
+
+    def with_rows(self, content_ids: np.ndarray, rows: np.ndarray) -> "DenseContentFeatures":
+        """Copy-on-write update; grows the arrays to fit new ids."""
+        size = max(len(self.values), int(content_ids.max()) + 1) if len(content_ids) else len(self.values)
+        values = np.zeros((size, len(CONTENT_COLUMNS)), dtype=np.float32)
+        present = np.zeros(size, dtype=bool)
+        values[: len(self.values)] = self.values
+        present[: len(self.present)] = self.present
+        values[content_ids] = rows
+        present[content_ids] = True
+        return DenseContentFeatures(values, present)
+
+    @classmethod
+    def empty(cls) -> "DenseContentFeatures":
+        return cls(np.zeros((0, len(CONTENT_COLUMNS)), dtype=np.float32), np.zeros(0, dtype=bool))
+
+
+def _to_arrays(rows: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    content_ids = np.fromiter((row["content_id"] for row in rows), dtype=np.int64, count=len(rows))
+    return content_ids, content_feature_matrix(rows)
+
+
+class ContentFeatureStore:
+    def __init__(self):
+        self.snapshot: Optional[DenseContentFeatures] = None
+        self._watermark = None  # newest updated_at loaded (DB clock)
+        self._last_full_load = 0.0
+        self._last_refresh = None
+        STORE_LAG.set_function(
+            lambda: time.monotonic() - self._last_refresh if self._last_refresh is not None else float("nan")
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self.snapshot is not None
+
+    async def refresh(self):
+        """Full reload when due, incremental otherwise."""
+        full = self._watermark is None or time.monotonic() - self._last_full_load >= settings.CONTENT_STORE_FULL_RELOAD_SECONDS
+        kind = "full" if full else "incremental"
+        with STORE_REFRESH_SECONDS.labels(kind=kind).time():
+            since = None if full else self._watermark - timedelta(seconds=settings.CONTENT_STORE_REFRESH_OVERLAP_SECONDS)
+            async with AsyncSessionLocal() as db:
+                rows = await ContentRepository(db).get_content_features_since(since)
+
+            if rows or full:
+                base = DenseContentFeatures.empty() if full else self.snapshot
+                content_ids, values = await asyncio.to_thread(_to_arrays, rows)
+                self.snapshot = await asyncio.to_thread(base.with_rows, content_ids, values)
+                newest = max((row["updated_at"] for row in rows if row["updated_at"] is not None), default=None)
+                if newest is not None and (self._watermark is None or newest > self._watermark):
+                    self._watermark = newest
+
+        if full:
+            self._last_full_load = time.monotonic()
+            logger.info("Content feature store loaded: %d items", int(self.snapshot.present.sum()))
+        self._publish_metrics()
+
+    def _publish_metrics(self):
+        STORE_ROWS.set(int(self.snapshot.present.sum()))
+        STORE_BYTES.set(self.snapshot.nbytes)
+        self._last_refresh = time.monotonic()
+
+
+_store = ContentFeatureStore()
+_refresh_task = None
+
+
+def get_content_feature_store() -> ContentFeatureStore:
+    return _store
+
+
+async def _refresh_loop():
+    while True:
+        await asyncio.sleep(settings.CONTENT_STORE_REFRESH_SECONDS)
+        try:
+            await _store.refresh()
+        except Exception as e:
+            STORE_REFRESH_FAILURES.inc()
+            logger.error("Content feature store refresh failed: %s", e)
+
+
+async def start_content_feature_store():
+    """Initial load (best effort) and the periodic refresh task."""
+    global _refresh_task
+    try:
+        await _store.refresh()
+    except Exception as e:
+        STORE_REFRESH_FAILURES.inc()
+        logger.error("Content feature store initial load failed, querying DB until it succeeds: %s", e)
+    _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_content_feature_store():
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,125 @@
+"""
+Embedding Index — personalised retrieval over the ALS embeddings written by
+the training pipeline (app/pipelines/embedding_pipeline.py).
+
+All arrays are memory-mapped (np.load mmap_mode="r"): workers share the page
+cache instead of each holding a copy, and a 1M-item catalogue costs no load
+time. Search is maximum inner product against the user's vector:
+  - exact: one V @ q over every item (small catalogues);
+  - IVF: score the centroids, then only the EMBEDDING_NPROBE best inverted
+    lists, each a contiguous slice of V.
+EMBEDDING_DIR/CURRENT names the live version; each process swaps to a new
+one when that file changes (checked at most every ITEM_INDEX_RELOAD_SECONDS).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingIndex:
+    def __init__(self, version: str, arrays: dict[str, np.ndarray]):
+        self.version = version
+        self.user_ids = arrays["user_ids"]
+        self.user_vectors = arrays["user_vectors"]
+        self.item_ids = arrays["item_ids"]
+        self.item_vectors = arrays["item_vectors"]
+        self.centroids = arrays.get("centroids")
+        self.list_offsets = arrays.get("list_offsets")
+
+    @classmethod
+    def load(cls, directory: str, version: str) -> "EmbeddingIndex":
+        version_dir = os.path.join(directory, version)
+        arrays = {
+            name[: -len(".npy")]: np.load(os.path.join(version_dir, name), mmap_mode="r")
+            for name in os.listdir(version_dir)
+            if name.endswith(".npy")
+        }
+        return cls(version, arrays)
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    def user_vector(self, user_id: int) -> Optional[np.ndarray]:
+        """The user's trained vector, or None for users unseen at training time."""
+        row = int(np.searchsorted(self.user_ids, user_id))
+        if row < len(self.user_ids) and self.user_ids[row] == user_id:
+            return np.asarray(self.user_vectors[row])
+        return None
+
+    def search(self, query: np.ndarray, k: int, nprobe: int) -> np.ndarray:
+        """Content ids of the (approximately) k highest q·v items, best first."""
+        if self.centroids is None:
+            rows = None
+            scores = np.asarray(self.item_vectors @ query)
+        else:
+            centroid_scores = self.centroids @ query
+            nprobe = min(nprobe, len(centroid_scores))
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            ranges = [(self.list_offsets[c], self.list_offsets[c + 1]) for c in probe]
+            scores = np.concatenate([np.asarray(self.item_vectors[a:b] @ query) for a, b in ranges])
+            rows = np.concatenate([np.arange(a, b) for a, b in ranges])
+
+        if len(scores) == 0:
+            return np.empty(0, dtype=np.int64)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return np.asarray(self.item_ids[top if rows is None else rows[top]], dtype=np.int64)
+
+    def search_user(self, user_id: int, k: int, nprobe: int) -> np.ndarray:
+        query = self.user_vector(user_id)
+        if query is None:
+            return np.empty(0, dtype=np.int64)
+        return self.search(query, k, nprobe)
+
+
+def load_embedding_index(directory: str) -> Optional[EmbeddingIndex]:
+    """Live version under `directory`, or None when none has been trained or it is unreadable."""
+    try:
+        with open(os.path.join(directory, "CURRENT")) as f:
+            version = f.read().strip()
+        return EmbeddingIndex.load(directory, version)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Could not load embeddings from {directory}: {e}")
+        return None
+
+
+_index: Optional[EmbeddingIndex] = None
+_index_mtime = 0.0
+_index_checked_at = 0.0
+_index_lock = None
+
+
+async def get_embedding_index() -> Optional[EmbeddingIndex]:
+    """Process-wide index, remapped off the event loop when CURRENT changes."""
+    global _index, _index_mtime, _index_checked_at, _index_lock
+    if time.monotonic() - _index_checked_at < settings.ITEM_INDEX_RELOAD_SECONDS:
+        return _index
+
+    if _index_lock is None:
+        _index_lock = asyncio.Lock()
+    async with _index_lock:
+        if time.monotonic() - _index_checked_at < settings.ITEM_INDEX_RELOAD_SECONDS:
+            return _index
+        _index_checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(os.path.join(settings.EMBEDDING_DIR, "CURRENT"))
+        except OSError:
+            return _index
+        if mtime != _index_mtime:
+            index = await asyncio.to_thread(load_embedding_index, settings.EMBEDDING_DIR)
+            if index is not None:
+                _index, _index_mtime = index, mtime
+                logger.info(f"Embeddings {index.version} mapped: {len(index)} items")
+    return _index
@@ -1,75 +1,161 @@
-import pandas as pd
-from sqlalchemy.orm import Session
-from datetime import datetime
-import redis
+from datetime import datetime, timezone
+from itertools import chain
 import logging
 
+import numpy as np
+import pandas as pd
+import redis.asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.feature_schema import (
+    CONTENT_COLUMNS,
+    CONTENT_SLICE,
+    CONTEXT_SLICE,
+    EVENT_COUNT_COLUMNS,
+    FEATURE_COLUMNS,
+    USER_SLICE,
+    compute_context,
+    content_feature_matrix,
+    user_event_counts,
+    user_feature_matrix,
+)
 from app.repositories.content_repo import ContentRepository
 from app.repositories.user_repo import UserRepository
+from app.services.content_feature_store import get_content_feature_store
 
 logger = logging.getLogger(__name__)
 
+# Hash mirrored by the tracking worker (tracking-service app/services/recommendation_signals.py)
+USER_FEATURES_KEY = "user:{user_id}:features"
+# Event counts of users without any event
+NO_EVENTS = np.zeros(len(EVENT_COUNT_COLUMNS), dtype=np.float64)
+
+class ContentFeatureTable:
+    """Content features as a float32 matrix indexed by sorted content_id."""
+
+    def __init__(self, content_ids: np.ndarray, values: np.ndarray):
+        order = np.argsort(content_ids, kind="stable")
+        self.content_ids = content_ids[order]
+        self.values = values[order]
+
+    @classmethod
+    def from_rows(cls, rows: list[dict]) -> "ContentFeatureTable":
+        content_ids = np.fromiter((row["content_id"] for row in rows), dtype=np.int64, count=len(rows))
+        return cls(content_ids, content_feature_matrix(rows))
+
+    def gather(self, content_ids: np.ndarray) -> np.ndarray:
+        """Feature rows for `content_ids`; unknown ids get zeros."""
+        out = np.zeros((len(content_ids), len(CONTENT_COLUMNS)), dtype=np.float32)
+        if len(self.content_ids) == 0:
+            return out
+        pos = np.searchsorted(self.content_ids, content_ids)
+        pos[pos == len(self.content_ids)] = 0
+        found = self.content_ids[pos] == content_ids
+        out[found] = self.values[pos[found]]
+        return out
+
 
 class FeatureEngineeringService:
-    def __init__(self, db: Session, cache: redis.Redis):
-        self.db = db
+    def __init__(self, session_factory: async_sessionmaker, cache: redis.asyncio.Redis = None):
+        self.session_factory = session_factory
         self.cache = cache
-        self.content_repo = ContentRepository(db)
-        self.user_repo = UserRepository(db)
 
-    def build_features(self, user_id: int, candidates: list[int]) -> pd.DataFrame:
+    async def get_user_features(self, user_id: int) -> np.ndarray:
+        """
+        The user's event counts (input of the user features, see
+        app/models/feature_schema.py): the user:{id}:features hash mirrored by
+        the tracking worker, else the user_features row (own session, so it can
+        run concurrently with other fetches).
+        """
+        if self.cache is not None:
+            try:
+                counters = await self.cache.hgetall(USER_FEATURES_KEY.format(user_id=user_id))
+                if counters:
+                    return user_event_counts(counters)
+            except Exception as e:
+                logger.warning(f"Redis user features unavailable: {e}")
+
+        async with self.session_factory() as db:
+            return await UserRepository(db).get_user_event_counts(user_id)
+
+    async def get_user_features_many(self, user_ids: list[int]) -> dict[int, np.ndarray]:
+        """User event counts for many users: one pipelined HGETALL, one query for the misses."""
+        features: dict[int, np.ndarray] = {}
+        if self.cache is not None:
+            try:
+                pipe = self.cache.pipeline(transaction=False)
+                for user_id in user_ids:
+                    pipe.hgetall(USER_FEATURES_KEY.format(user_id=user_id))
+                for user_id, counters in zip(user_ids, await pipe.execute()):
+                    if counters:
+                        features[user_id] = user_event_counts(counters)
+            except Exception as e:
+                logger.warning(f"Redis user features unavailable: {e}")
+
+        missing = [user_id for user_id in user_ids if user_id not in features]
+        if missing:
+            async with self.session_factory() as db:
+                features.update(await UserRepository(db).get_user_event_counts_many(missing))
+        return features
+
+    async def get_content_features(self, candidates: list[int]):
+        """
+        Content-level features for the candidates, as an object with
+        gather(content_ids): the in-process store snapshot (no DB round trip)
+        once loaded, otherwise a table built from one content_metrics query.
+        """
+        store = get_content_feature_store()
+        if store.ready:
+            return store.snapshot
+        rows = []
+        if candidates:
+            async with self.session_factory() as db:
+                rows = await ContentRepository(db).get_content_features(candidates)
+        return ContentFeatureTable.from_rows(rows)
+
+    @staticmethod
+    def build_features(
+        user_id: int,
+        candidates: list[int],
+        user_features: np.ndarray,
+        content_features,
+    ) -> np.ndarray:
+        """
+        Builds the float32 feature matrix (rows = candidates, columns =
+        FEATURE_COLUMNS) for the LightGBM model.
+        Pure CPU work: runs on the scoring executor, never on the event loop.
         """
-        Builds the feature DataFrame for the LightGBM model.
-        Combines user-level features with content-level features from real data.
+        return FeatureEngineeringService.build_batch_features(
+            {user_id: candidates}, {user_id: user_features}, content_features
+        )
+
+    @staticmethod
+    def build_batch_features(
+        user_candidates: dict[int, list[int]],
+        user_features_map: dict[int, np.ndarray],
+        content_features,
+    ) -> np.ndarray:
+        """
+        Stacks the rows of several users into one preallocated matrix, in
+        `user_candidates` order (each user's rows contiguous), so a single
+        predict call scores them all. User features are computed from the
+        users' event counts and broadcast over each user's rows; content
+        features are gathered by content_id from `content_features` (see
+        get_content_features); context features use the request time.
         """
-        if not candidates:
-            return pd.DataFrame()
-
-        # 1. Get user-level features
-        user_features = self.user_repo.get_user_feature_vector(user_id)
-
-        # 2. Get content-level features for all candidates
-        content_features_list = self.content_repo.get_content_features(candidates)
-
-        # Build a lookup by content_id
-        content_features_map = {
-            item["content_id"]: item for item in content_features_list
-        }
-
-        # 3. Build combined feature rows
-        now = datetime.now()
-        data = []
-        for item_id in candidates:
-            content_feat = content_features_map.get(item_id, {})
-
-            row = {
-                # Identifiers
-                "user_id": user_id,
-                "item_id": item_id,
-
-                # User features
-                "user_total_events": user_features.get("total_events", 0),
-                "user_unique_content": user_features.get("unique_content_viewed", 0),
-                "user_likes_given": user_features.get("total_likes_given", 0),
-                "user_bookmarks_given": user_features.get("total_bookmarks_given", 0),
-                "user_comments_given": user_features.get("total_comments_given", 0),
-                "user_avg_event_value": user_features.get("avg_event_value", 0.0),
-
-                # Content features
-                "item_total_views": content_feat.get("total_views", 0),
-                "item_total_likes": content_feat.get("total_likes", 0),
-                "item_total_bookmarks": content_feat.get("total_bookmarks", 0),
-                "item_total_comments": content_feat.get("total_comments", 0),
-                "item_engagement_rate": content_feat.get("engagement_rate", 0.0),
-                "item_avg_watch_time": content_feat.get("avg_watch_time", 0.0),
-                "item_completion_rate": content_feat.get("completion_rate", 0.0),
-
-                # Context features
-                "hour_of_day": now.hour,
-                "day_of_week": now.weekday(),
-            }
-            data.append(row)
-
-        df = pd.DataFrame(data)
-        logger.debug(f"Built feature DataFrame: {df.shape[0]} rows x {df.shape[1]} cols")
-        return df
+        counts = [len(candidates) for candidates in user_candidates.values()]
+        n_rows = sum(counts)
+        matrix = np.empty((n_rows, len(FEATURE_COLUMNS)), dtype=np.float32)
+        if n_rows == 0:
+            return matrix
+
+        user_matrix = user_feature_matrix([user_features_map.get(user_id, NO_EVENTS) for user_id in user_candidates])
+        matrix[:, USER_SLICE] = np.repeat(user_matrix, counts, axis=0)
+
+        item_ids = np.fromiter(chain.from_iterable(user_candidates.values()), dtype=np.int64, count=n_rows)
+        matrix[:, CONTENT_SLICE] = content_features.gather(item_ids)
+
+        matrix[:, CONTEXT_SLICE] = compute_context(pd.DatetimeIndex([datetime.now(timezone.utc)]))
+
+        logger.debug(f"Built feature matrix: {matrix.shape[0]} rows x {matrix.shape[1]} cols")
+        return matrix
@@ -0,0 +1,108 @@
+"""
+Item Index — online lookup in the item-to-item co-engagement index built by
+build_item_index.py (app/pipelines/item_index_pipeline.py).
+
+The index is a handful of dense arrays, so retrieval for a user is a
+searchsorted of their recent positives, one fancy-index gather of the
+neighbour rows and a bincount-style merge: no per-item Python work.
+Each process keeps one loaded copy and swaps it when the file on disk changes
+(checked at most every ITEM_INDEX_RELOAD_SECONDS).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ItemNeighborIndex:
+    def __init__(self, item_ids: np.ndarray, neighbors: np.ndarray, scores: np.ndarray):
+        self.item_ids = item_ids
+        self.neighbors = neighbors
+        self.scores = scores
+
+    @classmethod
+    def load(cls, path: str) -> "ItemNeighborIndex":
+        with np.load(path) as data:
+            return cls(data["item_ids"], data["neighbors"], data["scores"])
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    def neighbors_of(self, seed_ids) -> np.ndarray:
+        """
+        Union of the seeds' neighbours, by summed similarity (descending).
+        Seeds themselves and unknown ids contribute nothing.
+        """
+        seeds = np.asarray(seed_ids, dtype=np.int64)
+        if len(seeds) == 0 or len(self.item_ids) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        rows = np.minimum(np.searchsorted(self.item_ids, seeds), len(self.item_ids) - 1)
+        rows = rows[self.item_ids[rows] == seeds]
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        ids = self.neighbors[rows].ravel()
+        sims = self.scores[rows].ravel()
+        valid = ids >= 0
+        unique_ids, inverse = np.unique(ids[valid].astype(np.int64), return_inverse=True)
+        totals = np.bincount(inverse, weights=sims[valid], minlength=len(unique_ids))
+        keep = ~np.isin(unique_ids, seeds)
+        unique_ids, totals = unique_ids[keep], totals[keep]
+        return unique_ids[np.argsort(-totals, kind="stable")]
+
+
+def merge_ranked(*sources: np.ndarray) -> np.ndarray:
+    """Concatenates candidate sources in priority order, keeping each id's first occurrence."""
+    merged = np.concatenate([np.asarray(source, dtype=np.int64) for source in sources])
+    _, first = np.unique(merged, return_index=True)
+    return merged[np.sort(first)]
+
+
+def load_item_index(path: str) -> Optional[ItemNeighborIndex]:
+    """Index at `path`, or None when it has not been built yet or is unreadable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return ItemNeighborIndex.load(path)
+    except Exception as e:
+        logger.error(f"Could not load item index from {path}: {e}")
+        return None
+
+
+_index: Optional[ItemNeighborIndex] = None
+_index_mtime = 0.0
+_index_checked_at = 0.0
+_index_lock = None
+
+
+async def get_item_index() -> Optional[ItemNeighborIndex]:
+    """Process-wide index, reloaded off the event loop when the file changes."""
+    global _index, _index_mtime, _index_checked_at, _index_lock
+    if time.monotonic() - _index_checked_at < settings.ITEM_INDEX_RELOAD_SECONDS:
+        return _index
+
+    if _index_lock is None:
+        _index_lock = asyncio.Lock()
+    async with _index_lock:
+        if time.monotonic() - _index_checked_at < settings.ITEM_INDEX_RELOAD_SECONDS:
+            return _index
+        _index_checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(settings.ITEM_INDEX_PATH)
+        except OSError:
+            return _index
+        if mtime != _index_mtime:
+            index = await asyncio.to_thread(load_item_index, settings.ITEM_INDEX_PATH)
+            if index is not None:
+                _index, _index_mtime = index, mtime
+                logger.info(f"Item index loaded: {len(index)} items")
+    return _index
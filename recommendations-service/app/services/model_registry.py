@@ -0,0 +1,188 @@
+"""
+Model Registry — the single owner of the ranking model in each process.
+
+The live model is an immutable LoadedModel (version + LGBMModel). A request
+takes one reference to it up front, so it scores with the same model from
+start to finish, and a swap is a single reference assignment: no request is
+dropped or sees a half-loaded model.
+
+A background watcher looks for a new version every MODEL_RELOAD_SECONDS:
+  1. Redis MODEL_VERSION_KEY, set by the training pipeline to the versioned
+     file name it saved next to MODEL_PATH (shared by every worker/host);
+  2. otherwise the mtime of MODEL_PATH itself.
+A candidate is loaded off the event loop and must pass validation (the
+FEATURE_SCHEMA_VERSION stamped at training, feature count/names against
+FEATURE_COLUMNS and a smoke batch with finite scores) before it replaces the
+live model. Rejected versions are not retried.
+"""
+
+import asyncio
+import logging
+import os
+from typing import NamedTuple, Optional
+
+import numpy as np
+import redis
+from prometheus_client import Counter, Gauge
+
+from app.cache.redis_client import get_async_redis
+from app.core.config import settings
+from app.models.feature_schema import FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION
+from app.models.lgbm_model import LGBMModel
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION_KEY = "model:current_version"
+FALLBACK_VERSION = "fallback"
+SMOKE_BATCH_ROWS = 64
+
+MODEL_INFO = Gauge("recommendations_model_info", "Model version currently serving (1 = live)", ["version"])
+MODEL_RELOADS = Counter(
+    "recommendations_model_reloads_total",
+    "Model reload attempts by outcome",
+    ["status"],  # ok | invalid | failed
+)
+
+
+class ModelValidationError(Exception):
+    """Raised when a loaded model does not match the serving feature schema."""
+
+
+class LoadedModel(NamedTuple):
+    version: str
+    model: Optional[LGBMModel]
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+
+def validate_model(model: LGBMModel):
+    """Feature schema check plus a smoke batch; raises ModelValidationError."""
+    if model.feature_schema_version is None:
+        logger.warning("Model has no feature schema version stamp; checking feature names only")
+    elif model.feature_schema_version != FEATURE_SCHEMA_VERSION:
+        raise ModelValidationError(
+            f"Model trained on feature schema {model.feature_schema_version}, serving computes {FEATURE_SCHEMA_VERSION}"
+        )
+    num_feature = model.booster.num_feature()
+    if num_feature != len(FEATURE_COLUMNS):
+        raise ModelValidationError(f"Model expects {num_feature} features, serving builds {len(FEATURE_COLUMNS)}")
+    # Models trained on a bare matrix carry generic Column_<i> names
+    names = model.booster.feature_name()
+    if not all(name.startswith("Column_") for name in names) and list(names) != FEATURE_COLUMNS:
+        raise ModelValidationError(f"Model feature names {names} differ from {FEATURE_COLUMNS}")
+
+    rng = np.random.default_rng(0)
+    smoke = np.vstack([
+        np.zeros((1, len(FEATURE_COLUMNS)), dtype=np.float32),
+        rng.uniform(0, 100, size=(SMOKE_BATCH_ROWS - 1, len(FEATURE_COLUMNS))).astype(np.float32),
+    ])
+    scores = np.asarray(model.predict(smoke))
+    if scores.shape != (SMOKE_BATCH_ROWS,) or not np.isfinite(scores).all():
+        raise ModelValidationError(f"Smoke batch returned invalid scores (shape {scores.shape})")
+
+
+def load_and_validate(path: str) -> LGBMModel:
+    model = LGBMModel()
+    model.load(path)
+    validate_model(model)
+    return model
+
+
+class ModelRegistry:
+    def __init__(self, model_path: str, reload_interval: float):
+        self.model_path = model_path
+        self.model_dir = os.path.dirname(model_path)
+        self.reload_interval = reload_interval
+        self.current = LoadedModel(FALLBACK_VERSION, None)
+        self._rejected: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def _swap(self, loaded: LoadedModel):
+        previous = self.current
+        self.current = loaded
+        MODEL_INFO.labels(version=loaded.version).set(1)
+        if previous.version != loaded.version:
+            MODEL_INFO.labels(version=previous.version).set(0)
+        logger.info("Serving model version %s (was %s)", loaded.version, previous.version)
+
+    async def _wanted_version(self) -> Optional[tuple[str, str]]:
+        """(version, path) the registry should serve, or None when unknown."""
+        try:
+            version = await get_async_redis().get(MODEL_VERSION_KEY)
+            if version:
+                return version, os.path.join(self.model_dir, os.path.basename(version))
+        except redis.RedisError as e:
+            logger.debug("Model version key unavailable: %s", e)
+        try:
+            return str(int(os.path.getmtime(self.model_path))), self.model_path
+        except OSError:
+            return None
+
+    async def check(self) -> bool:
+        """Loads and swaps in a new version if one is published; returns True on swap."""
+        wanted = await self._wanted_version()
+        if wanted is None:
+            return False
+        version, path = wanted
+        if version == self.current.version or version in self._rejected:
+            return False
+
+        try:
+            model = await asyncio.to_thread(load_and_validate, path)
+        except ModelValidationError as e:
+            MODEL_RELOADS.labels(status="invalid").inc()
+            self._rejected.add(version)
+            logger.error("Model version %s rejected: %s", version, e)
+            return False
+        except Exception as e:
+            # Not blacklisted: the file may not be visible on the shared volume
+            # yet, or the error may be transient. Retried on the next check.
+            MODEL_RELOADS.labels(status="failed").inc()
+            logger.error("Could not load model version %s from %s (will retry): %s", version, path, e)
+            return False
+
+        self._swap(LoadedModel(version, model))
+        MODEL_RELOADS.labels(status="ok").inc()
+        return True
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error("Model registry check failed: %s", e)
+
+    async def start(self):
+        if not await self.check():
+            logger.warning("No valid model at %s. Running in Fallback Mode.", self.model_path)
+            MODEL_INFO.labels(version=FALLBACK_VERSION).set(1)
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry(settings.MODEL_PATH, settings.MODEL_RELOAD_SECONDS)
+    return _registry
+
+
+async def start_model_registry():
+    await get_model_registry().start()
+
+
+async def stop_model_registry():
+    await get_model_registry().stop()
@@ -1,21 +1,45 @@
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
+def _sort_by_score(candidates: list, scores: np.ndarray) -> list:
+    """(candidate, score) pairs by descending score; ties keep candidate order."""
+    order = np.argsort(-scores, kind="stable")
+    return [(candidates[i], float(scores[i])) for i in order]
+
+
 class RankingService:
     def __init__(self, model):
         self.model = model
 
-    def rank_candidates(self, user_id: int, candidates: list, features_df):
+    def rank_candidates(self, user_id: int, candidates: list, features):
         """Uses the loaded LightGBM model to score and sort candidates."""
         try:
-            scores = self.model.predict(features_df)
+            scores = np.asarray(self.model.predict(features), dtype=np.float64)
         except Exception as e:
             logger.warning("ML Model prediction failed, falling back to heuristic: %s", e)
-            scores = [1.0] * len(candidates)
+            scores = np.ones(len(candidates))
 
-        scored_candidates = list(zip(candidates, scores))
-        scored_candidates.sort(key=lambda x: x[1], reverse=True)
-        return scored_candidates
+        return _sort_by_score(candidates, scores)
+
+    def rank_batch(self, user_candidates: dict[int, list[int]], features) -> dict[int, list]:
+        """
+        Scores the stacked rows of several users with one predict call and
+        splits the scores back per user (rows are contiguous per user).
+        """
+        total = sum(len(candidates) for candidates in user_candidates.values())
+        try:
+            scores = np.asarray(self.model.predict(features), dtype=np.float64)
+        except Exception as e:
+            logger.warning("ML Model batch prediction failed, falling back to heuristic: %s", e)
+            scores = np.ones(total)
 
+        ranked = {}
+        offset = 0
+        for user_id, candidates in user_candidates.items():
+            ranked[user_id] = _sort_by_score(candidates, scores[offset:offset + len(candidates)])
+            offset += len(candidates)
+        return ranked
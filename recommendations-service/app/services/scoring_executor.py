@@ -0,0 +1,83 @@
+"""
+Scoring Executor — Bounded thread pool for the CPU-bound part of inference.
+
+Feature-matrix construction and model.predict never run on the event loop.
+At most SCORING_WORKERS jobs run at once; up to SCORING_MAX_QUEUE more wait
+for a slot. Beyond that, run_scoring() raises ScoringOverloaded so callers
+can degrade (heuristic order) instead of piling up latency.
+LightGBM releases the GIL while predicting, so threads scale across cores.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCORING_QUEUED = Gauge("recommendations_scoring_queued", "Scoring jobs waiting for an executor slot")
+SCORING_RUNNING = Gauge("recommendations_scoring_running", "Scoring jobs currently executing")
+SCORING_WAIT_SECONDS = Histogram(
+    "recommendations_scoring_wait_seconds",
+    "Time a scoring job waited for an executor slot",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+SCORING_SECONDS = Histogram(
+    "recommendations_scoring_seconds",
+    "Time spent executing a scoring job",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+SCORING_REJECTED = Counter("recommendations_scoring_rejected_total", "Scoring jobs refused because the queue was full")
+
+
+class ScoringOverloaded(Exception):
+    """Raised when SCORING_MAX_QUEUE jobs are already waiting."""
+
+
+_executor = ThreadPoolExecutor(max_workers=settings.SCORING_WORKERS, thread_name_prefix="scoring")
+_slots = None
+_waiting = 0
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.SCORING_WORKERS)
+    return _slots
+
+
+async def run_scoring(fn, *args):
+    """Runs fn(*args) on the scoring pool, waiting for a slot if needed."""
+    global _waiting
+    if _waiting >= settings.SCORING_MAX_QUEUE:
+        SCORING_REJECTED.inc()
+        raise ScoringOverloaded(f"{_waiting} scoring jobs already queued")
+
+    slots = _get_slots()
+    queued_at = time.perf_counter()
+    _waiting += 1
+    SCORING_QUEUED.inc()
+    try:
+        await slots.acquire()
+    finally:
+        _waiting -= 1
+        SCORING_QUEUED.dec()
+    SCORING_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
+
+    SCORING_RUNNING.inc()
+    started_at = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, fn, *args)
+    finally:
+        SCORING_SECONDS.observe(time.perf_counter() - started_at)
+        SCORING_RUNNING.dec()
+        slots.release()
+
+
+def shutdown_scoring_executor():
+    _executor.shutdown(wait=True)
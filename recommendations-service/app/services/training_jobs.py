@@ -0,0 +1,209 @@
+"""
+Training Jobs — Redis-backed queue, job records and cluster-wide lock for
+the training runner (training_runner.py).
+
+  training:queue        List of job ids; the API LPUSHes, the runner holding
+                        the lock BLMOVEs them into training:processing.
+  training:processing   Job ids taken by a runner and not finished yet. The
+                        next lock holder recovers whatever a dead runner left
+                        here (recover_stuck_jobs).
+  training:job:{id}     Hash job record: status (queued | running |
+                        succeeded | skipped | rejected | failed), mode, step,
+                        timestamps, result (JSON) or error. Kept
+                        JOB_TTL_SECONDS.
+  training:lock         SET NX PX lease held by the runner executing a job
+                        and renewed while it runs, so exactly one training
+                        job runs cluster-wide however many runners exist.
+  training:scheduled:{slot}  SET NX marker: one runner enqueues each
+                        scheduled run.
+
+The API process only enqueues and reads job records; training never runs in
+a serving worker.
+"""
+
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import redis
+import redis.asyncio
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "training:queue"
+PROCESSING_KEY = "training:processing"
+JOB_KEY = "training:job:{job_id}"
+LOCK_KEY = "training:lock"
+SCHEDULED_KEY = "training:scheduled:{slot}"
+JOB_TTL_SECONDS = 30 * 86400
+
+# Finished statuses; the pipeline's own status maps onto them
+FINAL_STATUSES = ("succeeded", "skipped", "rejected", "failed")
+
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _queue_job(pipe, mode: str, source: str) -> dict:
+    """Adds the new job's record and queue entry to a MULTI pipeline; returns the record."""
+    job_id = uuid.uuid4().hex
+    record = {"job_id": job_id, "status": "queued", "mode": mode, "source": source, "requested_at": _now()}
+    pipe.hset(JOB_KEY.format(job_id=job_id), mapping=record)
+    pipe.expire(JOB_KEY.format(job_id=job_id), JOB_TTL_SECONDS)
+    pipe.lpush(QUEUE_KEY, job_id)
+    return record
+
+
+async def enqueue_training_job(cache: redis.asyncio.Redis, mode: str, source: str = "api") -> dict:
+    """Creates the job record and queues it; returns the record."""
+    pipe = cache.pipeline(transaction=True)
+    record = _queue_job(pipe, mode, source)
+    await pipe.execute()
+    return record
+
+
+async def get_training_job(cache: redis.asyncio.Redis, job_id: str) -> Optional[dict]:
+    record = await cache.hgetall(JOB_KEY.format(job_id=job_id))
+    return record or None
+
+
+def enqueue_training_job_sync(redis_conn: redis.Redis, mode: str, source: str) -> dict:
+    pipe = redis_conn.pipeline(transaction=True)
+    record = _queue_job(pipe, mode, source)
+    pipe.execute()
+    return record
+
+
+def update_job(redis_conn: redis.Redis, job_id: str, **fields):
+    """Updates the job record; failures are logged, never raised (progress is best effort)."""
+    try:
+        redis_conn.hset(JOB_KEY.format(job_id=job_id), mapping={k: str(v) for k, v in fields.items()})
+    except redis.RedisError as e:
+        logger.warning(f"Could not update training job {job_id}: {e}")
+
+
+def finish_job(redis_conn: redis.Redis, job_id: str, result: dict):
+    """Final status from a TrainingPipeline result dict."""
+    status = {"success": "succeeded", "skipped": "skipped", "rejected": "rejected"}.get(result.get("status"), "failed")
+    fields = {"status": status, "finished_at": _now(), "result": json.dumps(result, default=str)}
+    if status == "failed":
+        fields["error"] = result.get("message", "unknown error")
+    update_job(redis_conn, job_id, **fields)
+
+
+def claim_job(redis_conn: redis.Redis, timeout: float) -> Optional[str]:
+    """Moves the oldest queued job id into the processing list; None after `timeout` seconds."""
+    return redis_conn.blmove(QUEUE_KEY, PROCESSING_KEY, timeout, "RIGHT", "LEFT")
+
+
+def ack_job(redis_conn: redis.Redis, job_id: str):
+    """Drops a finished job from the processing list."""
+    redis_conn.lrem(PROCESSING_KEY, 1, job_id)
+
+
+def recover_stuck_jobs(redis_conn: redis.Redis) -> tuple[int, int]:
+    """
+    Clears jobs left in the processing list by a runner that died or lost the
+    lock; only call it while holding the lock. Jobs that never started go back
+    to the front of the queue. Jobs left "running" are marked failed rather
+    than retried, since a training run that killed its runner (OOM) would
+    kill the next one too. Returns (requeued, failed).
+    """
+    requeued = failed = 0
+    for job_id in redis_conn.lrange(PROCESSING_KEY, 0, -1):
+        status = redis_conn.hget(JOB_KEY.format(job_id=job_id), "status")
+        if status == "queued":
+            pipe = redis_conn.pipeline(transaction=True)
+            pipe.lrem(PROCESSING_KEY, 1, job_id)
+            pipe.rpush(QUEUE_KEY, job_id)
+            pipe.execute()
+            requeued += 1
+            continue
+        if status == "running":
+            update_job(redis_conn, job_id, status="failed", finished_at=_now(),
+                       error="training runner stopped while the job was running")
+            failed += 1
+        ack_job(redis_conn, job_id)
+    return requeued, failed
+
+
+def scheduled_slot(now: datetime, weekday: int, hour: int) -> datetime:
+    """Most recent weekly slot (weekday, hour UTC) at or before `now`."""
+    slot = now.replace(hour=hour, minute=0, second=0, microsecond=0) - timedelta(days=(now.weekday() - weekday) % 7)
+    return slot if slot <= now else slot - timedelta(days=7)
+
+
+def claim_scheduled_slot(redis_conn: redis.Redis, slot: datetime) -> bool:
+    """True for exactly one caller per slot, cluster-wide."""
+    return bool(redis_conn.set(SCHEDULED_KEY.format(slot=slot.strftime("%Y%m%dT%H")), _now(), nx=True, ex=8 * 86400))
+
+
+class TrainingLock:
+    """
+    Redis lease lock (SET NX PX + token). While held, a daemon thread renews
+    the lease every third of its TTL; if a renewal finds the lease gone, `lost`
+    is set so the holder knows another runner may have started.
+    """
+
+    def __init__(self, redis_conn: redis.Redis, ttl_seconds: float, key: str = LOCK_KEY):
+        self.redis = redis_conn
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.key = key
+        self.token = uuid.uuid4().hex
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._renewer: Optional[threading.Thread] = None
+        self._renew = redis_conn.register_script(_RENEW_SCRIPT)
+        self._release = redis_conn.register_script(_RELEASE_SCRIPT)
+
+    def acquire(self, wait_seconds: float = 0.0, poll_seconds: float = 5.0) -> bool:
+        """Tries to take the lease, polling up to `wait_seconds`; starts renewal on success."""
+        deadline = datetime.now(timezone.utc) + timedelta(seconds=wait_seconds)
+        while True:
+            if self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms):
+                self._stop.clear()
+                self.lost.clear()
+                self._renewer = threading.Thread(target=self._renew_loop, name="training-lock-renewer", daemon=True)
+                self._renewer.start()
+                return True
+            if datetime.now(timezone.utc) >= deadline:
+                return False
+            self._stop.wait(poll_seconds)
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.ttl_ms / 3000):
+            try:
+                if not self._renew(keys=[self.key], args=[self.token, self.ttl_ms]):
+                    logger.error("Training lock lease lost; another runner may start a job.")
+                    self.lost.set()
+                    return
+            except redis.RedisError as e:
+                # Keep trying: the lease is still valid until its TTL runs out
+                logger.warning(f"Training lock renewal failed: {e}")
+
+    def release(self):
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join()
+            self._renewer = None
+        try:
+            self._release(keys=[self.key], args=[self.token])
+        except redis.RedisError as e:
+            logger.warning(f"Training lock release failed (expires in {self.ttl_ms} ms): {e}")
@@ -7,7 +7,7 @@ class TrainingService:
     def __init__(self):
         self.pipeline = TrainingPipeline()
 
-    def train_model(self):
+    def train_model(self, incremental: bool = False, progress=None):
         logger.info("Triggering ML training pipeline...")
-        result = self.pipeline.run()
+        result = self.pipeline.run(incremental=incremental, progress=progress)
         return result
@@ -0,0 +1,109 @@
+import argparse
+import logging
+import sys
+import time
+import tracemalloc
+
+import lightgbm as lgb
+import numpy as np
+
+from app.core.config import settings
+from app.models.feature_schema import FEATURE_COLUMNS
+from app.models.lgbm_model import LGBMModel
+from app.models.tree_scorer import FlatTreeScorer, verify_scorer
+
+# Configurar logging para ver el progreso en consola
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger("ScoringBenchmark")
+
+# Filas por llamada: un usuario (limit * 5 candidatos) y lotes de /recommendations:batch
+BATCH_SIZES = (50, 200, 1000, 5000)
+
+
+def synthetic_booster(trees: int, seed: int = 0) -> lgb.Booster:
+    """Modelo con los mismos hiperparámetros que TrainingPipeline, sobre datos aleatorios."""
+    rng = np.random.default_rng(seed)
+    X = rng.gamma(2.0, 10.0, size=(20000, len(FEATURE_COLUMNS))).astype(np.float32)
+    X[rng.random(X.shape) < 0.3] = 0.0
+    y = np.log1p(X[:, 0]) + 0.5 * np.sqrt(X[:, 1]) - 0.1 * X[:, 2] + rng.normal(size=len(X))
+    model = lgb.LGBMRegressor(n_estimators=trees, learning_rate=0.05, max_depth=6, random_state=42, verbose=-1)
+    model.fit(X, y)
+    return model.booster_
+
+
+def feature_matrix(rows: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    X = rng.gamma(2.0, 10.0, size=(rows, len(FEATURE_COLUMNS))).astype(np.float32)
+    X[rng.random(X.shape) < 0.3] = 0.0
+    return X
+
+
+def time_calls(predict, X: np.ndarray, repeat: int) -> tuple[float, float]:
+    """(p50, p99) en milisegundos."""
+    predict(X)  # calentamiento (y buffers del scorer)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict(X)
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(samples, 50)), float(np.percentile(samples, 99))
+
+
+def allocations(predict, X: np.ndarray) -> tuple[int, int]:
+    """(bytes de pico, bloques vivos) reservados en Python/NumPy durante una llamada ya caliente."""
+    predict(X)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = predict(X)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    del result
+    return peak, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia y memoria: Booster.predict vs árboles aplanados")
+    parser.add_argument("--model", default=settings.MODEL_PATH, help="Modelo a medir (por defecto MODEL_PATH)")
+    parser.add_argument("--synthetic", type=int, metavar="TREES", help="Entrena un modelo sintético de TREES árboles en lugar de cargar --model")
+    parser.add_argument("--repeat", type=int, default=200, help="Llamadas medidas por tamaño de lote")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        booster = synthetic_booster(args.synthetic)
+        logger.info(f"Modelo sintético: {booster.num_trees()} árboles")
+    else:
+        model = LGBMModel()
+        model.load(args.model, flat_scorer=False)
+        booster = model.booster
+        logger.info(f"Modelo {args.model}: {booster.num_trees()} árboles")
+
+    scorer = FlatTreeScorer.from_booster(booster)
+    logger.info(f"Árboles aplanados: {len(scorer.tables)} tablas de features, máscaras de {scorer.mask_dtype().nbytes * 8} bits")
+
+    check = feature_matrix(10000, seed=2)
+    check[np.random.default_rng(3).random(check.shape) < 0.05] = np.nan
+    if not verify_scorer(booster, scorer, check):
+        logger.error("❌ El scorer aplanado no coincide bit a bit con Booster.predict.")
+        sys.exit(1)
+    logger.info("✔ Resultados idénticos bit a bit a Booster.predict (10000 filas).")
+
+    paths = {"booster": booster.predict, "flat": scorer.predict}
+    print(f"\n{'filas':>6} {'ruta':>8} {'p50 ms':>9} {'p99 ms':>9} {'µs/fila':>8} {'pico KiB':>9} {'bloques':>8}")
+    for rows in BATCH_SIZES:
+        X = feature_matrix(rows)
+        for name, predict in paths.items():
+            p50, p99 = time_calls(predict, X, args.repeat)
+            peak, blocks = allocations(predict, X)
+            print(f"{rows:>6} {name:>8} {p50:>9.3f} {p99:>9.3f} {p50 * 1000 / rows:>8.2f} {peak / 1024:>9.1f} {blocks:>8}")
+    print("\nLa memoria de Booster.predict reservada dentro de LightGBM (C++) no la ve tracemalloc.")
+
+
+if __name__ == "__main__":
+    main()
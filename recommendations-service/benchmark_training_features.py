@@ -0,0 +1,94 @@
+import argparse
+import logging
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.models.feature_schema import EVENT_TYPES, RELEVANCE_MAP, build_training_matrix
+
+# Configurar logging para ver el progreso en consola
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger("TrainingFeaturesBenchmark")
+
+
+def synthetic_events(rows: int, users: int, contents: int, seed: int = 0) -> pd.DataFrame:
+    """Eventos con los dtypes de EventExtractor; popularidad de contenido tipo Zipf."""
+    rng = np.random.default_rng(seed)
+    weights = np.array([60, 15, 1, 8, 1, 4, 4, 6, 2], dtype=np.float64)
+    categories = [*EVENT_TYPES, "other"]
+    return pd.DataFrame({
+        "user_id": rng.integers(1, users + 1, rows).astype(np.int32),
+        "content_id": (np.minimum(rng.zipf(1.3, rows), contents)).astype(np.int32),
+        "event_type": pd.Categorical.from_codes(rng.choice(len(categories), rows, p=weights / weights.sum()), categories),
+        "event_value": np.ones(rows, dtype=np.float32),
+        "created_at": pd.Timestamp("2026-01-01", tz="UTC") + pd.to_timedelta(rng.integers(0, 90 * 86400, rows), unit="s"),
+    })
+
+
+def legacy_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Implementación anterior: groupby.agg con lambdas por grupo y dos merge."""
+    df = df.copy()
+    df['event_type'] = df['event_type'].astype(object)
+    df['label'] = df['event_type'].map(RELEVANCE_MAP).fillna(0.0)
+    user_stats = df.groupby('user_id').agg(
+        user_total_events=('event_type', 'count'),
+        user_total_likes=('event_type', lambda x: (x == 'like').sum()),
+        user_avg_activity=('label', 'mean')
+    ).reset_index()
+    content_stats = df.groupby('content_id').agg(
+        content_total_events=('event_type', 'count'),
+        content_total_likes=('event_type', lambda x: (x == 'like').sum()),
+        content_avg_rating=('label', 'mean')
+    ).reset_index()
+    df = df.merge(user_stats, on='user_id', how='left')
+    df = df.merge(content_stats, on='content_id', how='left')
+    df['created_at'] = pd.to_datetime(df['created_at'])
+    df['hour_of_day'] = df['created_at'].dt.hour
+    df['day_of_week'] = df['created_at'].dt.dayofweek
+    df.fillna(0, inplace=True)
+    return df
+
+
+def vectorized_features(df: pd.DataFrame) -> np.ndarray:
+    """Implementación actual: registro de features (np.bincount + índices inversos)."""
+    return build_training_matrix(df)
+
+
+IMPLEMENTATIONS = {"legacy": legacy_features, "vectorized": vectorized_features}
+
+
+def run(name: str, rows: int, users: int, contents: int) -> tuple[float, float, float]:
+    """(segundos, MB de RSS antes, MB de RSS pico) en un proceso nuevo."""
+    df = synthetic_events(rows, users, contents)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start = time.perf_counter()
+    IMPLEMENTATIONS[name](df)
+    seconds = time.perf_counter() - start
+    return seconds, rss_before, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo y memoria de las features de entrenamiento: antes vs ahora")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Eventos sintéticos")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--contents", type=int, default=50_000)
+    args = parser.parse_args()
+
+    # Cada implementación en su propio proceso: el pico de RSS no se mezcla
+    context = multiprocessing.get_context("spawn")
+    print(f"\n{'implementación':>14} {'segundos':>9} {'RSS datos MB':>13} {'RSS pico MB':>12} {'extra MB':>9}")
+    for name in IMPLEMENTATIONS:
+        with context.Pool(1) as pool:
+            seconds, rss_before, rss_peak = pool.apply(run, (name, args.rows, args.users, args.contents))
+        print(f"{name:>14} {seconds:>9.2f} {rss_before:>13.0f} {rss_peak:>12.0f} {rss_peak - rss_before:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import logging
+import sys
+
+from app.pipelines.item_index_pipeline import ItemIndexPipeline
+
+# Configurar logging para ver el progreso en consola
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger("ItemIndexRunner")
+
+
+def main():
+    logger.info("--- Construyendo índice item-item de co-engagement ---")
+    if ItemIndexPipeline().run():
+        logger.info("✔ Índice item-item guardado correctamente.")
+        sys.exit(0)
+    else:
+        logger.error("❌ La construcción del índice falló. Revisa los logs anteriores.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
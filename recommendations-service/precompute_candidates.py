@@ -4,21 +4,52 @@ precompute_candidates.py — ETL Batch Pipeline
 This script should be run periodically (e.g., every 15-30 minutes via cron/scheduler)
 to precompute recommendation candidates for all active users and store them in Redis.
 
+Set-based and parallel:
+  1. The global ranked list (top engaged content) is loaded once.
+  2. The user space is sharded by user_id % shards across a process pool.
+  3. Each shard streams its users' seen-sets and most recent positives with ONE
+     grouped query over a server-side cursor (user_features + user_seen_content,
+     plus a per-user LIMIT over that user's tracking_events, no full scan),
+     puts the item-index neighbours of those positives (the same seeds as the
+     online co-engagement source) and their ALS embedding nearest neighbours ahead of the ranked list, filters out seen items in memory and writes candidates
+     with pipelined SETEX.
+Throughput (users/s) is logged per shard and for the whole run.
+
+Incremental mode (--incremental) only recomputes:
+  - dirty users: the tracking worker SADDs every user it persists events for
+    to precompute:dirty_users. A run moves the set to a processing key and
+    deletes it once every shard succeeded, so a failed run is retried.
+  - near-expiry users: every write records the candidates' expiry in the
+    precompute:candidates_expiry ZSET; users expiring within the margin are
+    refreshed before they fall back to the online path.
+Work per cycle is O(changed users), so it can run every minute (--loop 60).
+
 Usage:
-    python precompute_candidates.py
+    python precompute_candidates.py [--workers N] [--incremental] [--loop SECONDS]
 
 Environment:
     Requires DATABASE_URL, REDIS_HOST, REDIS_PORT to be set in .env
 """
 
+import argparse
 import json
 import logging
+import multiprocessing
+import os
 import time
-from app.database.connection import SessionLocal
-from app.cache.redis_client import get_redis
-from app.repositories.tracking_repo import TrackingRepository
-from app.repositories.content_repo import ContentRepository
-from sqlalchemy import text
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
+
+import numpy as np
+import redis
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.database.connection import DATABASE_URL
+from app.pipelines.item_index_pipeline import POSITIVE_EVENT_TYPES
+from app.services.embedding_index import load_embedding_index
+from app.services.item_index import ItemNeighborIndex, load_item_index, merge_ranked
 
 # Setup logging
 logging.basicConfig(
@@ -31,13 +62,40 @@ logger = logging.getLogger("PrecomputeCandidates")
 CANDIDATES_TTL = 1800  # 30 minutes
 POPULAR_TTL = 900  # 15 minutes
 MAX_CANDIDATES_PER_USER = 50
+POPULAR_ITEMS = 100
+
+# Users with events in the last ACTIVE_DAYS are precomputed
+ACTIVE_DAYS = 7
+# Rows fetched per round trip from the server-side cursor
+STREAM_BATCH_ROWS = 2000
+# SETEX commands per Redis pipeline round trip
+REDIS_PIPELINE_SIZE = 1000
+
+# Incremental mode (keys shared with tracking-service app/services/recommendation_signals.py)
+DIRTY_USERS_KEY = "precompute:dirty_users"
+DIRTY_PROCESSING_KEY = "precompute:dirty_users:processing"
+CANDIDATES_EXPIRY_KEY = "precompute:candidates_expiry"
+# Candidates expiring within this window are refreshed (at least two loop intervals)
+NEAR_EXPIRY_SECONDS = 300
+# Smaller incremental runs are computed in-process instead of spawning the pool
+INCREMENTAL_POOL_MIN_USERS = 5000
 
 
-def precompute_popular_items(db, redis_conn):
-    """Compute global popular items and store in Redis."""
-    content_repo = ContentRepository(db)
-    top_items = content_repo.get_top_content_by_engagement(limit=100)
-    popular_ids = [item["content_id"] for item in top_items]
+def load_global_ranked(engine) -> np.ndarray:
+    """Content ids by engagement, the shared source every user's candidates are cut from."""
+    with engine.connect() as conn:
+        result = conn.execute(text("""
+            SELECT content_id
+            FROM content_metrics
+            ORDER BY engagement_rate DESC, total_views DESC
+            LIMIT :limit
+        """), {"limit": settings.RECS_GLOBAL_RANKED_SIZE})
+        return np.array([row[0] for row in result], dtype=np.int64)
+
+
+def precompute_popular_items(redis_conn, ranked: np.ndarray):
+    """Store the head of the global ranked list as the cold-start popular items."""
+    popular_ids = ranked[:POPULAR_ITEMS].tolist()
 
     if popular_ids:
         redis_conn.setex(
@@ -50,75 +108,227 @@ def precompute_popular_items(db, redis_conn):
         logger.warning("No popular items found in content_metrics")
 
 
-def precompute_user_candidates(db, redis_conn):
-    """For each active user, compute personalized candidates and cache in Redis."""
-    # Get active users (users who have events in the last 7 days)
-    result = db.execute(text("""
-        SELECT DISTINCT user_id
-        FROM tracking_events
-        WHERE created_at > NOW() - INTERVAL '7 days'
-    """))
-    active_user_ids = [row[0] for row in result]
+def compute_candidates(
+    ranked: np.ndarray,
+    seen_ids,
+    recent_positive_ids=None,
+    index: Optional[ItemNeighborIndex] = None,
+    embedding_ids: Optional[np.ndarray] = None,
+) -> list[int]:
+    """
+    Neighbours of the user's most recent positives (the same seeds as the
+    online co-engagement source), then the embedding candidates, then the
+    ranked list, minus the content the user has already seen.
+    """
+    sources = []
+    if recent_positive_ids and index is not None:
+        sources.append(index.neighbors_of(recent_positive_ids))
+    if embedding_ids is not None:
+        sources.append(embedding_ids)
+    if sources:
+        ranked = merge_ranked(*sources, ranked)
+    if seen_ids:
+        ranked = ranked[~np.isin(ranked, np.asarray(seen_ids, dtype=np.int64))]
+    return ranked[:MAX_CANDIDATES_PER_USER].tolist()
 
-    logger.info(f"Found {len(active_user_ids)} active users to precompute candidates for")
 
-    tracking_repo = TrackingRepository(db)
-    content_repo = ContentRepository(db)
+def precompute_shard(
+    shard: int,
+    shards: int,
+    ranked: np.ndarray,
+    user_ids: Optional[list[int]] = None,
+) -> tuple[int, int, float]:
+    """
+    Process-pool task: computes and stores candidates for the active users with
+    user_id % shards == shard, or only for `user_ids` (already this shard's)
+    when given. Returns (users seen, users stored, seconds).
+    """
+    start = time.time()
+    # Fresh connections per process; never share pools across a fork/spawn
+    engine = create_engine(DATABASE_URL, poolclass=NullPool)
+    redis_conn = redis.Redis.from_url(settings.REDIS_URL)
+    index = load_item_index(settings.ITEM_INDEX_PATH)
+    # Memory-mapped: every shard process shares the same pages
+    embeddings = load_embedding_index(settings.EMBEDDING_DIR)
 
-    computed = 0
-    for user_id in active_user_ids:
-        try:
-            # Get content the user has already seen
-            seen_ids = tracking_repo.get_interacted_content_ids(user_id)
+    if user_ids is None:
+        user_filter = "uf.user_id % :shards = :shard"
+        params = {"shards": shards, "shard": shard}
+    else:
+        user_filter = "uf.user_id = ANY(:user_ids)"
+        params = {"user_ids": user_ids}
+    params["active_days"] = ACTIVE_DAYS
+    params["positive_types"] = list(POSITIVE_EVENT_TYPES)
+    params["recent_positives"] = settings.ITEM_INDEX_RECENT_POSITIVES
 
-            # Get top engaged content excluding already seen
-            top_content = content_repo.get_top_content_by_engagement(
-                limit=MAX_CANDIDATES_PER_USER,
-                exclude_ids=seen_ids if seen_ids else None,
+    users, stored = 0, 0
+    written: set[int] = set()
+    try:
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=STREAM_BATCH_ROWS).execute(text(f"""
+                SELECT uf.user_id,
+                       array_remove(array_agg(usc.content_id), NULL) AS seen_ids,
+                       -- Item-index seeds: same query as the online path
+                       -- (TrackingRepository.get_recent_positive_content_ids_for_users)
+                       (SELECT array_agg(recent.content_id)
+                        FROM (
+                            SELECT te.content_id
+                            FROM tracking_events te
+                            WHERE te.user_id = uf.user_id
+                              AND te.event_type = ANY(:positive_types)
+                              AND te.content_id > 0
+                            GROUP BY te.content_id
+                            ORDER BY MAX(te.created_at) DESC
+                            LIMIT :recent_positives
+                        ) recent) AS recent_positive_ids
+                FROM user_features uf
+                LEFT JOIN user_seen_content usc ON usc.user_id = uf.user_id
+                WHERE uf.updated_at > NOW() - make_interval(days => :active_days)
+                  AND {user_filter}
+                GROUP BY uf.user_id
+            """), params)
+
+            pipe = redis_conn.pipeline(transaction=False)
+            for user_id, seen_ids, recent_positive_ids in result:
+                users += 1
+                embedding_ids = None
+                if embeddings is not None:
+                    embedding_ids = embeddings.search_user(user_id, settings.EMBEDDING_CANDIDATES, settings.EMBEDDING_NPROBE)
+                candidate_ids = compute_candidates(ranked, seen_ids, recent_positive_ids, index, embedding_ids)
+                if candidate_ids:
+                    pipe.setex(f"user:{user_id}:candidates", CANDIDATES_TTL, json.dumps(candidate_ids))
+                    pipe.zadd(CANDIDATES_EXPIRY_KEY, {user_id: time.time() + CANDIDATES_TTL})
+                    written.add(user_id)
+                    stored += 1
+                if len(pipe) >= REDIS_PIPELINE_SIZE:
+                    pipe.execute()
+
+            # Targeted users that went inactive (or saw everything) stop being tracked
+            dropped = set(user_ids or ()) - written
+            if dropped:
+                pipe.zrem(CANDIDATES_EXPIRY_KEY, *dropped)
+            pipe.execute()
+    finally:
+        engine.dispose()
+        redis_conn.close()
+
+    return users, stored, time.time() - start
+
+
+def precompute_user_candidates(
+    ranked: np.ndarray,
+    workers: int,
+    user_ids: Optional[list[int]] = None,
+) -> tuple[int, int, bool]:
+    """
+    Shards the active users (or just `user_ids`) across `workers` processes.
+    Returns (users, stored, every shard succeeded).
+    """
+    shard_users = None
+    if user_ids is not None:
+        shard_users = [[] for _ in range(workers)]
+        for user_id in user_ids:
+            shard_users[user_id % workers].append(user_id)
+
+    total_users, total_stored, ok = 0, 0, True
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {
+            pool.submit(precompute_shard, shard, workers, ranked, shard_users and shard_users[shard]): shard
+            for shard in range(workers)
+            if shard_users is None or shard_users[shard]
+        }
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                users, stored, elapsed = future.result()
+            except Exception as e:
+                logger.error(f"Shard {shard}/{workers} failed: {e}")
+                ok = False
+                continue
+            total_users += users
+            total_stored += stored
+            logger.info(
+                f"Shard {shard}/{workers}: {stored}/{users} users in {elapsed:.1f}s "
+                f"({users / elapsed if elapsed else 0:.0f} users/s)"
             )
 
-            candidate_ids = [item["content_id"] for item in top_content]
+    logger.info(f"✔ Precomputed candidates for {total_stored}/{total_users} users")
+    return total_users, total_stored, ok
 
-            if candidate_ids:
-                cache_key = f"user:{user_id}:candidates"
-                redis_conn.setex(
-                    cache_key,
-                    CANDIDATES_TTL,
-                    json.dumps(candidate_ids),
-                )
-                computed += 1
 
-        except Exception as e:
-            logger.error(f"Failed to compute candidates for user {user_id}: {e}")
+def claim_incremental_users(redis_conn, near_expiry: float) -> list[int]:
+    """
+    Moves the dirty set into the processing key (merging leftovers of a failed
+    run) and returns it together with the users whose candidates expire soon.
+    """
+    pipe = redis_conn.pipeline(transaction=True)
+    pipe.sunionstore(DIRTY_PROCESSING_KEY, [DIRTY_PROCESSING_KEY, DIRTY_USERS_KEY])
+    pipe.delete(DIRTY_USERS_KEY)
+    pipe.smembers(DIRTY_PROCESSING_KEY)
+    # Entries already past their expiry are gone from Redis; drop them from the index
+    pipe.zremrangebyscore(CANDIDATES_EXPIRY_KEY, "-inf", time.time())
+    pipe.zrangebyscore(CANDIDATES_EXPIRY_KEY, "-inf", time.time() + near_expiry)
+    _, _, dirty, _, expiring = pipe.execute()
 
-    logger.info(f"✔ Precomputed candidates for {computed}/{len(active_user_ids)} users")
+    user_ids = {int(user_id) for user_id in dirty} | {int(user_id) for user_id in expiring}
+    logger.info(f"Incremental run: {len(dirty)} dirty + {len(expiring)} near-expiry users")
+    return sorted(user_ids)
 
 
-def run():
+def run(workers: int, incremental: bool = False, near_expiry: float = NEAR_EXPIRY_SECONDS):
     """Main entry point for the ETL pipeline."""
     start = time.time()
     logger.info("=" * 60)
-    logger.info("Starting candidate precomputation pipeline...")
-
-    db = SessionLocal()
-    redis_conn = get_redis()
+    mode = "incremental" if incremental else "full"
+    logger.info(f"Starting {mode} candidate precomputation pipeline ({workers} workers)...")
 
+    users = 0
+    redis_conn = redis.Redis.from_url(settings.REDIS_URL)
     try:
+        engine = create_engine(DATABASE_URL, poolclass=NullPool)
+        ranked = load_global_ranked(engine)
+        engine.dispose()
+
         # Step 1: Global popular items
-        precompute_popular_items(db, redis_conn)
+        precompute_popular_items(redis_conn, ranked)
 
         # Step 2: Per-user candidates
-        precompute_user_candidates(db, redis_conn)
+        if len(ranked) and not incremental:
+            users, _stored, _ok = precompute_user_candidates(ranked, workers)
+        elif len(ranked):
+            user_ids = claim_incremental_users(redis_conn, near_expiry)
+            ok = True
+            if len(user_ids) >= INCREMENTAL_POOL_MIN_USERS and workers > 1:
+                users, _stored, ok = precompute_user_candidates(ranked, workers, user_ids)
+            elif user_ids:
+                users, stored, _elapsed = precompute_shard(0, 1, ranked, user_ids)
+                logger.info(f"✔ Precomputed candidates for {stored}/{users} users")
+            if ok:
+                redis_conn.delete(DIRTY_PROCESSING_KEY)
 
     except Exception as e:
         logger.error(f"Pipeline failed: {e}")
     finally:
-        db.close()
+        redis_conn.close()
 
     elapsed = time.time() - start
-    logger.info(f"Pipeline completed in {elapsed:.2f}s")
+    logger.info(f"Pipeline completed in {elapsed:.2f}s ({users / elapsed if elapsed else 0:.0f} users/s)")
     logger.info("=" * 60)
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Precompute recommendation candidates into Redis")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes / user shards")
+    parser.add_argument("--incremental", action="store_true", help="Only dirty and near-expiry users")
+    parser.add_argument("--loop", type=float, default=0, help="Repeat every N seconds instead of running once")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    near_expiry = max(NEAR_EXPIRY_SECONDS, 2 * args.loop)
+    while True:
+        cycle_start = time.time()
+        run(workers, args.incremental, near_expiry)
+        if args.loop <= 0:
+            break
+        time.sleep(max(0.0, args.loop - (time.time() - cycle_start)))
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from app.models.feature_schema import CONTENT_SLICE, build_training_matrix, content_feature_matrix
+
+# tracking-service metrics_service: counter each event type moves in content_metrics, and by how much
+CONTENT_METRIC_STEPS = {
+    "view": ("total_views", 1),
+    "like": ("total_likes", 1),
+    "bookmark": ("total_bookmarks", 1),
+    "share": ("total_shares", 1),
+    "comment": ("total_comments", 1),
+    "unlike": ("total_likes", -1),
+    "unbookmark": ("total_bookmarks", -1),
+}
+
+CONTENT_ID = 7
+# An unlike before any like (floored at 0), likes undone and redone, other
+# content and event types the counters ignore
+EVENT_LOG = [
+    (1, CONTENT_ID, "unlike"),
+    (1, CONTENT_ID, "view"),
+    (1, CONTENT_ID, "like"),
+    (2, CONTENT_ID, "like"),
+    (2, 8, "like"),
+    (1, CONTENT_ID, "unlike"),
+    (3, CONTENT_ID, "bookmark"),
+    (3, CONTENT_ID, "unbookmark"),
+    (3, CONTENT_ID, "unbookmark"),
+    (4, CONTENT_ID, "share"),
+    (4, CONTENT_ID, "search_click"),
+    (1, CONTENT_ID, "like"),
+    (5, CONTENT_ID, "comment"),
+    (5, 8, "unlike"),
+]
+
+
+def events_frame(log) -> pd.DataFrame:
+    return pd.DataFrame({
+        "user_id": [user_id for user_id, _, _ in log],
+        "content_id": [content_id for _, content_id, _ in log],
+        "event_type": [event_type for _, _, event_type in log],
+        "created_at": pd.date_range("2026-01-01", periods=len(log), freq="min", tz="UTC"),
+    })
+
+
+def content_metrics_row(log, content_id: int) -> dict:
+    """content_metrics row for `content_id` after the tracking worker applies `log` event by event."""
+    row = dict.fromkeys((column for column, _ in CONTENT_METRIC_STEPS.values()), 0)
+    for _, event_content_id, event_type in log:
+        if event_content_id == content_id and event_type in CONTENT_METRIC_STEPS:
+            column, step = CONTENT_METRIC_STEPS[event_type]
+            row[column] = max(row[column] + step, 0)
+    return row
+
+
+def test_point_in_time_content_features_match_serving_counters():
+    probe = (9, CONTENT_ID, "view")
+    matrix = build_training_matrix(events_frame([*EVENT_LOG, probe]), point_in_time=True)
+
+    serving = content_feature_matrix([content_metrics_row(EVENT_LOG, CONTENT_ID)])
+    np.testing.assert_array_equal(matrix[-1, CONTENT_SLICE], serving[0])
+
+
+def test_every_point_in_time_row_matches_serving_counters():
+    matrix = build_training_matrix(events_frame(EVENT_LOG), point_in_time=True)
+
+    for i, (_, content_id, _) in enumerate(EVENT_LOG):
+        serving = content_feature_matrix([content_metrics_row(EVENT_LOG[:i], content_id)])
+        np.testing.assert_array_equal(matrix[i, CONTENT_SLICE], serving[0])
+
+
+def test_aggregate_content_features_match_serving_counters():
+    matrix = build_training_matrix(events_frame(EVENT_LOG))
+
+    serving = content_feature_matrix([content_metrics_row(EVENT_LOG, CONTENT_ID)])
+    np.testing.assert_array_equal(matrix[0, CONTENT_SLICE], serving[0])
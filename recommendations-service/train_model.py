@@ -1,3 +1,4 @@
+import argparse
 import logging
 from app.pipelines.training_pipeline import TrainingPipeline
 import sys
@@ -11,12 +12,19 @@ logging.basicConfig(
 logger = logging.getLogger("TrainRunner")
 
 def main():
+    parser = argparse.ArgumentParser(description="Re-entrenamiento del modelo de ranking")
+    parser.add_argument("--incremental", action="store_true", help="Continúa el modelo actual solo con los eventos nuevos")
+    args = parser.parse_args()
+
     logger.info("--- Iniciando Proceso de Re-entrenamiento de Modelo ---")
     pipeline = TrainingPipeline()
-    success = pipeline.run()
+    result = pipeline.run(incremental=args.incremental)
     
-    if success:
-        logger.info("✔ Modelo entrenado y guardado correctamente.")
+    if result.get("status") == "success":
+        logger.info(f"✔ Modelo entrenado ({result['mode']}) y guardado correctamente. RMSE: {result['rmse']:.4f}")
+        sys.exit(0)
+    elif result.get("status") in ("skipped", "rejected"):
+        logger.info(f"Modelo actual sin cambios ({result['status']}).")
         sys.exit(0)
     else:
         logger.error("❌ El entrenamiento falló. Revisa los logs anteriores.")
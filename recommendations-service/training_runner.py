@@ -0,0 +1,168 @@
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import redis
+
+from app.core.config import settings
+from app.services.training_jobs import (
+    FINAL_STATUSES,
+    JOB_KEY,
+    TrainingLock,
+    ack_job,
+    claim_job,
+    claim_scheduled_slot,
+    enqueue_training_job_sync,
+    finish_job,
+    recover_stuck_jobs,
+    scheduled_slot,
+    update_job,
+)
+
+# Configurar logging para ver el progreso en consola
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger("TrainingRunner")
+
+# Segundos de espera bloqueante en la cola antes de revisar la planificación
+POLL_SECONDS = 5
+# Un slot semanal perdido (runner caído) se recupera solo dentro de este margen
+SCHEDULE_GRACE = timedelta(hours=6)
+
+_stopping = False
+
+
+def parse_cpus(spec: str) -> set[int]:
+    """'0-3,6' -> {0, 1, 2, 3, 6}; vacío = sin restricción."""
+    cpus = set()
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def apply_resource_limits():
+    """
+    Afinidad de CPU (TRAINING_CPUS) y niceness (TRAINING_NICE) del runner; los
+    procesos de entrenamiento las heredan, y OpenMP (LightGBM) dimensiona sus
+    hilos según la afinidad.
+    """
+    cpus = parse_cpus(settings.TRAINING_CPUS)
+    if cpus:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+            logger.info(f"CPU affinity: {sorted(cpus)}")
+        else:
+            logger.warning("CPU affinity not supported on this platform; TRAINING_CPUS ignored")
+    if settings.TRAINING_NICE:
+        logger.info(f"Niceness: {os.nice(settings.TRAINING_NICE)}")
+
+
+def run_job(job_id: str, mode: str):
+    """Proceso hijo: ejecuta el pipeline y deja el resultado en el registro del job."""
+    from app.services.training_service import TrainingService
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    redis_conn = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    try:
+        result = TrainingService().train_model(
+            incremental=mode == "incremental",
+            progress=lambda step: update_job(redis_conn, job_id, step=step),
+        )
+    except Exception as e:
+        result = {"status": "error", "message": str(e)}
+    finish_job(redis_conn, job_id, result)
+
+
+def execute(redis_conn: redis.Redis, lock: TrainingLock, job_id: str):
+    record = redis_conn.hgetall(JOB_KEY.format(job_id=job_id))
+    if not record:
+        logger.warning(f"Job {job_id} has no record (expired?); skipped.")
+        return
+    mode = record.get("mode", "full")
+    logger.info(f"--- Job {job_id}: entrenamiento {mode} ({record.get('source')}) ---")
+    update_job(redis_conn, job_id, status="running", started_at=datetime.now(timezone.utc).isoformat(), worker=os.uname().nodename)
+
+    # Proceso propio por job: la memoria del entrenamiento se libera al terminar
+    child = multiprocessing.get_context("spawn").Process(target=run_job, args=(job_id, mode), name=f"training-{job_id}")
+    child.start()
+    while child.is_alive():
+        child.join(1)
+        # Sin lock otro runner puede haber empezado: nunca dos entrenamientos a la vez
+        if _stopping or lock.lost.is_set():
+            logger.warning(f"{'Stopping' if _stopping else 'Training lock lost'}: terminating job {job_id}")
+            child.terminate()
+            child.join()
+
+    error = f"training process exited with code {child.exitcode}"
+    if lock.lost.is_set():
+        update_job(redis_conn, job_id, lock_lost=1)
+        error = "training lock lost"
+    if redis_conn.hget(JOB_KEY.format(job_id=job_id), "status") not in FINAL_STATUSES:
+        update_job(redis_conn, job_id, status="failed", finished_at=datetime.now(timezone.utc).isoformat(), error=error)
+    logger.info(f"Job {job_id}: {redis_conn.hget(JOB_KEY.format(job_id=job_id), 'status')}")
+
+
+def enqueue_scheduled(redis_conn: redis.Redis):
+    """Encola la ejecución semanal una sola vez en todo el clúster."""
+    if settings.TRAINING_SCHEDULE_WEEKDAY < 0:
+        return
+    now = datetime.now(timezone.utc)
+    slot = scheduled_slot(now, settings.TRAINING_SCHEDULE_WEEKDAY, settings.TRAINING_SCHEDULE_HOUR)
+    if now - slot <= SCHEDULE_GRACE and claim_scheduled_slot(redis_conn, slot):
+        record = enqueue_training_job_sync(redis_conn, settings.TRAINING_SCHEDULE_MODE, source="schedule")
+        logger.info(f"Scheduled training queued: job {record['job_id']}")
+
+
+def main():
+    global _stopping
+
+    def stop(signum, frame):
+        global _stopping
+        _stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    apply_resource_limits()
+    redis_conn = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    logger.info("--- Training runner iniciado: esperando jobs ---")
+
+    while not _stopping:
+        try:
+            enqueue_scheduled(redis_conn)
+            # Solo quien tiene el lock saca jobs de la cola: un entrenamiento a la vez
+            lock = TrainingLock(redis_conn, settings.TRAINING_LOCK_SECONDS)
+            if not lock.acquire():
+                time.sleep(POLL_SECONDS)
+                continue
+            try:
+                # Jobs que un runner caído dejó a medias (incluido este, si se reinició)
+                requeued, failed = recover_stuck_jobs(redis_conn)
+                if requeued or failed:
+                    logger.warning(f"Recovered stuck jobs: {requeued} requeued, {failed} marked failed")
+                # El job queda en training:processing hasta terminar: si el runner
+                # muere, el siguiente que tome el lock lo recupera
+                job_id = claim_job(redis_conn, POLL_SECONDS)
+                if job_id is not None:
+                    execute(redis_conn, lock, job_id)
+                    ack_job(redis_conn, job_id)
+            finally:
+                lock.release()
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable: {e}")
+            time.sleep(POLL_SECONDS)
+
+    logger.info("Training runner detenido.")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,7 @@ if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 from app.database.connection import Base
-from app.models import tracking_event, content_watch_time
+from app.models import tracking_event, content_watch_time, user_features
 from app.core.config import settings
 
 target_metadata = Base.metadata
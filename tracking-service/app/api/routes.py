@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, status
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.api import schemas
+from app.core.config import settings
 from app.database.connection import get_db
 from app.core.security import verify_api_key
 
@@ -16,10 +20,112 @@ async def track_event(
     Returns 202 immediately, DB writing happens via Redis Queue + Worker.
     """
     from app.services.tracking_service import publish_event_to_queue
-    publish_event_to_queue(event)
+    await publish_event_to_queue(event)
     return {"status": "accepted", "message": "Event queued for processing"}
 
 
+def _batch_too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=413, detail=detail)
+
+
+async def _read_batch_body(request: Request) -> bytes:
+    """
+    Reads the body, refusing it with 413 as soon as it is known to exceed
+    EVENTS_BATCH_MAX_BYTES: from Content-Length before reading anything, or
+    while streaming when the header is missing or wrong.
+    """
+    limit = settings.EVENTS_BATCH_MAX_BYTES
+    too_large = _batch_too_large(f"Batch body exceeds {limit} bytes")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise too_large
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+
+def _parse_batch_body(body: bytes, content_type: str) -> list:
+    """
+    Splits a batch body into raw items. NDJSON lines that are not valid JSON are
+    returned as the exception so they are rejected individually. NDJSON
+    splitting stops at the first line past EVENTS_BATCH_MAX_ITEMS.
+    """
+    if "ndjson" in content_type:
+        items = []
+        start = 0
+        while start < len(body):
+            end = body.find(b"\n", start)
+            end = len(body) if end < 0 else end
+            line = body[start:end]
+            start = end + 1
+            if not line.strip():
+                continue
+            if len(items) == settings.EVENTS_BATCH_MAX_ITEMS:
+                raise _batch_too_large(f"Batch exceeds {settings.EVENTS_BATCH_MAX_ITEMS} events")
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(e)
+        return items
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if isinstance(payload, dict):
+        payload = payload.get("events")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    return payload
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}" for err in exc.errors()
+    )
+
+
+@router.post("/events:batch", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.TrackingEventBatchResponse)
+async def track_events_batch(request: Request):
+    """
+    Ingests up to EVENTS_BATCH_MAX_ITEMS events (EVENTS_BATCH_MAX_BYTES of
+    body) in one call; both limits are enforced before the items are parsed.
+    Body: JSON array (or {"events": [...]}) or NDJSON (Content-Type: application/x-ndjson).
+    All items are validated in one pass and the valid ones are enqueued with a
+    single pipelined Redis call. Invalid items are reported per index and never
+    fail the rest of the batch, so producers can coalesce freely.
+    """
+    from app.services.tracking_service import publish_events_to_queue
+
+    items = _parse_batch_body(await _read_batch_body(request), request.headers.get("content-type", ""))
+    if len(items) > settings.EVENTS_BATCH_MAX_ITEMS:
+        raise _batch_too_large(f"Batch exceeds {settings.EVENTS_BATCH_MAX_ITEMS} events")
+
+    events, results = [], []
+    for index, item in enumerate(items):
+        if isinstance(item, Exception):
+            results.append({"index": index, "status": "rejected", "error": f"invalid JSON: {item}"})
+            continue
+        try:
+            events.append(schemas.TrackingEventCreate.model_validate(item))
+            results.append({"index": index, "status": "accepted"})
+        except ValidationError as e:
+            results.append({"index": index, "status": "rejected", "error": _format_validation_error(e)})
+
+    await publish_events_to_queue(events)
+
+    return {
+        "status": "accepted",
+        "accepted": len(events),
+        "rejected": len(items) - len(events),
+        "results": results,
+    }
+
+
 @router.post("/watch-time", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.WatchTimeResponse)
 async def track_watch_time(
     data: schemas.WatchTimeCreate,
@@ -39,13 +145,13 @@ async def track_watch_time(
         event_value=data.watched_seconds,
         metadata={"source": "watch_time"},
     )
-    publish_event_to_queue(synthetic_event)
+    await publish_event_to_queue(synthetic_event)
     return {"status": "accepted", "message": "Watch time queued for processing"}
 
 
 @router.get("/health")
-async def health_check(db: Session = Depends(get_db)):
-    """Deep health check validating DB connection"""
+def health_check(db: Session = Depends(get_db)):
+    """Deep health check validating DB connection (sync: runs in the threadpool, off the event loop)"""
     is_db_up = False
     try:
         db.execute(text("SELECT 1"))
@@ -61,7 +167,7 @@ async def health_check(db: Session = Depends(get_db)):
 
 
 @router.get("/internal/analytics/overview")
-async def get_analytics_overview(db: Session = Depends(get_db)):
+def get_analytics_overview(db: Session = Depends(get_db)):
     """
     Returns high-level content analytics (Top 10 videos by engagement and views).
     Protected by API Key dependency on the router.
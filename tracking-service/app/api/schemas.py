@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
 
 class TrackingEventBase(BaseModel):
     user_id: int = Field(..., gt=0, description="User ID must be positive")
@@ -21,6 +21,19 @@ class TrackingEventResponse(BaseModel):
     message: str
 
 
+class BatchItemResult(BaseModel):
+    index: int
+    status: Literal["accepted", "rejected"]
+    error: Optional[str] = None
+
+
+class TrackingEventBatchResponse(BaseModel):
+    status: str
+    accepted: int
+    rejected: int
+    results: List[BatchItemResult]
+
+
 class WatchTimeCreate(BaseModel):
     user_id: int
     content_id: int
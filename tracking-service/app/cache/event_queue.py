@@ -0,0 +1,296 @@
+"""
+Event Queue — Transport abstraction shared by the API (publish) and the worker (consume).
+
+Backends (settings.QUEUE_BACKEND):
+  - "list":   LPUSH / BLMOVE into a per-worker processing list. Single consumer
+              per processing list; the whole list is acknowledged at once.
+              Each worker keeps a heartbeat key alive; processing lists of
+              workers whose heartbeat expired are taken over by the others.
+  - "stream": Redis Streams with a consumer group (XADD / XREADGROUP / XACK /
+              XAUTOCLAIM). Safe for N worker replicas: entries stay pending
+              until acknowledged and are reclaimed from dead consumers.
+
+Both backends give at-least-once delivery; failed payloads go to the same DLQ list.
+A queue built on a redis.asyncio client returns awaitables from publish().
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Optional, Union
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueueMessage(NamedTuple):
+    id: Union[bytes, str, None]
+    payload: bytes
+
+
+class EventQueue(ABC):
+    """Base class: publish on the API side, read/ack/reclaim on the worker side."""
+
+    def __init__(self, redis_conn: redis.Redis):
+        self.redis = redis_conn
+        self.dlq_name = f"{settings.REDIS_QUEUE_NAME}:dlq"
+
+    @abstractmethod
+    def publish(self, payload: Union[str, bytes]):
+        """Enqueues one payload; returns the client's result (awaitable with redis.asyncio)."""
+
+    @abstractmethod
+    def publish_many(self, payloads: list[Union[str, bytes]]):
+        """Enqueues several payloads in a single round trip (same return contract as publish)."""
+
+    @abstractmethod
+    def read(self, count: int, block: Optional[float] = None) -> list[QueueMessage]:
+        """Reads up to `count` messages, blocking up to `block` seconds for the first one."""
+
+    @abstractmethod
+    def ack(self, messages: list[QueueMessage]):
+        """Acknowledges messages returned by read() or reclaim()."""
+
+    @abstractmethod
+    def reclaim(self, own: bool = True) -> list[QueueMessage]:
+        """
+        Returns messages read earlier but never acknowledged: this consumer's own
+        (left by a crashed previous run) when `own` is set, plus those of dead
+        consumers where the transport can detect them.
+        """
+
+    def heartbeat(self):
+        """Marks this consumer alive, for transports that detect dead consumers that way."""
+
+    def dead_letter(self, messages: list[QueueMessage]):
+        """Moves raw payloads to the DLQ so failed events are not lost."""
+        if not messages:
+            return
+        try:
+            self.redis.lpush(self.dlq_name, *[m.payload for m in messages])
+            logger.warning("%d event(s) moved to DLQ: %s", len(messages), self.dlq_name)
+        except Exception:
+            for message in messages:
+                logger.critical("Failed to send event to DLQ — event LOST: %s", message.payload[:200])
+
+
+class ListEventQueue(EventQueue):
+    """
+    LPUSH producers, BLMOVE consumer. Read messages are moved into this worker's
+    processing list and stay there until ack(), which drops the whole list —
+    callers must acknowledge everything they have read at once. WORKER_ID
+    need not be stable: reclaim(own=False) takes over the processing lists
+    of workers whose heartbeat key has expired.
+    """
+
+    # Moves up to ARGV[1] events from the queue to the processing list atomically
+    _MOVE_BATCH_LUA = """
+    local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+    if #items > 0 then
+        redis.call('LTRIM', KEYS[1], #items, -1)
+        redis.call('RPUSH', KEYS[2], unpack(items))
+    end
+    return items
+    """
+
+    # Moves a processing list (KEYS[2]) into ours (KEYS[3]) unless its worker's
+    # heartbeat (KEYS[1]) is still alive
+    _TAKE_OVER_LUA = """
+    if redis.call('EXISTS', KEYS[1]) == 1 then
+        return {}
+    end
+    local items = {}
+    while true do
+        local item = redis.call('LMOVE', KEYS[2], KEYS[3], 'LEFT', 'RIGHT')
+        if not item then
+            break
+        end
+        items[#items + 1] = item
+    end
+    return items
+    """
+
+    def __init__(self, redis_conn: redis.Redis):
+        super().__init__(redis_conn)
+        self.queue_name = settings.REDIS_QUEUE_NAME
+        self.processing_list = self._processing_list(settings.WORKER_ID)
+        self.heartbeat_key = self._heartbeat_key(settings.WORKER_ID)
+        self._move_batch = redis_conn.register_script(self._MOVE_BATCH_LUA)
+        self._take_over = redis_conn.register_script(self._TAKE_OVER_LUA)
+
+    def _processing_list(self, worker_id: str) -> str:
+        return f"{self.queue_name}:processing:{worker_id}"
+
+    def _heartbeat_key(self, worker_id: str) -> str:
+        return f"{self.queue_name}:worker:{worker_id}"
+
+    def publish(self, payload: Union[str, bytes]):
+        return self.redis.lpush(self.queue_name, payload)
+
+    def publish_many(self, payloads: list[Union[str, bytes]]):
+        return self.redis.lpush(self.queue_name, *payloads)
+
+    def read(self, count: int, block: Optional[float] = None) -> list[QueueMessage]:
+        items = self._move_batch(keys=[self.queue_name, self.processing_list], args=[count])
+        if not items and block:
+            first = self.redis.blmove(self.queue_name, self.processing_list, block, "LEFT", "RIGHT")
+            if first is None:
+                return []
+            items = [first]
+            if count > 1:
+                items.extend(self._move_batch(keys=[self.queue_name, self.processing_list], args=[count - 1]))
+        return [QueueMessage(None, item) for item in items or []]
+
+    def ack(self, messages: list[QueueMessage]):
+        self.redis.delete(self.processing_list)
+
+    def heartbeat(self):
+        self.redis.set(self.heartbeat_key, settings.WORKER_ID, ex=max(1, int(settings.WORKER_HEARTBEAT_TTL_SECONDS)))
+
+    def reclaim(self, own: bool = True) -> list[QueueMessage]:
+        """
+        Returns this worker's own processing list when `own` is set, plus the
+        contents of dead workers' processing lists, moved into ours so they
+        are acknowledged with our next window.
+        """
+        messages = []
+        if own:
+            messages.extend(QueueMessage(None, item) for item in self.redis.lrange(self.processing_list, 0, -1))
+
+        prefix = self._processing_list("")
+        for key in self.redis.scan_iter(match=f"{prefix}*", count=100):
+            key = key.decode() if isinstance(key, bytes) else key
+            worker_id = key[len(prefix):]
+            if worker_id == settings.WORKER_ID:
+                continue
+            items = self._take_over(keys=[self._heartbeat_key(worker_id), key, self.processing_list])
+            if items:
+                logger.warning("Took over %d unacknowledged event(s) from dead worker %s", len(items), worker_id)
+                messages.extend(QueueMessage(None, item) for item in items)
+        return messages
+
+
+class StreamEventQueue(EventQueue):
+    """
+    Redis Streams transport with a consumer group. Every worker replica reads
+    with its own consumer name (settings.WORKER_ID); entries idle in another
+    consumer's pending list for longer than REDIS_STREAM_CLAIM_IDLE_MS are
+    taken over with XAUTOCLAIM. The stream is capped with an approximate
+    MAXLEN on every XADD — keep it well above the worst-case backlog, since
+    trimmed entries are gone even if still pending.
+    """
+
+    FIELD = b"event"
+
+    def __init__(self, redis_conn: redis.Redis):
+        super().__init__(redis_conn)
+        self.stream = settings.REDIS_STREAM_NAME
+        self.group = settings.REDIS_STREAM_GROUP
+        self.consumer = settings.WORKER_ID
+        self._group_ready = False
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            # "0" so a fresh group also consumes entries added before it existed
+            self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            logger.info("Created consumer group %s on %s", self.group, self.stream)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def publish(self, payload: Union[str, bytes]):
+        return self.redis.xadd(
+            self.stream,
+            {self.FIELD: payload},
+            maxlen=settings.REDIS_STREAM_MAXLEN,
+            approximate=True,
+        )
+
+    def publish_many(self, payloads: list[Union[str, bytes]]):
+        pipe = self.redis.pipeline(transaction=False)
+        for payload in payloads:
+            pipe.xadd(
+                self.stream,
+                {self.FIELD: payload},
+                maxlen=settings.REDIS_STREAM_MAXLEN,
+                approximate=True,
+            )
+        return pipe.execute()
+
+    def _to_messages(self, entries) -> list[QueueMessage]:
+        messages = []
+        for entry_id, fields in entries or []:
+            if not fields:
+                continue  # Trimmed by MAXLEN while pending
+            messages.append(QueueMessage(entry_id, fields[self.FIELD]))
+        return messages
+
+    def read(self, count: int, block: Optional[float] = None) -> list[QueueMessage]:
+        self._ensure_group()
+        response = self.redis.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: ">"},
+            count=count,
+            # BLOCK 0 means "forever" in Redis; None means do not block
+            block=max(1, int(block * 1000)) if block else None,
+        )
+        if not response:
+            return []
+        _stream, entries = response[0]
+        return self._to_messages(entries)
+
+    def ack(self, messages: list[QueueMessage]):
+        ids = [m.id for m in messages if m.id is not None]
+        if ids:
+            self.redis.xack(self.stream, self.group, *ids)
+
+    def reclaim(self, own: bool = True) -> list[QueueMessage]:
+        """
+        Returns this consumer's own pending entries (left by a previous run with
+        the same WORKER_ID) plus entries claimed from consumers idle for longer
+        than REDIS_STREAM_CLAIM_IDLE_MS.
+        """
+        self._ensure_group()
+        messages = []
+
+        if own:
+            response = self.redis.xreadgroup(
+                self.group, self.consumer, {self.stream: "0"}, count=settings.METRICS_FLUSH_MAX_EVENTS
+            )
+            if response:
+                messages.extend(self._to_messages(response[0][1]))
+
+        start = "0-0"
+        while len(messages) < settings.METRICS_FLUSH_MAX_EVENTS:
+            result = self.redis.xautoclaim(
+                self.stream,
+                self.group,
+                self.consumer,
+                min_idle_time=settings.REDIS_STREAM_CLAIM_IDLE_MS,
+                start_id=start,
+                count=settings.BATCH_SIZE,
+            )
+            start, entries = result[0], result[1]
+            claimed = self._to_messages(entries)
+            if claimed:
+                logger.warning("Claimed %d stale event(s) from dead consumers", len(claimed))
+            messages.extend(claimed)
+            if start in (b"0-0", "0-0"):
+                break
+
+        # XAUTOCLAIM may hand back our own idle entries already read above
+        unique = {m.id: m for m in messages}
+        return list(unique.values())
+
+
+def get_event_queue(redis_conn: redis.Redis) -> EventQueue:
+    """Returns the queue transport selected by settings.QUEUE_BACKEND."""
+    if settings.QUEUE_BACKEND == "stream":
+        return StreamEventQueue(redis_conn)
+    return ListEventQueue(redis_conn)
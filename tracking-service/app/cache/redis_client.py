@@ -1,6 +1,11 @@
 import redis
+import redis.asyncio as aioredis
 from app.core.config import settings
 
+# Shared asyncio pool for the API process, created on startup (see app.main)
+_async_redis: aioredis.Redis | None = None
+
+
 def get_redis():
     """
     Returns a Redis connection with pooling via from_url.
@@ -12,3 +17,36 @@ def get_redis():
         socket_timeout=5,
         retry_on_timeout=True
     )
+
+
+async def init_async_redis() -> aioredis.Redis:
+    """
+    Creates the process-wide asyncio Redis client. The blocking pool caps open
+    connections at REDIS_MAX_CONNECTIONS; callers wait for a free one instead
+    of failing when the pool is exhausted.
+    """
+    global _async_redis
+    if _async_redis is None:
+        pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+            decode_responses=False,
+            socket_timeout=5,
+            retry_on_timeout=True,
+        )
+        _async_redis = aioredis.Redis(connection_pool=pool)
+    return _async_redis
+
+
+def get_async_redis() -> aioredis.Redis:
+    if _async_redis is None:
+        raise RuntimeError("Async Redis client not initialised — call init_async_redis() on startup")
+    return _async_redis
+
+
+async def close_async_redis():
+    global _async_redis
+    if _async_redis is not None:
+        await _async_redis.aclose()
+        _async_redis = None
@@ -2,6 +2,8 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 from dotenv import load_dotenv
 import os
+import socket
+import tempfile
 
 # Force load .env from the root of the tracking-service
 env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.env')
@@ -19,8 +21,55 @@ class Settings(BaseSettings):
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost").strip().strip("'").strip('"')
     REDIS_PORT: int = int(str(os.getenv("REDIS_PORT", 6379)).strip().strip("'").strip('"'))
     REDIS_URL: str = os.getenv("REDIS_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}").strip().strip("'").strip('"')
+    REDIS_MAX_CONNECTIONS: int = int(str(os.getenv("REDIS_MAX_CONNECTIONS", 50)).strip().strip("'").strip('"'))
+    REDIS_POOL_TIMEOUT_SECONDS: float = float(str(os.getenv("REDIS_POOL_TIMEOUT_SECONDS", 2)).strip().strip("'").strip('"'))
     REDIS_QUEUE_NAME: str = os.getenv("REDIS_QUEUE_NAME", "tracking:event_queue").strip().strip("'").strip('"')
 
+    # Queue transport: "list" (LPUSH/BLMOVE) or "stream" (Redis Streams consumer group)
+    QUEUE_BACKEND: str = os.getenv("QUEUE_BACKEND", "list").strip().strip("'").strip('"').lower()
+    REDIS_STREAM_NAME: str = os.getenv("REDIS_STREAM_NAME", "tracking:event_stream").strip().strip("'").strip('"')
+    REDIS_STREAM_GROUP: str = os.getenv("REDIS_STREAM_GROUP", "tracking-workers").strip().strip("'").strip('"')
+    REDIS_STREAM_MAXLEN: int = int(str(os.getenv("REDIS_STREAM_MAXLEN", 1000000)).strip().strip("'").strip('"'))
+    REDIS_STREAM_CLAIM_IDLE_MS: int = int(str(os.getenv("REDIS_STREAM_CLAIM_IDLE_MS", 300000)).strip().strip("'").strip('"'))
+    REDIS_STREAM_CLAIM_INTERVAL_SECONDS: float = float(str(os.getenv("REDIS_STREAM_CLAIM_INTERVAL_SECONDS", 30)).strip().strip("'").strip('"'))
+
+    # Maximum number of events and body size accepted by POST /events:batch
+    EVENTS_BATCH_MAX_ITEMS: int = int(str(os.getenv("EVENTS_BATCH_MAX_ITEMS", 500)).strip().strip("'").strip('"'))
+    EVENTS_BATCH_MAX_BYTES: int = int(str(os.getenv("EVENTS_BATCH_MAX_BYTES", 1024 * 1024)).strip().strip("'").strip('"'))
+
+    # Local spool used when Redis is unreachable (see app/services/event_spool.py)
+    SPOOL_DIR: str = os.getenv("SPOOL_DIR", os.path.join(tempfile.gettempdir(), "tracking-spool")).strip().strip("'").strip('"')
+    SPOOL_MAX_BYTES: int = int(str(os.getenv("SPOOL_MAX_BYTES", 1024 * 1024 * 1024)).strip().strip("'").strip('"'))
+    SPOOL_SEGMENT_MAX_BYTES: int = int(str(os.getenv("SPOOL_SEGMENT_MAX_BYTES", 16 * 1024 * 1024)).strip().strip("'").strip('"'))
+    SPOOL_SEGMENT_MAX_AGE_SECONDS: float = float(str(os.getenv("SPOOL_SEGMENT_MAX_AGE_SECONDS", 5)).strip().strip("'").strip('"'))
+    SPOOL_FSYNC_INTERVAL_MS: int = int(str(os.getenv("SPOOL_FSYNC_INTERVAL_MS", 50)).strip().strip("'").strip('"'))
+    SPOOL_DRAIN_INTERVAL_SECONDS: float = float(str(os.getenv("SPOOL_DRAIN_INTERVAL_SECONDS", 2)).strip().strip("'").strip('"'))
+    # Failed replays of a spooled chunk before its failing lines are dead-lettered
+    SPOOL_MAX_REPLAY_ATTEMPTS: int = int(str(os.getenv("SPOOL_MAX_REPLAY_ATTEMPTS", 5)).strip().strip("'").strip('"'))
+    # "queue" (replay into Redis once it recovers) or "postgres" (bulk inserts)
+    SPOOL_DRAIN_TARGET: str = os.getenv("SPOOL_DRAIN_TARGET", "queue").strip().strip("'").strip('"').lower()
+    # After a Redis failure, skip Redis for this long and spool directly
+    REDIS_RETRY_AFTER_SECONDS: float = float(str(os.getenv("REDIS_RETRY_AFTER_SECONDS", 2)).strip().strip("'").strip('"'))
+
+    # Threads available to the Postgres fallback when Redis is unreachable
+    # and the spool is full or not writable
+    FALLBACK_DB_WORKERS: int = int(str(os.getenv("FALLBACK_DB_WORKERS", 8)).strip().strip("'").strip('"'))
+
+    # Worker batching: drain up to BATCH_SIZE events or BATCH_MAX_WAIT_MS per transaction
+    BATCH_SIZE: int = int(str(os.getenv("BATCH_SIZE", 100)).strip().strip("'").strip('"'))
+    BATCH_MAX_WAIT_MS: int = int(str(os.getenv("BATCH_MAX_WAIT_MS", 200)).strip().strip("'").strip('"'))
+
+    # Metrics aggregation: deltas are flushed (and the queue acknowledged) every
+    # METRICS_FLUSH_INTERVAL_SECONDS or once METRICS_FLUSH_MAX_EVENTS are pending
+    METRICS_FLUSH_INTERVAL_SECONDS: float = float(str(os.getenv("METRICS_FLUSH_INTERVAL_SECONDS", 5)).strip().strip("'").strip('"'))
+    METRICS_FLUSH_MAX_EVENTS: int = int(str(os.getenv("METRICS_FLUSH_MAX_EVENTS", 5000)).strip().strip("'").strip('"'))
+
+    # Worker identity (owns its in-flight list); defaults to the container hostname
+    WORKER_ID: str = os.getenv("WORKER_ID", socket.gethostname()).strip().strip("'").strip('"')
+    # List backend: a worker's heartbeat expires after this long; other workers
+    # then take over its processing list (a recreated container gets a new id)
+    WORKER_HEARTBEAT_TTL_SECONDS: float = float(str(os.getenv("WORKER_HEARTBEAT_TTL_SECONDS", 60)).strip().strip("'").strip('"'))
+
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=True,
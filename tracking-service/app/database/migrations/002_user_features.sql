@@ -0,0 +1,53 @@
+-- Per-user aggregates maintained incrementally by the tracking worker.
+-- Run BEFORE deploying the worker that writes them: the backfill below
+-- aggregates tracking_events as of now, and later events are added by the worker.
+
+CREATE TABLE IF NOT EXISTS user_features (
+    user_id               INTEGER PRIMARY KEY,
+    total_events          BIGINT NOT NULL DEFAULT 0,
+    unique_content_viewed BIGINT NOT NULL DEFAULT 0,
+    total_views_given     BIGINT NOT NULL DEFAULT 0,
+    total_likes_given     BIGINT NOT NULL DEFAULT 0,
+    total_unlikes_given   BIGINT NOT NULL DEFAULT 0,
+    total_bookmarks_given BIGINT NOT NULL DEFAULT 0,
+    total_shares_given    BIGINT NOT NULL DEFAULT 0,
+    total_comments_given  BIGINT NOT NULL DEFAULT 0,
+    total_search_clicks   BIGINT NOT NULL DEFAULT 0,
+    sum_event_value       DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at            TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS user_seen_content (
+    user_id       INTEGER NOT NULL,
+    content_id    INTEGER NOT NULL,
+    first_seen_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, content_id)
+);
+
+-- Backfill (no-op for rows that already exist)
+INSERT INTO user_seen_content (user_id, content_id, first_seen_at)
+SELECT user_id, content_id, MIN(created_at)
+FROM tracking_events
+GROUP BY user_id, content_id
+ON CONFLICT DO NOTHING;
+
+INSERT INTO user_features (
+    user_id, total_events, unique_content_viewed,
+    total_views_given, total_likes_given, total_unlikes_given, total_bookmarks_given,
+    total_shares_given, total_comments_given, total_search_clicks, sum_event_value
+)
+SELECT
+    user_id,
+    COUNT(*),
+    COUNT(DISTINCT content_id),
+    COUNT(*) FILTER (WHERE event_type = 'view'),
+    COUNT(*) FILTER (WHERE event_type = 'like'),
+    COUNT(*) FILTER (WHERE event_type = 'unlike'),
+    COUNT(*) FILTER (WHERE event_type = 'bookmark'),
+    COUNT(*) FILTER (WHERE event_type = 'share'),
+    COUNT(*) FILTER (WHERE event_type = 'comment'),
+    COUNT(*) FILTER (WHERE event_type = 'search_click'),
+    COALESCE(SUM(event_value), 0)
+FROM tracking_events
+GROUP BY user_id
+ON CONFLICT DO NOTHING;
@@ -3,6 +3,7 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.exc import SQLAlchemyError
 from app.api import routes
+from app.cache.redis_client import close_async_redis, init_async_redis
 from app.core.config import settings
 from app.core.logging import setup_logging
 import logging
@@ -53,6 +54,24 @@ async def database_exception_handler(request: Request, exc: SQLAlchemyError):
         content={"type": "about:blank", "title": "Service Unavailable", "status": 503, "detail": "Database connection error."}
     )
 
+@app.on_event("startup")
+async def startup_event():
+    from app.services.tracking_service import start_spool_drainer
+
+    logger.info("Application startup: creating shared async Redis pool and spool drainer")
+    await init_async_redis()
+    start_spool_drainer()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.services.tracking_service import shutdown_fallback_executor, stop_spool_drainer
+
+    logger.info("Application shutdown: stopping spool drainer, closing async Redis pool")
+    await stop_spool_drainer()
+    await close_async_redis()
+    shutdown_fallback_executor()
+
 # Include routes
 app.include_router(routes.router, prefix=settings.API_V1_STR)
 
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, Float, DateTime, BigInteger
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+class UserFeatures(Base):
+    """Per-user event counters, maintained incrementally by the worker (app/services/user_features_service.py)."""
+    __tablename__ = "user_features"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    total_events = Column(BigInteger, nullable=False, default=0)
+    unique_content_viewed = Column(BigInteger, nullable=False, default=0)
+    total_views_given = Column(BigInteger, nullable=False, default=0)
+    total_likes_given = Column(BigInteger, nullable=False, default=0)
+    total_unlikes_given = Column(BigInteger, nullable=False, default=0)
+    total_bookmarks_given = Column(BigInteger, nullable=False, default=0)
+    total_shares_given = Column(BigInteger, nullable=False, default=0)
+    total_comments_given = Column(BigInteger, nullable=False, default=0)
+    total_search_clicks = Column(BigInteger, nullable=False, default=0)
+    sum_event_value = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UserSeenContent(Base):
+    """Distinct (user, content) pairs: exact unique counts and seen-item exclusion."""
+    __tablename__ = "user_seen_content"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    content_id = Column(Integer, primary_key=True, autoincrement=False)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,5 +1,6 @@
 import logging
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.api.schemas import TrackingEventCreate
@@ -25,3 +26,22 @@ class TrackingRepository:
         self.db.add(db_event)
         self.db.flush()  # Assigns PK without committing
         return db_event
+
+    def save_events(self, events: list[TrackingEventCreate]) -> int:
+        """Bulk-inserts a batch of events in a single INSERT statement."""
+        if not events:
+            return 0
+        self.db.execute(
+            insert(TrackingEvent),
+            [
+                {
+                    "user_id": event.user_id,
+                    "content_id": event.content_id,
+                    "event_type": event.event_type,
+                    "event_value": event.event_value,
+                    "metadata_col": event.metadata,
+                }
+                for event in events
+            ],
+        )
+        return len(events)
@@ -0,0 +1,381 @@
+"""
+Event Spool — Durable local buffer used by the API when Redis is unavailable.
+
+Layout (SPOOL_DIR):
+  seg-<pid>-<ms>-<seq>.open         segment being appended to by process <pid>,
+                                    opened at <ms> (epoch milliseconds)
+  seg-<pid>-<ms>-<seq>.sealed       complete segment, ready to be drained
+  seg-<pid>-<ms>-<seq>.sealed.draining.<pid>  segment claimed by a drainer
+  seg-<pid>-<ms>-<seq>.sealed.attempts        failed replays of the segment's first chunk
+  seg-<pid>-<ms>-<seq>.sealed.rewrite.<pid>   undelivered lines being written back
+  dead-letter.ndjson                lines that kept failing or could not be
+                                    parsed, set aside
+
+Records are NDJSON lines (one TrackingEventCreate JSON each). Appends are a
+single unbuffered write(); fsync is batched by a background thread every
+SPOOL_FSYNC_INTERVAL_MS, so at most that window can be lost on a host crash.
+Segments are rotated by size/age and claimed by atomic rename, so every
+gunicorn worker can append and drain concurrently. Dead writers' open
+segments and dead drainers' claims are recovered by the next drain pass.
+Every method here does blocking file I/O: callers on the event loop run
+them in a thread (asyncio.to_thread), and segments are streamed in chunks.
+
+A failed replay ends the drain pass: the undelivered lines are put back
+under the segment's own name and retried on the next pass. Once the same
+chunk has failed SPOOL_MAX_REPLAY_ATTEMPTS times it is replayed line by
+line and lines that still fail while the target is up go to the
+dead-letter file, so one bad line cannot block the spool.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Optional
+
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SPOOL_EVENTS_WRITTEN = Counter("tracking_spool_events_written_total", "Events appended to the local spool")
+SPOOL_EVENTS_DRAINED = Counter("tracking_spool_events_drained_total", "Events replayed from the spool", ["target"])
+SPOOL_REJECTED = Counter("tracking_spool_rejected_total", "Events refused because the spool was full")
+SPOOL_BYTES = Gauge("tracking_spool_bytes", "Bytes currently held in the spool directory")
+SPOOL_DEAD_LETTERED = Counter("tracking_spool_dead_lettered_total", "Spooled events moved to the dead-letter file")
+SPOOL_SEGMENTS = Gauge("tracking_spool_segments", "Segment files currently held in the spool directory")
+
+
+class SpoolFullError(Exception):
+    """Raised when appending would exceed SPOOL_MAX_BYTES."""
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class EventSpool:
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int,
+        segment_max_age: float,
+        max_total_bytes: int,
+        fsync_interval: float,
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age = segment_max_age
+        self.max_total_bytes = max_total_bytes
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._path: Optional[str] = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._dirty = False
+        self._seq = 0
+        # Bytes held by other segments, refreshed by every drain pass
+        self._other_bytes = 0
+        self._fsync_thread: Optional[threading.Thread] = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.refresh_usage()
+
+    # ---- Writer side -------------------------------------------------
+
+    def append(self, payloads: list[str]):
+        """Appends events; raises SpoolFullError when the disk budget is exhausted."""
+        data = "".join(payload + "\n" for payload in payloads).encode()
+        with self._lock:
+            if self._other_bytes + self._size + len(data) > self.max_total_bytes:
+                SPOOL_REJECTED.inc(len(payloads))
+                raise SpoolFullError(f"Spool full ({self.max_total_bytes} bytes)")
+
+            if self._file is None:
+                self._open_segment()
+            self._file.write(data)
+            self._size += len(data)
+            self._dirty = True
+
+            if self._size >= self.segment_max_bytes:
+                self._seal_locked()
+
+        SPOOL_EVENTS_WRITTEN.inc(len(payloads))
+
+    def has_data(self) -> bool:
+        with self._lock:
+            return self._size > 0 or self._other_bytes > 0
+
+    def _open_segment(self):
+        self._seq += 1
+        self._path = os.path.join(self.directory, f"seg-{os.getpid()}-{int(time.time() * 1000)}-{self._seq}.open")
+        self._file = open(self._path, "ab", buffering=0)
+        self._size = 0
+        self._opened_at = time.monotonic()
+        self._ensure_fsync_thread()
+
+    def _seal_locked(self):
+        if self._file is None:
+            return
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.rename(self._path, self._path[: -len(".open")] + ".sealed")
+        self._other_bytes += self._size
+        self._file, self._path, self._size, self._dirty = None, None, 0, False
+
+    def seal(self):
+        """Closes the active segment so a drainer can pick it up."""
+        with self._lock:
+            self._seal_locked()
+
+    def _ensure_fsync_thread(self):
+        if self._fsync_thread is None or not self._fsync_thread.is_alive():
+            self._fsync_thread = threading.Thread(target=self._fsync_loop, name="spool-fsync", daemon=True)
+            self._fsync_thread.start()
+
+    def _fsync_loop(self):
+        while True:
+            time.sleep(self.fsync_interval)
+            fd = None
+            with self._lock:
+                if self._file is None:
+                    continue
+                if self._size and time.monotonic() - self._opened_at >= self.segment_max_age:
+                    self._seal_locked()
+                elif self._dirty:
+                    # fsync a duplicate outside the lock so appends are not held up
+                    fd = os.dup(self._file.fileno())
+                    self._dirty = False
+            if fd is not None:
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+    def close(self):
+        with self._lock:
+            self._seal_locked()
+
+    # ---- Drainer side ------------------------------------------------
+
+    def refresh_usage(self):
+        """Recomputes disk usage, excluding this process's active segment."""
+        total, segments = 0, 0
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith("seg-") and not entry.name.endswith(".attempts") and entry.is_file():
+                segments += 1
+                if entry.path != self._path:
+                    total += entry.stat().st_size
+        with self._lock:
+            self._other_bytes = total
+            SPOOL_BYTES.set(total + self._size)
+        SPOOL_SEGMENTS.set(segments)
+
+    def recover_orphans(self):
+        """
+        Seals open segments of dead writers, releases claims of dead drainers
+        and removes their half-written rewrites and stale attempt counters.
+        """
+        names = os.listdir(self.directory)
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".attempts"):
+                    segment = name[: -len(".attempts")]
+                    if not any(other.startswith(segment) and other != name for other in names):
+                        os.remove(path)
+                elif ".rewrite." in name:
+                    pid = int(name.rsplit(".", 1)[1])
+                    if pid != os.getpid() and not _pid_alive(pid):
+                        os.remove(path)
+                elif name.endswith(".open"):
+                    pid = int(name.split("-")[1])
+                    if pid != os.getpid() and not _pid_alive(pid):
+                        os.rename(path, path[: -len(".open")] + ".sealed")
+                        logger.warning("Recovered orphan spool segment %s", name)
+                elif ".draining." in name:
+                    pid = int(name.rsplit(".", 1)[1])
+                    if pid != os.getpid() and not _pid_alive(pid):
+                        os.rename(path, path.split(".draining.")[0])
+            except (ValueError, IndexError, FileNotFoundError):
+                continue
+
+    def claim_segment(self) -> Optional[str]:
+        """Atomically claims the oldest sealed segment, or returns None."""
+        sealed = sorted(
+            (name for name in os.listdir(self.directory) if name.endswith(".sealed")),
+            key=lambda name: name.split("-")[2],
+        )
+        for name in sealed:
+            src = os.path.join(self.directory, name)
+            dst = f"{src}.draining.{os.getpid()}"
+            try:
+                os.rename(src, dst)
+                return dst
+            except FileNotFoundError:
+                continue  # Claimed by another worker first
+        return None
+
+    def failed_attempts(self, claimed_path: str) -> int:
+        """Failed replays recorded for the first chunk of a claimed segment."""
+        try:
+            with open(claimed_path.split(".draining.")[0] + ".attempts") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def release_segment(self, claimed_path: str, undelivered_from: Optional[int] = None, attempts: int = 0):
+        """
+        Drops the claim. Lines from byte offset `undelivered_from` on are put
+        back under the segment's own name, so the next drain pass retries
+        them, and `attempts` failed replays of their first chunk are recorded
+        alongside.
+        """
+        base = claimed_path.split(".draining.")[0]
+        attempts_path = base + ".attempts"
+        if undelivered_from is None:
+            os.remove(claimed_path)
+            if os.path.exists(attempts_path):
+                os.remove(attempts_path)
+            return
+
+        with open(attempts_path, "w") as f:
+            f.write(str(attempts))
+        if undelivered_from == 0:
+            os.rename(claimed_path, base)
+            return
+        rewrite_path = f"{base}.rewrite.{os.getpid()}"
+        with open(claimed_path, "rb") as src, open(rewrite_path, "wb") as dst:
+            src.seek(undelivered_from)
+            shutil.copyfileobj(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(rewrite_path, base)
+        os.remove(claimed_path)
+
+    def dead_letter(self, lines: list[bytes]):
+        """Appends lines that could not be replayed to the dead-letter file."""
+        with open(os.path.join(self.directory, "dead-letter.ndjson"), "ab") as f:
+            f.writelines(line + b"\n" for line in lines)
+            os.fsync(f.fileno())
+        SPOOL_DEAD_LETTERED.inc(len(lines))
+        logger.critical("%d spooled event(s) moved to %s", len(lines), f.name)
+
+
+_spool: Optional[EventSpool] = None
+
+
+def get_spool() -> EventSpool:
+    global _spool
+    if _spool is None:
+        _spool = EventSpool(
+            directory=settings.SPOOL_DIR,
+            segment_max_bytes=settings.SPOOL_SEGMENT_MAX_BYTES,
+            segment_max_age=settings.SPOOL_SEGMENT_MAX_AGE_SECONDS,
+            max_total_bytes=settings.SPOOL_MAX_BYTES,
+            fsync_interval=settings.SPOOL_FSYNC_INTERVAL_MS / 1000,
+        )
+    return _spool
+
+
+def _read_chunk(f, max_lines: int) -> tuple[int, list[bytes]]:
+    """(byte offset of the chunk, up to max_lines non-empty lines) from a segment file."""
+    offset = f.tell()
+    lines = []
+    while len(lines) < max_lines:
+        line = f.readline()
+        if not line:
+            break
+        if line.strip():
+            lines.append(line.rstrip(b"\n"))
+    return offset, lines
+
+
+async def _replay_lines(spool: EventSpool, lines: list[bytes], replay, is_target_ready) -> int:
+    """
+    Replays a chunk that keeps failing one line at a time; lines that fail
+    while the target is up are dead-lettered. Raises if the target goes down.
+    """
+    delivered = 0
+    for line in lines:
+        try:
+            await replay([line])
+            delivered += 1
+        except Exception as e:
+            if not await is_target_ready():
+                raise
+            logger.error("Spooled event failed %d replays: %s", settings.SPOOL_MAX_REPLAY_ATTEMPTS, e)
+            await asyncio.to_thread(spool.dead_letter, [line])
+    return delivered
+
+
+async def _drain_segment(spool: EventSpool, path: str, replay, is_target_ready) -> tuple[int, bool]:
+    """
+    Replays one claimed segment, streamed from disk in chunks; returns
+    (events delivered, whether the whole segment was delivered).
+    """
+    attempts = await asyncio.to_thread(spool.failed_attempts, path)
+    delivered = 0
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        while True:
+            offset, chunk = await asyncio.to_thread(_read_chunk, f, settings.EVENTS_BATCH_MAX_ITEMS)
+            if not chunk:
+                break
+            try:
+                if offset == 0 and attempts >= settings.SPOOL_MAX_REPLAY_ATTEMPTS:
+                    delivered += await _replay_lines(spool, chunk, replay, is_target_ready)
+                else:
+                    await replay(chunk)
+                    delivered += len(chunk)
+            except Exception as e:
+                logger.error("Spool drain interrupted after %d events: %s", delivered, e)
+                # Attempts count failures of the same first chunk only
+                await asyncio.to_thread(spool.release_segment, path, offset, attempts + 1 if offset == 0 else 1)
+                return delivered, False
+    finally:
+        f.close()
+
+    await asyncio.to_thread(spool.release_segment, path)
+    return delivered, True
+
+
+async def run_spool_drainer(replay, is_target_ready, stop: asyncio.Event):
+    """
+    Background task: once the drain target is healthy, seals the active segment
+    and replays every sealed segment through `replay(list[bytes])`. A failed
+    replay ends the pass; the segment is retried after the next interval.
+    """
+    spool = await asyncio.to_thread(get_spool)
+    target = settings.SPOOL_DRAIN_TARGET
+    while not stop.is_set():
+        try:
+            await asyncio.to_thread(spool.recover_orphans)
+            await asyncio.to_thread(spool.refresh_usage)
+            if spool.has_data() and await is_target_ready():
+                await asyncio.to_thread(spool.seal)
+                while (path := await asyncio.to_thread(spool.claim_segment)) is not None:
+                    drained, completed = await _drain_segment(spool, path, replay, is_target_ready)
+                    SPOOL_EVENTS_DRAINED.labels(target=target).inc(drained)
+                    logger.info("Drained %d spooled events to %s", drained, target)
+                    if not completed:
+                        break
+                await asyncio.to_thread(spool.refresh_usage)
+        except Exception as e:
+            logger.error("Spool drainer iteration failed: %s", e)
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.SPOOL_DRAIN_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
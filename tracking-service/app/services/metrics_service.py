@@ -20,44 +20,125 @@ EVENT_DECREMENT = {
 }
 
 
+# Counter columns touched by tracking events, in a fixed order for batch statements
+METRIC_COLUMNS = ("total_views", "total_likes", "total_bookmarks", "total_shares", "total_comments")
+
+
+def _metric_delta(event_type: str) -> tuple[str | None, int]:
+    """Returns the content_metrics column an event type moves and the step (+1/-1)."""
+    col = EVENT_TO_METRIC_COLUMN.get(event_type)
+    if col:
+        return col, 1
+    return EVENT_DECREMENT.get(event_type), -1
+
+
 def update_content_metrics(db: Session, content_id: int, event_type: str):
     """
-    Updates the aggregated content_metrics table after a tracking event.
-    Uses UPSERT (INSERT ... ON CONFLICT) to handle new content gracefully.
+    Updates the aggregated content_metrics table after a single tracking event.
+    Uses the same single-statement UPSERT as the batched worker path.
     """
-    increment_col = EVENT_TO_METRIC_COLUMN.get(event_type)
-    decrement_col = EVENT_DECREMENT.get(event_type)
-
-    if not increment_col and not decrement_col:
+    col, step = _metric_delta(event_type)
+    if not col:
         return  # Event type doesn't affect metrics (e.g. search_click)
 
-    if increment_col:
-        db.execute(text("""
-            INSERT INTO content_metrics (content_id, {col}, updated_at)
-            VALUES (:content_id, 1, NOW())
-            ON CONFLICT (content_id)
-            DO UPDATE SET
-                {col} = content_metrics.{col} + 1,
-                updated_at = NOW()
-        """.format(col=increment_col)), {"content_id": content_id})
-
-    elif decrement_col:
-        db.execute(text("""
-            UPDATE content_metrics
-            SET {col} = GREATEST(0, {col} - 1),
-                updated_at = NOW()
-            WHERE content_id = :content_id
-        """.format(col=decrement_col)), {"content_id": content_id})
-
-    # Recalculate engagement_rate
-    db.execute(text("""
-        UPDATE content_metrics
-        SET engagement_rate = CASE
-            WHEN total_views = 0 THEN 0
-            ELSE (total_likes + total_bookmarks + total_comments + total_shares)::FLOAT / total_views
-        END,
-        updated_at = NOW()
-        WHERE content_id = :content_id
-    """), {"content_id": content_id})
+    row = dict.fromkeys(METRIC_COLUMNS, 0)
+    row[col] = step
+    apply_content_metrics_deltas(db, {content_id: row})
 
     logger.debug(f"Metrics updated for content {content_id} (event: {event_type})")
+
+
+def aggregate_metric_deltas(events) -> dict[int, dict[str, int]]:
+    """
+    Folds a batch of events into net counter deltas per content_id.
+    Decrement events (EVENT_DECREMENT) contribute -1 to their column.
+    """
+    deltas: dict[int, dict[str, int]] = {}
+    for event in events:
+        col, step = _metric_delta(event.event_type)
+        if not col:
+            continue
+
+        row = deltas.setdefault(event.content_id, dict.fromkeys(METRIC_COLUMNS, 0))
+        row[col] += step
+    return deltas
+
+
+class MetricsAggregator:
+    """
+    Accumulates content_metrics counter deltas in memory between flushes, so a
+    hot content row is written once per flush instead of once per event. The
+    worker applies `deltas` with apply_content_metrics_deltas in its window's
+    transaction and starts a new aggregator for the next window.
+    """
+
+    def __init__(self):
+        self.deltas: dict[int, dict[str, int]] = {}
+
+    def add(self, events):
+        for content_id, row in aggregate_metric_deltas(events).items():
+            current = self.deltas.setdefault(content_id, dict.fromkeys(METRIC_COLUMNS, 0))
+            for col, value in row.items():
+                current[col] += value
+
+
+def _engagement_rate_sql(views: str, likes: str, bookmarks: str, shares: str, comments: str) -> str:
+    return (
+        f"CASE WHEN {views} = 0 THEN 0 "
+        f"ELSE ({likes} + {bookmarks} + {comments} + {shares})::FLOAT / {views} END"
+    )
+
+
+def apply_content_metrics_deltas(db: Session, deltas: dict[int, dict[str, int]]):
+    """
+    Applies aggregated counter deltas to content_metrics as ONE multi-row UPSERT
+    that also computes engagement_rate from the resulting counters.
+
+    Rows are written in content_id order so concurrent workers always lock them
+    in the same order. New rows are clamped at zero, and content that only
+    received decrements is not inserted (same as the old per-event UPDATE path).
+    """
+    if not deltas:
+        return
+
+    content_ids = sorted(deltas)
+    params = {}
+    value_rows = []
+    for i, content_id in enumerate(content_ids):
+        params[f"content_id_{i}"] = content_id
+        placeholders = [f":content_id_{i}"]
+        for col in METRIC_COLUMNS:
+            params[f"{col}_{i}"] = deltas[content_id][col]
+            placeholders.append(f":{col}_{i}")
+        value_rows.append("({})".format(", ".join(placeholders)))
+
+    # Counter values after the update, for the INSERT and the ON CONFLICT branch
+    inserted = {col: f"GREATEST(0, d.{col})" for col in METRIC_COLUMNS}
+    updated = {col: f"GREATEST(0, content_metrics.{col} + EXCLUDED.{col})" for col in METRIC_COLUMNS}
+
+    cols = ", ".join(METRIC_COLUMNS)
+    db.execute(text("""
+        INSERT INTO content_metrics (content_id, {cols}, engagement_rate, updated_at)
+        SELECT d.content_id, {insert_values}, {insert_engagement}, NOW()
+        FROM (VALUES {values}) AS d(content_id, {cols})
+        LEFT JOIN content_metrics cm ON cm.content_id = d.content_id
+        WHERE cm.content_id IS NOT NULL OR GREATEST({delta_cols}) > 0
+        ON CONFLICT (content_id)
+        DO UPDATE SET
+            {update_set},
+            engagement_rate = {update_engagement},
+            updated_at = NOW()
+    """.format(
+        cols=cols,
+        values=", ".join(value_rows),
+        insert_values=", ".join(
+            f"CASE WHEN cm.content_id IS NULL THEN {inserted[col]} ELSE d.{col} END"
+            for col in METRIC_COLUMNS
+        ),
+        insert_engagement=_engagement_rate_sql(**{col[len("total_"):]: inserted[col] for col in METRIC_COLUMNS}),
+        delta_cols=", ".join(f"d.{col}" for col in METRIC_COLUMNS),
+        update_set=",\n            ".join(f"{col} = {updated[col]}" for col in METRIC_COLUMNS),
+        update_engagement=_engagement_rate_sql(**{col[len("total_"):]: updated[col] for col in METRIC_COLUMNS}),
+    )), params)
+
+    logger.debug("Metrics deltas applied for %d content rows", len(content_ids))
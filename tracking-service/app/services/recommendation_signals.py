@@ -0,0 +1,71 @@
+"""
+Recommendation Signals — Redis keys the tracking worker maintains for the
+recommendations-service, written after each window commits.
+
+  user:{id}:features   Hash mirroring the user's user_features row, read by
+                       the recommendations-service instead of Postgres.
+  user:{id}:seen       Bitmap of content the user has interacted with
+                       (SETBIT content_id). Bit 0 is reserved: the reader sets
+                       it after merging in the user's full history from
+                       user_seen_content, so a bitmap the worker created from
+                       scratch is recognised as partial.
+  user:{id}:recs_gen   Per-user generation counter. Bumped once per flushed
+                       window for every user with new events; cached ranked
+                       results stamped with an older generation are treated
+                       as misses (recommendations-service app/cache/result_cache.py).
+  precompute:dirty_users
+                       Set of users with new events since the last incremental
+                       run of precompute_candidates.py, which drains it.
+"""
+
+import logging
+from typing import Optional
+
+import redis
+
+from app.api.schemas import TrackingEventCreate
+
+logger = logging.getLogger(__name__)
+
+USER_FEATURES_KEY = "user:{user_id}:features"
+SEEN_BITMAP_KEY = "user:{user_id}:seen"
+RECS_GENERATION_KEY = "user:{user_id}:recs_gen"
+PRECOMPUTE_DIRTY_KEY = "precompute:dirty_users"
+# Outlives any cached result; an expired counter restarts at 0, which only
+# matches entries computed before the user's first tracked event.
+# Also the idle TTL of the feature hashes and seen bitmaps.
+RECS_GENERATION_TTL_SECONDS = 7 * 24 * 3600
+
+
+def publish_user_activity(
+    redis_conn: redis.Redis,
+    events: list[TrackingEventCreate],
+    user_features: Optional[list[dict]] = None,
+):
+    """
+    Mirrors `user_features` rows, marks the events' content as seen, flags the
+    users for candidate precomputation and bumps the recommendations
+    generation of every user in `events`, in one round trip. Generations are
+    bumped last, so a recompute they trigger reads the new features and seen
+    bits.
+    """
+    user_ids = sorted({event.user_id for event in events})
+    if not user_ids:
+        return
+
+    pipe = redis_conn.pipeline(transaction=False)
+    for row in user_features or []:
+        key = USER_FEATURES_KEY.format(user_id=row["user_id"])
+        pipe.hset(key, mapping={col: value for col, value in row.items() if col != "user_id"})
+        pipe.expire(key, RECS_GENERATION_TTL_SECONDS)
+    for user_id, content_id in sorted({(event.user_id, event.content_id) for event in events}):
+        if content_id > 0:  # 0 is searches, and bit 0 is the completeness flag
+            pipe.setbit(SEEN_BITMAP_KEY.format(user_id=user_id), content_id, 1)
+    for user_id in user_ids:
+        pipe.expire(SEEN_BITMAP_KEY.format(user_id=user_id), RECS_GENERATION_TTL_SECONDS)
+    pipe.sadd(PRECOMPUTE_DIRTY_KEY, *user_ids)
+    for user_id in user_ids:
+        key = RECS_GENERATION_KEY.format(user_id=user_id)
+        pipe.incr(key)
+        pipe.expire(key, RECS_GENERATION_TTL_SECONDS)
+    pipe.execute()
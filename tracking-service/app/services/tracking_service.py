@@ -2,53 +2,212 @@
 Tracking Service — Event processing layer.
 
 Architecture:
-  1. Primary path: Publish event to Redis queue → Worker consumes and saves to Postgres.
-  2. Fallback path: If Redis is down, save directly to Postgres synchronously.
+  1. Primary path: Publish event to the Redis event queue (list or stream transport,
+     see app/cache/event_queue.py) → Worker consumes and saves to Postgres.
+     Publishing is non-blocking: it uses the shared redis.asyncio pool.
+  2. Redis down: append the event to the local on-disk spool
+     (app/services/event_spool.py) from a worker thread. A background drainer replays it once
+     Redis recovers. After a failure Redis is skipped for REDIS_RETRY_AFTER_SECONDS
+     so requests do not each wait for a connection timeout.
+  3. Last resort (spool full or not writable): bulk-save to Postgres on a
+     bounded thread pool so blocking DB I/O never runs on the event loop.
 """
 
-import json
+import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
 
 from app.api.schemas import TrackingEventCreate
-from app.cache.redis_client import get_redis
+from app.cache.event_queue import get_event_queue
+from app.cache.redis_client import get_async_redis, get_redis
 from app.core.config import settings
 from app.database.connection import SessionLocal
 from app.repositories.tracking_repo import TrackingRepository
-from app.services.metrics_service import update_content_metrics
+from app.services.event_spool import SpoolFullError, get_spool, run_spool_drainer
+from app.services.metrics_service import aggregate_metric_deltas, apply_content_metrics_deltas
+from app.services.recommendation_signals import publish_user_activity
+from app.services.user_features_service import apply_user_features, get_user_features
 
 logger = logging.getLogger(__name__)
 
-redis_client = get_redis()
+# Bounded pool for the synchronous Postgres fallback
+_fallback_executor = ThreadPoolExecutor(
+    max_workers=settings.FALLBACK_DB_WORKERS,
+    thread_name_prefix="tracking-fallback",
+)
+
+_event_queue = None
+# Sync client for the recommendation signals of events saved from a thread
+_sync_redis = None
+
+# Monotonic time before which Redis is assumed to be down
+_redis_retry_at = 0.0
+
+_drainer_task = None
+_drainer_stop = None
+
+
+def _get_event_queue():
+    """Event queue bound to the shared async Redis pool (built on first use)."""
+    global _event_queue
+    if _event_queue is None:
+        _event_queue = get_event_queue(get_async_redis())
+    return _event_queue
 
 
-def publish_event_to_queue(event: TrackingEventCreate):
+async def publish_event_to_queue(event: TrackingEventCreate):
+    """Publishes a single event (see publish_events_to_queue)."""
+    await publish_events_to_queue([event])
+
+
+async def publish_events_to_queue(events: list[TrackingEventCreate]):
     """
-    Publishes an event to the Redis queue for asynchronous processing.
-    Falls back to synchronous DB save if Redis is unavailable.
+    Publishes events to the Redis queue with a single round trip.
+    Spools them to disk if Redis is unavailable.
     """
+    global _redis_retry_at
+    if not events:
+        return
+
+    payloads = [event.model_dump_json() for event in events]
+    if time.monotonic() >= _redis_retry_at:
+        try:
+            await _get_event_queue().publish_many(payloads)
+            logger.info("Queued %d event(s) to Redis", len(events))
+            return
+        except Exception as e:
+            _redis_retry_at = time.monotonic() + settings.REDIS_RETRY_AFTER_SECONDS
+            logger.error("Failed to queue %d event(s) to Redis: %s. Spooling to disk.", len(events), e)
+
+    await _spool_or_save(events, payloads)
+
+
+def _spool_append(payloads: list[str]):
+    get_spool().append(payloads)
+
+
+async def _spool_or_save(events: list[TrackingEventCreate], payloads: list[str]):
+    # Disk writes (and a size-triggered seal's fsync) run off the event loop
     try:
-        event_json = event.model_dump_json() if hasattr(event, "model_dump_json") else json.dumps(event.dict())
-        redis_client.lpush(settings.REDIS_QUEUE_NAME, event_json)
-        logger.info("Queued event to Redis: user=%d, type=%s", event.user_id, event.event_type)
-    except Exception as e:
-        logger.error("Failed to queue event to Redis: %s. Falling back to sync DB save.", e)
-        _save_event_sync(event)
+        await asyncio.to_thread(_spool_append, payloads)
+        return
+    except (SpoolFullError, OSError) as e:
+        logger.error("Spool unavailable (%s). Falling back to sync DB save.", e)
 
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_fallback_executor, _save_events_sync, events)
 
-def _save_event_sync(event: TrackingEventCreate):
+
+def _persist_events_sync(events: list[TrackingEventCreate]):
     """
-    Fallback: saves directly to Postgres when Redis is unavailable.
-    Ensures no events are ever silently dropped.
+    One bulk insert + one aggregated metrics upsert + user_features, in one
+    transaction; then the same Redis signals the worker publishes after a flush.
     """
     db = SessionLocal()
     try:
-        repo = TrackingRepository(db)
-        repo.save_event(event)
-        update_content_metrics(db, event.content_id, event.event_type)
+        TrackingRepository(db).save_events(events)
+        apply_content_metrics_deltas(db, aggregate_metric_deltas(events))
+        apply_user_features(db, events)
         db.commit()
-        logger.info("Sync-saved event (Redis fallback): user=%d, type=%s", event.user_id, event.event_type)
-    except Exception as e:
+        _publish_signals_sync(db, events)
+    except Exception:
         db.rollback()
-        logger.error("Sync save also failed (event LOST): %s", e)
+        raise
     finally:
         db.close()
+
+
+def _publish_signals_sync(db, events: list[TrackingEventCreate]):
+    """
+    Mirrors the committed users' user_features and seen content to Redis and
+    invalidates their cached feeds. Best effort, as in the worker: readers
+    prefer these keys, so skipping them would serve stale features and
+    already-seen content until the keys expire.
+    """
+    global _sync_redis
+    try:
+        feature_rows = get_user_features(db, sorted({event.user_id for event in events}))
+        if _sync_redis is None:
+            _sync_redis = get_redis()
+        publish_user_activity(_sync_redis, events, feature_rows)
+    except Exception as e:
+        logger.warning("Failed to publish user activity signals: %s", e)
+
+
+def _save_events_sync(events: list[TrackingEventCreate]):
+    """
+    Last-resort fallback: saves directly to Postgres when neither Redis nor
+    the spool can take the events.
+    """
+    try:
+        _persist_events_sync(events)
+        logger.info("Sync-saved %d event(s) (Redis fallback)", len(events))
+    except Exception as e:
+        logger.error("Sync save also failed (%d event(s) LOST): %s", len(events), e)
+
+
+def _ping_db_sync():
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+    finally:
+        db.close()
+
+
+async def _drain_target_ready() -> bool:
+    global _redis_retry_at
+    if settings.SPOOL_DRAIN_TARGET == "postgres":
+        # Also tells a Postgres outage apart from bad spooled lines (dead-lettering)
+        try:
+            await asyncio.get_running_loop().run_in_executor(_fallback_executor, _ping_db_sync)
+            return True
+        except Exception:
+            return False
+    try:
+        await get_async_redis().ping()
+        _redis_retry_at = 0.0
+        return True
+    except Exception:
+        return False
+
+
+async def _replay_spooled(lines: list[bytes]):
+    """Replays spooled NDJSON lines into the queue or straight into Postgres."""
+    if settings.SPOOL_DRAIN_TARGET != "postgres":
+        await _get_event_queue().publish_many(lines)
+        return
+
+    events, unreadable = [], []
+    for line in lines:
+        try:
+            events.append(TrackingEventCreate.model_validate_json(line))
+        except ValueError as e:
+            logger.error("Unreadable spooled event: %s", e)
+            unreadable.append(line)
+    if unreadable:
+        # Set aside before the save: a failed save replays the chunk, and a
+        # second copy in the dead-letter file is harmless
+        await asyncio.to_thread(get_spool().dead_letter, unreadable)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_fallback_executor, _persist_events_sync, events)
+
+
+def start_spool_drainer():
+    global _drainer_task, _drainer_stop
+    _drainer_stop = asyncio.Event()
+    _drainer_task = asyncio.create_task(run_spool_drainer(_replay_spooled, _drain_target_ready, _drainer_stop))
+
+
+async def stop_spool_drainer():
+    if _drainer_task is not None:
+        _drainer_stop.set()
+        await _drainer_task
+    await asyncio.to_thread(get_spool().close)
+
+
+def shutdown_fallback_executor():
+    """Waits for in-flight fallback writes on shutdown."""
+    _fallback_executor.shutdown(wait=True)
@@ -0,0 +1,122 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Mapping from event_type to the per-user counter it increments in user_features
+EVENT_TO_USER_COUNTER = {
+    "view": "total_views_given",
+    "like": "total_likes_given",
+    "unlike": "total_unlikes_given",
+    "bookmark": "total_bookmarks_given",
+    "share": "total_shares_given",
+    "comment": "total_comments_given",
+    "search_click": "total_search_clicks",
+}
+
+# Delta columns of user_features, in a fixed order for batch statements
+USER_FEATURE_COLUMNS = (
+    "total_events",
+    "unique_content_viewed",
+    *EVENT_TO_USER_COUNTER.values(),
+    "sum_event_value",
+)
+
+
+def _record_seen_content(db: Session, events) -> dict[int, int]:
+    """
+    Inserts the window's distinct (user, content) pairs into user_seen_content
+    and returns, per user, how many of them were seen for the first time.
+    """
+    pairs = sorted({(event.user_id, event.content_id) for event in events})
+    if not pairs:
+        return {}
+
+    params = {}
+    value_rows = []
+    for i, (user_id, content_id) in enumerate(pairs):
+        params[f"user_id_{i}"] = user_id
+        params[f"content_id_{i}"] = content_id
+        value_rows.append(f"(:user_id_{i}, :content_id_{i})")
+
+    result = db.execute(text("""
+        INSERT INTO user_seen_content (user_id, content_id)
+        VALUES {values}
+        ON CONFLICT DO NOTHING
+        RETURNING user_id
+    """.format(values=", ".join(value_rows))), params)
+
+    new_content: dict[int, int] = {}
+    for (user_id,) in result:
+        new_content[user_id] = new_content.get(user_id, 0) + 1
+    return new_content
+
+
+def aggregate_user_deltas(events, new_content: dict[int, int]) -> dict[int, dict[str, float]]:
+    """Folds a batch of events into per-user counter deltas."""
+    deltas: dict[int, dict[str, float]] = {}
+    for event in events:
+        row = deltas.setdefault(event.user_id, dict.fromkeys(USER_FEATURE_COLUMNS, 0))
+        row["total_events"] += 1
+        row["sum_event_value"] += event.event_value
+        counter = EVENT_TO_USER_COUNTER.get(event.event_type)
+        if counter:
+            row[counter] += 1
+
+    for user_id, count in new_content.items():
+        deltas[user_id]["unique_content_viewed"] += count
+    return deltas
+
+
+def apply_user_features(db: Session, events):
+    """
+    Updates user_seen_content and user_features for a batch of events with two
+    statements: one multi-row INSERT of the distinct pairs, one multi-row UPSERT
+    of the per-user deltas (in user_id order, so concurrent workers lock rows in
+    the same order). Does NOT own the transaction — caller must commit.
+    """
+    if not events:
+        return
+
+    deltas = aggregate_user_deltas(events, _record_seen_content(db, events))
+    user_ids = sorted(deltas)
+
+    params = {}
+    value_rows = []
+    for i, user_id in enumerate(user_ids):
+        params[f"user_id_{i}"] = user_id
+        placeholders = [f":user_id_{i}"]
+        for col in USER_FEATURE_COLUMNS:
+            params[f"{col}_{i}"] = deltas[user_id][col]
+            placeholders.append(f":{col}_{i}")
+        value_rows.append("({})".format(", ".join(placeholders)))
+
+    cols = ", ".join(USER_FEATURE_COLUMNS)
+    db.execute(text("""
+        INSERT INTO user_features (user_id, {cols}, updated_at)
+        SELECT d.user_id, {cols}, NOW()
+        FROM (VALUES {values}) AS d(user_id, {cols})
+        ON CONFLICT (user_id)
+        DO UPDATE SET
+            {update_set},
+            updated_at = NOW()
+    """.format(
+        cols=cols,
+        values=", ".join(value_rows),
+        update_set=",\n            ".join(f"{col} = user_features.{col} + EXCLUDED.{col}" for col in USER_FEATURE_COLUMNS),
+    )), params)
+
+    logger.debug("User feature deltas applied for %d users", len(user_ids))
+
+
+def get_user_features(db: Session, user_ids: list[int]) -> list[dict]:
+    """Current user_features rows for `user_ids` (to mirror them to Redis)."""
+    if not user_ids:
+        return []
+    result = db.execute(text("""
+        SELECT user_id, {cols}
+        FROM user_features
+        WHERE user_id = ANY(:user_ids)
+    """.format(cols=", ".join(USER_FEATURE_COLUMNS))), {"user_ids": user_ids})
+    return [dict(row._mapping) for row in result]
@@ -21,7 +21,7 @@ def check_db():
         engine = create_engine(db_url)
         with engine.connect() as conn:
             print("SUCCESS: Connected to database!")
-            tables = ["tracking_events", "content_metrics", "content_watch_time"]
+            tables = ["tracking_events", "content_metrics", "content_watch_time", "user_features", "user_seen_content"]
             for t in tables:
                 res = conn.execute(text(f"SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = '{t}')"))
                 print(f"Table '{t}': {'EXISTS' if res.scalar() else 'MISSING'}")
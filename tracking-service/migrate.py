@@ -1,3 +1,4 @@
+import glob
 import os
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
@@ -9,21 +10,23 @@ def run_migrations():
         print("ERROR: DATABASE_URL not found")
         return
 
-    sql_file = "app/database/migrations/001_initial_schema.sql"
-    if not os.path.exists(sql_file):
-        print(f"ERROR: SQL file not found: {sql_file}")
+    # Applied in file-name order; every script is idempotent (IF NOT EXISTS / ON CONFLICT)
+    sql_files = sorted(glob.glob("app/database/migrations/*.sql"))
+    if not sql_files:
+        print("ERROR: No SQL files found in app/database/migrations")
         return
 
     try:
         engine = create_engine(db_url)
-        with open(sql_file, "r", encoding="utf-8") as f:
-            content = f.read()
-            # Split by semicolon to execute separate statements if needed, 
-            # though execute(text(content)) usually works for Postgres
-            with engine.connect() as conn:
-                conn.execute(text(content))
-                conn.commit()
-                print("SUCCESS: Database schema initialized!")
+        for sql_file in sql_files:
+            with open(sql_file, "r", encoding="utf-8") as f:
+                content = f.read()
+                # Split by semicolon to execute separate statements if needed, 
+                # though execute(text(content)) usually works for Postgres
+                with engine.connect() as conn:
+                    conn.execute(text(content))
+                    conn.commit()
+                    print(f"SUCCESS: Applied {sql_file}")
     except Exception as e:
         print(f"ERROR: Migration failed: {e}")
 
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.core.config import settings
+from app.core.security import verify_api_key
+from app.services import tracking_service
+
+EVENT = json.dumps({"user_id": 1, "content_id": 2, "event_type": "view"})
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+@pytest.fixture
+def published(monkeypatch):
+    events = []
+
+    async def publish_events_to_queue(batch):
+        events.extend(batch)
+
+    monkeypatch.setattr(tracking_service, "publish_events_to_queue", publish_events_to_queue)
+    return events
+
+
+@pytest.fixture
+def client(monkeypatch, published):
+    monkeypatch.setattr(settings, "EVENTS_BATCH_MAX_ITEMS", 3)
+    monkeypatch.setattr(settings, "EVENTS_BATCH_MAX_BYTES", 1024)
+    app = FastAPI()
+    app.include_router(routes.router)
+    app.dependency_overrides[verify_api_key] = lambda: None
+    return TestClient(app)
+
+
+@pytest.fixture
+def parsed_lines(monkeypatch):
+    """Counts json.loads calls made by the batch route."""
+    calls = []
+    loads = json.loads
+
+    def counting_loads(line, *args, **kwargs):
+        calls.append(line)
+        return loads(line, *args, **kwargs)
+
+    monkeypatch.setattr(routes.json, "loads", counting_loads)
+    return calls
+
+
+def test_batch_within_limits_is_accepted(client, published):
+    response = client.post("/events:batch", content="\n".join([EVENT, "{oops", EVENT]), headers=NDJSON)
+
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 2
+    assert len(published) == 2
+
+
+def test_oversized_body_is_refused_before_parsing(client, published, parsed_lines):
+    body = "[" + ",".join([EVENT] * 30) + "]"
+
+    response = client.post("/events:batch", content=body, headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 413
+    assert parsed_lines == []
+    assert published == []
+
+
+def test_oversized_body_without_content_length_is_refused_while_reading(client, parsed_lines):
+    def chunks():
+        for _ in range(30):
+            yield (EVENT + "\n").encode()
+
+    response = client.post("/events:batch", content=chunks(), headers=NDJSON)
+
+    assert response.status_code == 413
+    assert parsed_lines == []
+
+
+def test_ndjson_split_stops_after_the_item_limit(client, published, parsed_lines):
+    response = client.post("/events:batch", content="\n".join([EVENT] * 10), headers=NDJSON)
+
+    assert response.status_code == 413
+    assert len(parsed_lines) == settings.EVENTS_BATCH_MAX_ITEMS
+    assert published == []
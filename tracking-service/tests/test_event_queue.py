@@ -0,0 +1,43 @@
+import fakeredis
+import pytest
+
+from app.cache.event_queue import ListEventQueue
+from app.core.config import settings
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis()
+
+
+def list_queue(redis_conn, monkeypatch, worker_id: str) -> ListEventQueue:
+    monkeypatch.setattr(settings, "WORKER_ID", worker_id)
+    return ListEventQueue(redis_conn)
+
+
+def test_dead_workers_processing_list_is_taken_over(redis_conn, monkeypatch):
+    old = list_queue(redis_conn, monkeypatch, "container-a")
+    old.publish_many([b"1", b"2", b"3"])
+    assert len(old.read(10)) == 3
+    # container-a is recreated under a new hostname: its heartbeat is never renewed
+
+    new = list_queue(redis_conn, monkeypatch, "container-b")
+    new.heartbeat()
+    reclaimed = new.reclaim(own=False)
+
+    assert sorted(m.payload for m in reclaimed) == [b"1", b"2", b"3"]
+    assert not redis_conn.exists(old.processing_list)
+    # Acknowledged with the new worker's next window
+    new.ack(reclaimed)
+    assert not redis_conn.exists(new.processing_list)
+
+
+def test_live_workers_processing_list_is_left_alone(redis_conn, monkeypatch):
+    busy = list_queue(redis_conn, monkeypatch, "worker-1")
+    busy.heartbeat()
+    busy.publish_many([b"1", b"2"])
+    assert len(busy.read(10)) == 2
+
+    other = list_queue(redis_conn, monkeypatch, "worker-2")
+    assert other.reclaim(own=False) == []
+    assert redis_conn.llen(busy.processing_list) == 2
@@ -0,0 +1,122 @@
+import asyncio
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.services import event_spool
+from app.services.event_spool import EventSpool, run_spool_drainer
+
+POISON = b'{"poison": true}'
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "SPOOL_DRAIN_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "SPOOL_MAX_REPLAY_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "EVENTS_BATCH_MAX_ITEMS", 2)
+    spool = EventSpool(str(tmp_path), 1 << 20, 3600, 1 << 30, 3600)
+    monkeypatch.setattr(event_spool, "_spool", spool)
+    yield spool
+    spool.close()
+
+
+def segments(spool: EventSpool) -> list[str]:
+    return sorted(name for name in os.listdir(spool.directory) if name.startswith("seg-"))
+
+
+def drain_pass(replay, is_target_ready=None):
+    """Runs exactly one drain pass of run_spool_drainer."""
+    stop = asyncio.Event()
+
+    async def target_ready():
+        ready = await is_target_ready() if is_target_ready else True
+        stop.set()
+        return ready
+
+    asyncio.run(asyncio.wait_for(run_spool_drainer(replay, target_ready, stop), timeout=5))
+
+
+class Target:
+    """Replay target that rejects any chunk containing POISON, or everything while down."""
+
+    def __init__(self):
+        self.delivered: list[bytes] = []
+        self.calls = 0
+        self.up = True
+
+    async def replay(self, lines: list[bytes]):
+        self.calls += 1
+        if not self.up or POISON in lines:
+            raise RuntimeError("replay failed")
+        self.delivered.extend(lines)
+
+    async def is_ready(self) -> bool:
+        return self.up
+
+
+def test_failed_replay_keeps_segment_name_and_ends_pass(spool):
+    spool.append(['{"n": 1}', POISON.decode(), '{"n": 2}'])
+    spool.seal()
+    [segment] = segments(spool)
+    target = Target()
+
+    for attempt in range(1, 3):
+        drain_pass(target.replay)
+        assert target.calls == attempt
+        assert segments(spool) == [segment, f"{segment}.attempts"]
+        assert spool.failed_attempts(os.path.join(spool.directory, segment)) == attempt
+
+    assert target.delivered == []
+
+
+def test_lines_failing_max_attempts_are_dead_lettered(spool):
+    spool.append(['{"n": 1}', POISON.decode(), '{"n": 2}'])
+    spool.seal()
+    target = Target()
+
+    for _ in range(settings.SPOOL_MAX_REPLAY_ATTEMPTS + 1):
+        drain_pass(target.replay, target.is_ready)
+
+    assert target.delivered == [b'{"n": 1}', b'{"n": 2}']
+    assert segments(spool) == []
+    with open(os.path.join(spool.directory, "dead-letter.ndjson"), "rb") as f:
+        assert f.read() == POISON + b"\n"
+
+
+def test_nothing_is_dead_lettered_while_target_is_down(spool):
+    spool.append(['{"n": 1}', '{"n": 2}', '{"n": 3}'])
+    spool.seal()
+    target = Target()
+    target.up = False
+
+    # The health check passes at the start of each pass, then the target is down again
+    for _ in range(settings.SPOOL_MAX_REPLAY_ATTEMPTS + 2):
+        checks = iter([True])
+
+        async def flapping_ready():
+            return next(checks, False)
+
+        drain_pass(target.replay, flapping_ready)
+
+    assert not os.path.exists(os.path.join(spool.directory, "dead-letter.ndjson"))
+    target.up = True
+    drain_pass(target.replay, target.is_ready)
+    assert target.delivered == [b'{"n": 1}', b'{"n": 2}', b'{"n": 3}']
+    assert segments(spool) == []
+
+
+def test_unreadable_lines_replayed_to_postgres_are_dead_lettered(spool, monkeypatch):
+    from app.services import tracking_service
+
+    saved = []
+    monkeypatch.setattr(settings, "SPOOL_DRAIN_TARGET", "postgres")
+    monkeypatch.setattr(tracking_service, "_persist_events_sync", saved.extend)
+    good = b'{"user_id": 1, "content_id": 2, "event_type": "view"}'
+
+    asyncio.run(tracking_service._replay_spooled([good, b"not json", POISON]))
+
+    assert [(event.user_id, event.content_id) for event in saved] == [(1, 2)]
+    with open(os.path.join(spool.directory, "dead-letter.ndjson"), "rb") as f:
+        assert f.read() == b"not json\n" + POISON + b"\n"
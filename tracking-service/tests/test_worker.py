@@ -0,0 +1,119 @@
+import json
+
+import fakeredis
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import worker
+from app.cache.event_queue import ListEventQueue
+from app.core.config import settings
+
+POISON_CONTENT_ID = 666
+
+
+class FakeDatabase:
+    """Stands in for _persist_batch: rejects any batch holding the poison event, or everything while down."""
+
+    def __init__(self):
+        self.committed: list[int] = []
+        self.transactions = 0
+        self.down = False
+
+    def persist_batch(self, events, deltas):
+        self.transactions += 1
+        if self.down:
+            raise OperationalError("INSERT", {}, Exception("connection refused"))
+        if any(event.content_id == POISON_CONTENT_ID for event in events):
+            raise IntegrityError("INSERT", {}, Exception("violates foreign key constraint"))
+        self.committed.extend(event.content_id for event in events)
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_ID", "test-worker")
+    return ListEventQueue(fakeredis.FakeRedis())
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(worker, "_persist_batch", database.persist_batch)
+    monkeypatch.setattr(worker, "_publish_signals", lambda queue, events: None)
+    return database
+
+
+def stage(queue: ListEventQueue, content_ids: list[int]) -> worker._PendingWindow:
+    """Publishes one view per content id and drains them into a new window, in that order."""
+    # The list backend reads the newest push first
+    queue.publish_many([
+        json.dumps({"user_id": 1, "content_id": content_id, "event_type": "view"}) for content_id in reversed(content_ids)
+    ])
+    window = worker._PendingWindow()
+    worker._stage_batch(queue, window, queue.read(len(content_ids)))
+    return window
+
+
+def test_poison_event_goes_to_dlq_and_its_neighbours_commit(queue, database):
+    content_ids = [1, 2, 3, POISON_CONTENT_ID, 5, 6, 7]
+    window = stage(queue, content_ids)
+
+    worker._flush_window(queue, window)
+
+    assert database.committed == [1, 2, 3, 5, 6, 7]
+    [dead] = queue.redis.lrange(queue.dlq_name, 0, -1)
+    assert json.loads(dead)["content_id"] == POISON_CONTENT_ID
+    # Everything, dead-lettered event included, is acknowledged after the commits
+    assert not queue.redis.exists(queue.processing_list)
+    assert window.events == []
+
+
+def test_clean_window_commits_in_one_transaction(queue, database):
+    worker._flush_window(queue, stage(queue, [1, 2, 3]))
+
+    assert database.transactions == 1
+    assert database.committed == [1, 2, 3]
+    assert not queue.redis.exists(queue.processing_list)
+
+
+def test_operational_error_is_raised_without_acking(queue, database):
+    window = stage(queue, [1, 2, 3])
+    database.down = True
+
+    with pytest.raises(OperationalError):
+        worker._flush_window(queue, window)
+
+    assert database.committed == []
+    assert queue.redis.llen(queue.processing_list) == 3
+    assert not queue.redis.exists(queue.dlq_name)
+    assert [event.content_id for event in window.events] == [1, 2, 3]
+
+    # Once the database is back the same window commits and is acknowledged
+    database.down = False
+    worker._flush_window(queue, window)
+    assert database.committed == [1, 2, 3]
+    assert not queue.redis.exists(queue.processing_list)
+
+
+def test_db_outage_during_bisect_keeps_settled_events_out_of_the_retry(queue, database, monkeypatch):
+    window = stage(queue, [1, POISON_CONTENT_ID, 3, 4])
+    persist = database.persist_batch
+
+    def fail_after_first_half(events, deltas):
+        # The second half of the bisect hits a connection error
+        if 3 in (event.content_id for event in events) and len(events) < 4:
+            database.down = True
+        return persist(events, deltas)
+
+    monkeypatch.setattr(worker, "_persist_batch", fail_after_first_half)
+    with pytest.raises(OperationalError):
+        worker._flush_window(queue, window)
+    assert database.committed == [1]
+    assert queue.redis.llen(queue.processing_list) == 4
+
+    database.down = False
+    monkeypatch.setattr(worker, "_persist_batch", persist)
+    worker._flush_window(queue, window)
+
+    assert database.committed == [1, 3, 4]
+    assert queue.redis.llen(queue.dlq_name) == 1
+    assert not queue.redis.exists(queue.processing_list)
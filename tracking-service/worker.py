@@ -1,10 +1,19 @@
 """
-Tracking Worker — Consumes events from Redis queue and persists to Postgres.
+Tracking Worker — Consumes events from the Redis event queue and persists to Postgres.
 
 Features:
   - Graceful shutdown on SIGTERM/SIGINT
   - Dead-letter queue (DLQ) for failed events
-  - Content metrics aggregation on each event
+  - Batched reads: up to BATCH_SIZE events or BATCH_MAX_WAIT_MS per drain
+  - In-memory content_metrics delta aggregation, flushed every
+    METRICS_FLUSH_INTERVAL_SECONDS as one bulk INSERT + one multi-row UPSERT
+  - Crash safety: drained events are only acknowledged after their window
+    commits (at-least-once delivery); see app/cache/event_queue.py for the
+    list and Redis Streams transports (QUEUE_BACKEND)
+  - Failed windows are bisected so only poison events reach the DLQ
+  - Per-user aggregates (user_features, user_seen_content) updated in the
+    same transaction and mirrored to Redis; committed users' recommendation
+    caches are invalidated (app/services/recommendation_signals.py)
   - Exponential backoff on errors
 """
 
@@ -12,14 +21,24 @@ import json
 import logging
 import signal
 import sys
+import threading
 import time
 
+from sqlalchemy.exc import InterfaceError, OperationalError
+
 from app.api.schemas import TrackingEventCreate
+from app.cache.event_queue import EventQueue, QueueMessage, get_event_queue
 from app.cache.redis_client import get_redis
 from app.core.config import settings
 from app.database.connection import SessionLocal
 from app.repositories.tracking_repo import TrackingRepository
-from app.services.metrics_service import update_content_metrics
+from app.services.metrics_service import (
+    MetricsAggregator,
+    aggregate_metric_deltas,
+    apply_content_metrics_deltas,
+)
+from app.services.recommendation_signals import publish_user_activity
+from app.services.user_features_service import apply_user_features, get_user_features
 
 # Setup logging
 logging.basicConfig(
@@ -28,8 +47,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger("TrackingWorker")
 
-# Dead-letter queue name
-DLQ_NAME = f"{settings.REDIS_QUEUE_NAME}:dlq"
 
 # Graceful shutdown flag
 _shutdown = False
@@ -38,7 +55,7 @@ _shutdown = False
 def _handle_signal(signum, frame):
     """Sets the shutdown flag so the main loop exits cleanly."""
     global _shutdown
-    logger.info("Received shutdown signal (%s). Finishing current event...", signum)
+    logger.info("Received shutdown signal (%s). Finishing current batch...", signum)
     _shutdown = True
 
 
@@ -47,46 +64,249 @@ signal.signal(signal.SIGTERM, _handle_signal)
 signal.signal(signal.SIGINT, _handle_signal)
 
 
-def _process_event(redis_conn, event_data: bytes):
-    """Processes a single event: parse → save to DB → update metrics."""
-    data = json.loads(event_data)
-    event = TrackingEventCreate(**data)
+def _drain_batch(queue: EventQueue, timeout: float) -> list[QueueMessage]:
+    """
+    Blocks up to `timeout` for the first event, then keeps draining until
+    BATCH_SIZE events are collected or BATCH_MAX_WAIT_MS has elapsed.
+    Drained events stay unacknowledged until their window is committed.
+    """
+    batch = queue.read(settings.BATCH_SIZE, block=timeout)
+    if not batch:
+        return []
+
+    deadline = time.monotonic() + settings.BATCH_MAX_WAIT_MS / 1000
+
+    while len(batch) < settings.BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        more = queue.read(settings.BATCH_SIZE - len(batch), block=remaining)
+        if not more:
+            break
+        batch.extend(more)
+
+    return batch
+
+
+class _PendingWindow:
+    """
+    Events drained since the last flush. Their tracking_events rows and
+    content_metrics deltas are committed together, and only then acknowledged.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.events: list[TrackingEventCreate] = []
+        self.messages: list[QueueMessage] = []
+        self.acked_later: list[QueueMessage] = []
+        self.aggregator = MetricsAggregator()
+        self.opened_at: float | None = None
+        self._ids: set = set()
+        self._settled: list[tuple[int, int]] = []
+
+    def add(self, events: list[TrackingEventCreate], messages: list[QueueMessage]):
+        if self.opened_at is None:
+            self.opened_at = time.monotonic()
+        self.events.extend(events)
+        self.messages.extend(messages)
+        self.aggregator.add(events)
+
+    def is_new(self, message: QueueMessage) -> bool:
+        """Filters out stream entries handed back twice (e.g. reclaimed while pending here)."""
+        if message.id is None:
+            return True
+        if message.id in self._ids:
+            return False
+        self._ids.add(message.id)
+        return True
 
+    def time_left(self) -> float:
+        if self.opened_at is None:
+            return settings.METRICS_FLUSH_INTERVAL_SECONDS
+        return settings.METRICS_FLUSH_INTERVAL_SECONDS - (time.monotonic() - self.opened_at)
+
+    def due(self) -> bool:
+        return self.opened_at is not None and (
+            self.time_left() <= 0 or len(self.events) >= settings.METRICS_FLUSH_MAX_EVENTS
+        )
+
+    def settle(self, lo: int, hi: int):
+        """Marks events[lo:hi] as committed or dead-lettered during a bisect."""
+        self._settled.append((lo, hi))
+
+    def drop_settled(self):
+        """Forgets events settled by a bisect that was interrupted by a DB outage."""
+        if not self._settled:
+            return
+        keep = [True] * len(self.events)
+        for lo, hi in self._settled:
+            keep[lo:hi] = [False] * (hi - lo)
+        settled = [m for m, k in zip(self.messages, keep) if not k]
+        events = [e for e, k in zip(self.events, keep) if k]
+        messages = [m for m, k in zip(self.messages, keep) if k]
+        acked_later = self.acked_later + settled
+        opened_at, ids = self.opened_at, self._ids
+        self.reset()
+        self.add(events, messages)
+        self.acked_later, self.opened_at, self._ids = acked_later, opened_at, ids
+
+
+def _persist_batch(events: list[TrackingEventCreate], deltas: dict[int, dict[str, int]]):
+    """Saves a batch in one transaction: bulk insert + single metrics upsert + user_features."""
     db = SessionLocal()
     try:
-        repo = TrackingRepository(db)
-        repo.save_event(event)
-        update_content_metrics(db, event.content_id, event.event_type)
+        TrackingRepository(db).save_events(events)
+        apply_content_metrics_deltas(db, deltas)
+        apply_user_features(db, events)
         db.commit()
-        logger.info("Saved event: user=%d, type=%s, content=%d", event.user_id, event.event_type, event.content_id)
-    except Exception as e:
+    except Exception:
         db.rollback()
-        logger.error("DB error processing event: %s", e)
-        # Send to DLQ so the failed event is not lost
-        try:
-            redis_conn.lpush(DLQ_NAME, event_data)
-            logger.warning("Event moved to DLQ: %s", DLQ_NAME)
-        except Exception:
-            logger.critical("Failed to send event to DLQ — event LOST: %s", event_data[:200])
+        raise
     finally:
         db.close()
 
 
+def _persist_with_bisect(queue: EventQueue, window: _PendingWindow, lo: int, hi: int, deltas=None):
+    """
+    Persists window.events[lo:hi]; if it fails, splits it in halves and retries
+    each half so that only the poison events end up in the DLQ.
+    Connection-level errors propagate so the window is retried after backoff.
+    """
+    events = window.events[lo:hi]
+    try:
+        _persist_batch(events, deltas if deltas is not None else aggregate_metric_deltas(events))
+    except (OperationalError, InterfaceError):
+        raise
+    except Exception as e:
+        if hi - lo == 1:
+            logger.error("DB error processing event: %s", e)
+            queue.dead_letter(window.messages[lo:hi])
+        else:
+            logger.warning("Batch of %d events failed (%s) — bisecting", hi - lo, e)
+            mid = (lo + hi) // 2
+            _persist_with_bisect(queue, window, lo, mid)
+            _persist_with_bisect(queue, window, mid, hi)
+            return
+    window.settle(lo, hi)
+
+
+def _flush_window(queue: EventQueue, window: _PendingWindow):
+    """
+    Commits the pending window (events + aggregated metrics in one transaction),
+    then acknowledges every message read into it.
+    A crash before the ack replays the window (at-least-once).
+    """
+    window.drop_settled()
+    if window.events:
+        events = list(window.events)
+        _persist_with_bisect(queue, window, 0, len(events), window.aggregator.deltas)
+        logger.info(
+            "Flushed %d events, %d content_metrics rows",
+            len(events), len(window.aggregator.deltas),
+        )
+        _publish_signals(queue, events)
+
+    queue.ack(window.messages + window.acked_later)
+    window.reset()
+
+
+def _publish_signals(queue: EventQueue, events: list[TrackingEventCreate]):
+    """Mirrors the committed users' user_features to Redis and invalidates their cached feeds."""
+    try:
+        db = SessionLocal()
+        try:
+            feature_rows = get_user_features(db, sorted({event.user_id for event in events}))
+        finally:
+            db.close()
+        publish_user_activity(queue.redis, events, feature_rows)
+    except Exception as e:
+        # Readers fall back to Postgres; cached recommendations expire by TTL
+        logger.warning("Failed to publish user activity signals: %s", e)
+
+
+def _stage_batch(queue: EventQueue, window: _PendingWindow, messages: list[QueueMessage]):
+    """Parses drained messages into the pending window; malformed events go to the DLQ."""
+    events, valid = [], []
+    for message in messages:
+        if not window.is_new(message):
+            continue
+        try:
+            events.append(TrackingEventCreate(**json.loads(message.payload)))
+            valid.append(message)
+        except Exception as e:
+            logger.error("Malformed event: %s", e)
+            queue.dead_letter([message])
+            window.acked_later.append(message)
+
+    window.add(events, valid)
+
+
+def _start_heartbeat(queue: EventQueue) -> threading.Event:
+    """
+    Keeps this worker's heartbeat alive from a daemon thread, so slow flushes
+    and DB backoff never make it look dead to the others. Set the returned
+    event to stop it.
+    """
+    stop = threading.Event()
+
+    def beat():
+        while True:
+            try:
+                queue.heartbeat()
+            except Exception as e:
+                logger.warning("Worker heartbeat failed: %s", e)
+            if stop.wait(settings.WORKER_HEARTBEAT_TTL_SECONDS / 3):
+                return
+
+    threading.Thread(target=beat, name="worker-heartbeat", daemon=True).start()
+    return stop
+
+
+def _reclaim(queue: EventQueue, window: _PendingWindow, own: bool):
+    """Stages unacknowledged messages from a previous run or from dead consumers."""
+    try:
+        messages = queue.reclaim(own=own)
+        if messages:
+            logger.warning("Recovering %d unacknowledged event(s)", len(messages))
+            _stage_batch(queue, window, messages)
+    except Exception as e:
+        logger.error("Could not reclaim pending events: %s", e)
+
+
 def run_worker():
-    """Main worker loop with graceful shutdown and exponential backoff."""
-    logger.info("Worker started — Redis: %s:%d, Queue: %s", settings.REDIS_HOST, settings.REDIS_PORT, settings.REDIS_QUEUE_NAME)
+    """Main worker loop with batching, graceful shutdown and exponential backoff."""
+    logger.info(
+        "Worker %s started — Redis: %s:%d, Transport: %s, Batch: %d events / %dms, Flush: %.1fs",
+        settings.WORKER_ID, settings.REDIS_HOST, settings.REDIS_PORT, settings.QUEUE_BACKEND,
+        settings.BATCH_SIZE, settings.BATCH_MAX_WAIT_MS, settings.METRICS_FLUSH_INTERVAL_SECONDS,
+    )
 
-    redis_conn = get_redis()
+    queue = get_event_queue(get_redis())
+    window = _PendingWindow()
     backoff = 1  # seconds
+    stop_heartbeat = _start_heartbeat(queue)
+
+    # Events left unacknowledged by a previous run of this worker are replayed first
+    _reclaim(queue, window, own=True)
+    last_claim = time.monotonic()
 
     while not _shutdown:
         try:
-            # BLPOP: blocking pop with timeout (allows checking _shutdown flag)
-            result = redis_conn.blpop(settings.REDIS_QUEUE_NAME, timeout=5)
+            if time.monotonic() - last_claim >= settings.REDIS_STREAM_CLAIM_INTERVAL_SECONDS:
+                _reclaim(queue, window, own=False)
+                last_claim = time.monotonic()
+
+            if not window.due():
+                # Never block past the window's flush deadline
+                timeout = max(0.1, min(5.0, window.time_left()))
+                batch = _drain_batch(queue, timeout)
+                if batch:
+                    _stage_batch(queue, window, batch)
 
-            if result:
-                _, event_data = result
-                _process_event(redis_conn, event_data)
+            if window.due():
+                _flush_window(queue, window)
                 backoff = 1  # reset backoff on success
 
         except KeyboardInterrupt:
@@ -96,6 +316,13 @@ def run_worker():
             time.sleep(backoff)
             backoff = min(backoff * 2, 30)  # exponential backoff, max 30s
 
+    # Flush whatever is pending so shutdown does not force a replay
+    try:
+        _flush_window(queue, window)
+    except Exception as e:
+        logger.error("Final flush failed, %d event(s) will be replayed on restart: %s", len(window.events), e)
+    stop_heartbeat.set()
+
     logger.info("Worker shut down gracefully.")
 
 